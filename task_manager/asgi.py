@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
 
 application = get_asgi_application()
+
+# Start the login hashing threads with the worker rather than on the first
+# login of the morning.
+from users.login_pool import login_pool  # noqa: E402
+
+login_pool.start()
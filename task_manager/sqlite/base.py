@@ -0,0 +1,69 @@
+"""
+SQLite backend that serializes write transactions within the process.
+
+SQLite allows one writer at a time. With ``transaction_mode='IMMEDIATE'``
+each transaction takes the write lock at BEGIN, and concurrent writers wait
+in SQLite's busy handler, which polls with growing sleeps. Here threads of
+one process queue on a lock per database file instead and start as soon as
+the previous transaction ends. Writers in other processes still rely on the
+busy timeout.
+
+The lock is on by default; set ``OPTIONS['serialize_writes']`` to False to
+turn it off. In-memory databases never take it.
+"""
+import threading
+
+from django.db.backends.sqlite3 import base
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def write_lock(name):
+    with _locks_guard:
+        return _locks.setdefault(str(name), threading.RLock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.serialize_writes = kwargs.pop('serialize_writes', True)
+        self.lock_timeout = kwargs.get('timeout', 5)
+        self._write_lock = None
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        if self.serialize_writes and not self.is_in_memory_db():
+            lock = write_lock(self.settings_dict['NAME'])
+            if not lock.acquire(timeout=self.lock_timeout):
+                with self.wrap_database_errors:
+                    raise self.Database.OperationalError('database is locked')
+            self._write_lock = lock
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        lock, self._write_lock = getattr(self, '_write_lock', None), None
+        if lock is not None:
+            lock.release()
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
@@ -19,6 +19,7 @@ from django.urls import path,include
 from django.contrib.auth.views import LoginView
 from django.contrib.auth import logout
 from django.shortcuts import redirect
+from tasks.admin_views import prometheus_metrics
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -32,9 +33,12 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('tasks.urls')),
     path('api/auth/', include('users.urls')),
+    path('api/async/', include('tasks.async_urls')),
+    path('api/async/auth/', include('users.async_urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('panel/', include('tasks.admin_urls')),
     path('login/', LoginView.as_view(template_name='auth/login.html'), name='login'),
     path('', LoginView.as_view(template_name='auth/login.html'), name='home'),
-    path('logout/', logout_view, name='logout'),]
+    path('logout/', logout_view, name='logout'),
+    path('metrics', prometheus_metrics, name='metrics'),]
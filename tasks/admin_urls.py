@@ -13,11 +13,18 @@ urlpatterns = [
     path('users/<int:user_id>/delete/', admin_views.delete_user, name='delete_user'),
     path('admins/', admin_views.manage_admins, name='admins_list'),
     path('admins/create/', admin_views.create_admin, name='admin_create'),
+    path('admins/reassign/', admin_views.reassign_users, name='reassign_users'),
     path('admins/<int:admin_id>/edit/', admin_views.edit_admin, name='admin_edit'),
     path('admins/<int:admin_id>/delete/', admin_views.delete_admin, name='admin_delete'),
     path('admins/<int:admin_id>/demote/', admin_views.demote_admin, name='admin_demote'),
     path('tasks/<int:task_id>/delete/', admin_views.delete_task, name='delete_task'),
     path('reports/', admin_views.reports_list, name='reports_list'),
+    path('reports/summary/', admin_views.report_summary, name='report_summary'),
     path('reports/<int:task_id>/', admin_views.report_detail, name='report_detail'),
     path('users/<int:user_id>/assign/', admin_views.assign_user_to_admin, name='assign_user'),
+    path('jobs/', admin_views.jobs_list, name='jobs_list'),
+    path('jobs/start/', admin_views.start_job, name='start_job'),
+    path('jobs/<int:job_id>/', admin_views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/retry/', admin_views.retry_job, name='retry_job'),
+    path('performance/', admin_views.performance, name='performance'),
 ]
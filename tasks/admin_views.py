@@ -1,30 +1,48 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import get_user_model
-from .models import Task
-from .forms import TaskForm, UserForm, AdminForm
+from django.core.paginator import Paginator
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_POST
+from .models import ArchivedTask, Job, Task
+from .stats import get_stats
+from .forms import TaskForm, UserForm, AdminForm, ReportSummaryForm, ReassignUsersForm
+from . import archive, jobs, metrics, reports
 
 User = get_user_model()
 
+PAGE_SIZE = 50
+
+def paginate(request, queryset, count=None):
+    paginator = Paginator(queryset, PAGE_SIZE)
+    if count is not None:
+        # Reuse a total the view already aggregated instead of a second COUNT(*).
+        paginator.count = count
+    return paginator.get_page(request.GET.get('page'))
+
 @login_required
 def admin_dashboard(request):
     if not (request.user.is_superuser or getattr(request.user, 'role', None) == 'admin'):
         return redirect('login')
     
-    if request.user.is_superuser:
-        tasks_count = Task.objects.count()
-        completed_tasks = Task.objects.filter(status='completed').count()
-    else:
-        tasks_count = Task.objects.filter(assigned_to__admin=request.user).count()
-        completed_tasks = Task.objects.filter(status='completed', assigned_to__admin=request.user).count()
+    # Superusers read the global row; for admins users_count is the number
+    # of users they manage (the template only shows user totals to superusers).
+    task_stats = get_stats(request.user)
     
     context = {
         'user': request.user,
-        'tasks_count': tasks_count,
-        'users_count': User.objects.count(),
-        'admins_count': User.objects.filter(role='admin').count(),
-        'completed_tasks': completed_tasks,
+        'tasks_count': task_stats['tasks_count'],
+        'users_count': task_stats['users_count'],
+        'admins_count': task_stats['admins_count'],
+        'completed_tasks': task_stats['completed_count'],
     }
     return render(request, 'admin/dashboard.html', context)
 
@@ -33,22 +51,18 @@ def manage_tasks(request):
     if not (request.user.is_superuser or getattr(request.user, 'role', None) == 'admin'):
         return redirect('login')
     
-    if request.user.is_superuser:
-        tasks = Task.objects.all()
-    elif getattr(request.user, 'role', None) == 'admin':
-        tasks = Task.objects.filter(assigned_to__admin=request.user)
-    else:
-        tasks = Task.objects.none()
-    
-    return render(request, 'admin/tasks_list.html', {'tasks': tasks})
+    tasks = Task.objects.visible_to(request.user).without_text().select_related('assigned_to').order_by('-updated_at', '-id')
+    page_obj = paginate(request, tasks)
+    return render(request, 'admin/tasks_list.html', {'tasks': page_obj, 'page_obj': page_obj})
 
 @login_required
 def manage_users(request):
     if not request.user.is_superuser:
         return render(request, '403.html')
     
-    users = User.objects.all()
-    return render(request, 'admin/users_list.html', {'users': users})
+    users = User.objects.select_related('admin').order_by('id')
+    page_obj = paginate(request, users)
+    return render(request, 'admin/users_list.html', {'users': page_obj, 'page_obj': page_obj})
 
 @login_required
 def create_task(request):
@@ -139,16 +153,34 @@ def delete_user(request, user_id):
         return redirect('users_list')
     
     role_display = 'SuperUser' if user_obj.is_superuser else user_obj.get_role_display()
-    user_obj.delete()
-    messages.success(request, f'{role_display} deleted successfully')
-    return redirect('users_list')
+    job, queued = queue_user_deletion(request, user_obj)
+    if queued:
+        messages.success(request, f'{role_display} {user_obj.username} is being deleted in the background')
+    else:
+        messages.error(request, f'Another job for {user_obj.username} is still in progress')
+    return redirect('job_detail', job_id=job.id)
+
+def queue_user_deletion(request, user_obj):
+    # Their tasks can number in the tens of thousands, so the cascade runs
+    # in chunks on the job worker. Deactivating in the same transaction
+    # locks the account out (and revokes its tokens) straight away. The key
+    # may be held by another kind of job, such as a reassignment of this
+    # admin's users; then nothing is queued and the account stays active.
+    with transaction.atomic():
+        job = jobs.enqueue('delete_user', {'user_id': user_obj.id}, key=f'user:{user_obj.id}', user=request.user)
+        if job.kind != 'delete_user':
+            return job, False
+        if user_obj.is_active:
+            user_obj.is_active = False
+            user_obj.save(update_fields=['is_active'])
+    return job, True
 
 @login_required
 def task_detail(request, task_id):
     if not (request.user.is_superuser or getattr(request.user, 'role', None) == 'admin'):
         return redirect('login')
     
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(Task.objects.select_related('assigned_to'), id=task_id)
     return render(request, 'admin/task_detail.html', {'task': task})
 
 @login_required
@@ -178,24 +210,56 @@ def manage_admins(request):
     if not request.user.is_superuser:
         return render(request, '403.html')
     
-    admins = User.objects.filter(role='admin')
-    return render(request, 'admin/admins_list.html', {'admins': admins})
+    admins = User.objects.filter(role='admin').annotate(managed_count=Count('managed_users')).order_by('id')
+    page_obj = paginate(request, admins)
+    return render(request, 'admin/admins_list.html', {'admins': page_obj, 'page_obj': page_obj})
 
 @login_required
 def reports_list(request):
     if not (request.user.is_superuser or getattr(request.user, 'role', None) == 'admin'):
         return redirect('login')
     
-    if request.user.is_superuser:
-        completed_tasks = Task.objects.filter(status='completed')
-    else:
-        completed_tasks = Task.objects.filter(status='completed', assigned_to__admin=request.user)
-    
-    total_hours = sum(task.worked_hours for task in completed_tasks)
+    completed_tasks = Task.objects.visible_to(request.user).filter(status='completed').without_text()
+    # Uncached: the page count must match the rows even right after a
+    # completion or archive in another process.
+    task_stats = get_stats(request.user, cached=False)
+    completed_tasks = completed_tasks.select_related('assigned_to').order_by('-updated_at', '-id')
+    # The counters cover both tiers, so the archive is only read once the
+    # pages run past the hot rows.
+    archived = archive.archived_reports(request.user).select_related('assigned_to').order_by('-updated_at', '-id')
+    page_obj = paginate(request, archive.TieredResults(completed_tasks, archived), count=task_stats['completed_count'])
     
     return render(request, 'admin/reports_list.html', {
-        'completed_tasks': completed_tasks,
-        'total_hours': total_hours
+        'completed_tasks': page_obj,
+        'page_obj': page_obj,
+        'total_count': task_stats['completed_count'],
+        'total_hours': task_stats['worked_hours'],
+    })
+
+@login_required
+def report_summary(request):
+    if not (request.user.is_superuser or getattr(request.user, 'role', None) == 'admin'):
+        return redirect('login')
+    
+    form = ReportSummaryForm(request.GET or None)
+    rows, total = [], None
+    if form.is_bound and form.is_valid():
+        data = form.cleaned_data
+        # Dates are inclusive in the form; the reporting query takes [start, end).
+        start = timezone.make_aware(datetime.combine(data['start'], time.min)) if data['start'] else None
+        end = timezone.make_aware(datetime.combine(data['end'] + timedelta(days=1), time.min)) if data['end'] else None
+        tiers = reports.completed_tasks(request.user, start, end)
+        rows = reports.worked_hours_summary(tiers, data['group_by'] or None, data['period'] or None)
+        total = reports.totals(tiers)
+    elif not form.is_bound:
+        tiers = reports.completed_tasks(request.user)
+        rows = reports.worked_hours_summary(tiers, 'user')
+        total = reports.totals(tiers)
+    
+    return render(request, 'admin/report_summary.html', {
+        'form': form,
+        'rows': rows,
+        'total': total,
     })
 
 @login_required
@@ -203,7 +267,9 @@ def report_detail(request, task_id):
     if not (request.user.is_superuser or getattr(request.user, 'role', None) == 'admin'):
         return redirect('login')
     
-    task = get_object_or_404(Task, id=task_id, status='completed')
+    task = Task.objects.select_related('assigned_to').filter(id=task_id, status='completed').first()
+    if task is None:
+        task = get_object_or_404(ArchivedTask.objects.select_related('assigned_to'), id=task_id)
     return render(request, 'admin/report_detail.html', {'task': task})
 
 @login_required
@@ -249,9 +315,16 @@ def delete_admin(request, admin_id):
         return redirect('login')
     
     admin_obj = get_object_or_404(User, id=admin_id, role='admin')
-    admin_obj.delete()
-    messages.success(request, 'Admin deleted successfully')
-    return redirect('admins_list')
+    if admin_obj.id == request.user.id:
+        messages.error(request, 'You cannot delete yourself')
+        return redirect('admins_list')
+    
+    job, queued = queue_user_deletion(request, admin_obj)
+    if queued:
+        messages.success(request, f'Admin {admin_obj.username} is being deleted in the background')
+    else:
+        messages.error(request, f'Another job for {admin_obj.username} is still in progress')
+    return redirect('job_detail', job_id=job.id)
 
 @login_required
 def demote_admin(request, admin_id):
@@ -259,11 +332,35 @@ def demote_admin(request, admin_id):
         return redirect('login')
     
     admin_obj = get_object_or_404(User, id=admin_id, role='admin')
+    if admin_obj.managed_users.exists():
+        # A demoted admin would keep managing users nobody can see or edit.
+        messages.error(request, f'{admin_obj.username} still manages users; move them to another admin first')
+        return redirect(f"{reverse('reassign_users')}?from_admin={admin_obj.id}")
     admin_obj.role = 'user'
     admin_obj.save()
     messages.success(request, 'Admin demoted to user successfully')
     return redirect('admins_list')
 
+@login_required
+def reassign_users(request):
+    if not request.user.is_superuser:
+        return render(request, '403.html')
+    
+    if request.method == 'POST':
+        form = ReassignUsersForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            job, queued = jobs.queue_reassignment(data['from_admin'], data['to_admin'], data['user_ids'], user=request.user)
+            if queued:
+                messages.success(request, f'Moving users from {data["from_admin"].username} in the background')
+            else:
+                messages.error(request, f'Another job for {data["from_admin"].username} is still in progress')
+            return redirect('job_detail', job_id=job.id)
+    else:
+        form = ReassignUsersForm(initial={'from_admin': request.GET.get('from_admin')})
+    
+    return render(request, 'admin/reassign_users.html', {'form': form})
+
 @login_required
 def delete_task(request, task_id):
     if not request.user.is_superuser:
@@ -299,3 +396,84 @@ def assign_user_to_admin(request, user_id):
         'user_obj': user_obj,
         'admins': admins
     })
+
+# Jobs a superuser may start from the jobs page: kind -> button label.
+MAINTENANCE_JOBS = {
+    'rebuild_stats': 'Rebuild counters',
+    'compact_task_changes': 'Compact change log',
+    'archive_tasks': 'Archive old tasks',
+}
+
+@login_required
+def jobs_list(request):
+    if not request.user.is_superuser:
+        return render(request, '403.html')
+    
+    page_obj = paginate(request, Job.objects.select_related('created_by').order_by('-id'))
+    return render(request, 'admin/jobs_list.html', {
+        'jobs': page_obj,
+        'page_obj': page_obj,
+        'maintenance': MAINTENANCE_JOBS,
+    })
+
+@login_required
+@require_POST
+def start_job(request):
+    if not request.user.is_superuser:
+        return render(request, '403.html')
+    
+    kind = request.POST.get('kind')
+    if kind not in MAINTENANCE_JOBS:
+        messages.error(request, 'Unknown job')
+        return redirect('jobs_list')
+    job = jobs.enqueue(kind, key=kind, user=request.user)
+    messages.success(request, f'{MAINTENANCE_JOBS[kind]} queued')
+    return redirect('job_detail', job_id=job.id)
+
+@login_required
+def job_detail(request, job_id):
+    if not request.user.is_superuser:
+        return render(request, '403.html')
+    
+    job = get_object_or_404(Job.objects.select_related('created_by'), id=job_id)
+    return render(request, 'admin/job_detail.html', {'job': job})
+
+@login_required
+@require_POST
+def retry_job(request, job_id):
+    if not request.user.is_superuser:
+        return render(request, '403.html')
+    
+    job = get_object_or_404(Job, id=job_id)
+    if jobs.retry(job):
+        messages.success(request, 'Job queued again')
+    else:
+        messages.error(request, 'Only failed jobs without another active run can be retried')
+    return redirect('job_detail', job_id=job.id)
+
+@login_required
+def performance(request):
+    if not request.user.is_superuser:
+        return render(request, '403.html')
+    
+    views = metrics.registry.snapshot()
+    for row in views:
+        peak = max(count for bound, count in row['buckets']) or 1
+        row['histogram'] = [
+            {'label': f'≤{bound * 1000:g} ms' if bound is not None else f'>{metrics.BUCKETS[-1] * 1000:g} ms',
+             'count': count, 'height': round(count * 100 / peak)}
+            for bound, count in row['buckets']
+        ]
+        for key in ('p50', 'p95', 'p99'):
+            row[key] *= 1000
+        for key in ('db', 'serialize', 'template'):
+            row[f'avg_{key}'] = row[key] * 1000 / row['count']
+        row['avg_queries'] = row['queries'] / row['count']
+    return render(request, 'admin/performance.html', {'views': views, 'samples': metrics.metrics_settings()['SAMPLES']})
+
+def prometheus_metrics(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (token and constant_time_compare(supplied, token)) and not request.user.is_superuser:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,110 @@
+"""
+Move old completed tasks from ``tasks_task`` into the ``ArchivedTask`` tier.
+
+The hot table then only holds open work and recent completions, which is
+all task lists, the sync feed and the panel task pages read. Reports read
+both tiers; see ``TieredResults`` and ``tasks.reports``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import bulk, changelog
+from .models import ArchivedTask, Task
+from .signals import invalidate_logged_scopes, task_state
+
+COPIED_FIELDS = [field.attname for field in Task._meta.concrete_fields]
+
+
+def archive_after_days():
+    return getattr(settings, 'TASK_ARCHIVE_AFTER_DAYS', 180)
+
+
+def cutoff(days=None):
+    return timezone.now() - timedelta(days=archive_after_days() if days is None else days)
+
+
+def archivable(before):
+    return Task.objects.filter(status='completed', updated_at__lt=before)
+
+
+def archive_batch(before, batch_size):
+    """
+    Move up to ``batch_size`` completed tasks last updated before ``before``
+    in one transaction; returns how many moved.
+
+    TaskStats already counts both tiers, so counters are untouched. The
+    tasks are logged as removed so sync clients and cached lists drop them.
+    """
+    with transaction.atomic():
+        tasks = list(archivable(before).select_for_update().order_by('id')[:batch_size])
+        if not tasks:
+            return 0
+        now = timezone.now()
+        ArchivedTask.objects.bulk_create([
+            ArchivedTask(archived_at=now, **{name: getattr(task, name) for name in COPIED_FIELDS})
+            for task in tasks
+        ])
+        # Nothing references Task, so skip the collector and the per-row
+        # delete signals, which would subtract the tasks from the counters.
+        bulk.delete_rows(Task, [task.pk for task in tasks])
+        invalidate_logged_scopes(changelog.record_changes([(task.pk, task_state(task), None) for task in tasks]))
+    return len(tasks)
+
+
+def archive_completed(before, batch_size=1000, progress=None):
+    """Archive everything ``archivable(before)`` in batches; ``progress(moved)`` runs after each one."""
+    moved = 0
+    while count := archive_batch(before, batch_size):
+        moved += count
+        if progress is not None:
+            progress(moved)
+    return moved
+
+
+def archived_reports(user):
+    """Archived tasks visible to ``user``; the large text columns load on first access."""
+    return ArchivedTask.objects.visible_to(user).without_text()
+
+
+class TieredResults:
+    """
+    Completed tasks from both tiers as one sliceable sequence, hot rows
+    first, for Paginator.
+
+    Only tasks older than the archive cutoff are ever archived, so listing
+    the archive after the hot rows keeps the combined ``-updated_at``
+    order. The archive is queried only for slices that reach past the hot
+    rows, so recent pages cost what they did before archiving existed.
+    """
+
+    def __init__(self, hot, archived, count=None):
+        self.hot = hot
+        self.archived = archived
+        self._count = count
+        self._hot_count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.hot.count() + self.archived.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('TieredResults only supports slices without a step')
+        start, stop = index.start or 0, index.stop
+        rows = list(self.hot[start:stop]) if self._hot_count is None or start < self._hot_count else []
+        if stop is not None and len(rows) == stop - start:
+            return rows
+        # The hot tier ended inside (or before) this slice.
+        if self._hot_count is None:
+            self._hot_count = start + len(rows) if rows else self.hot.count()
+        offset = max(start - self._hot_count, 0)
+        limit = None if stop is None else stop - start - len(rows)
+        archived = self.archived[offset:offset + limit] if limit is not None else self.archived[offset:]
+        return rows + list(archived)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('tasks/', async_views.task_list, name='async_task_list'),
+    path('tasks/events/', async_views.task_events, name='task_events'),
+    path('tasks/<int:pk>/', async_views.task_detail, name='async_task_detail'),
+    path('tasks/<int:pk>/report/', async_views.task_report, name='async_task_report'),
+]
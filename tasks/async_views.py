@@ -0,0 +1,144 @@
+# tasks/async_views.py
+"""
+Native async versions of the read/complete endpoints of TaskViewSet.
+
+DRF views are synchronous, so under ASGI each request otherwise holds a
+thread for its whole lifetime. These views authenticate, query and render
+on the event loop and reuse the DRF serializers, pagination and exception
+handling so responses match the sync API byte for byte.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, MethodNotAllowed, NotAuthenticated, PermissionDenied
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from users.authentication import aauthenticate
+from . import events
+from .models import LARGE_TEXT_FIELDS, ArchivedTask, Task
+from .fast_serializers import FastTaskSerializer
+from .pagination import TaskCursorPagination
+from .renderers import FastJSONRenderer
+from .serializers import TaskSerializer, TaskCompletionSerializer, TaskReportSerializer, requested_fields
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(FastJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+def async_api(methods, admin_only=False):
+    """
+    Wrap an async view with JWT authentication, the IsAuthenticated or
+    IsSuperAdminOrAdmin check and DRF-style error responses. The view gets
+    a DRF Request so serializers and pagination work unchanged.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise MethodNotAllowed(request.method)
+                result = await aauthenticate(request)
+                if result is None:
+                    raise NotAuthenticated()
+                user, token = result
+                if admin_only and not (user.is_superuser or getattr(user, 'role', None) == 'admin'):
+                    raise PermissionDenied()
+
+                api_request = Request(request, parsers=[JSONParser()])
+                api_request.user, api_request.auth = user, token
+                return await view(api_request, *args, **kwargs)
+            except Exception as exc:
+                if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                    exc.auth_header = JWTAuthentication().authenticate_header(request)
+                response = exception_handler(exc, {'request': request})
+                if response is None:
+                    raise
+                rendered = render(response.data, response.status_code)
+                for header, value in response.items():
+                    if header != 'Content-Type':
+                        rendered[header] = value
+                return rendered
+        return wrapper
+    return decorator
+
+
+def visible_tasks(request):
+    queryset = Task.objects.visible_to(request.user)
+    requested = requested_fields(request)
+    if requested:
+        skipped = [name for name in LARGE_TEXT_FIELDS if name not in requested]
+        if skipped:
+            queryset = queryset.defer(*skipped)
+    return queryset
+
+
+@async_api(['GET'])
+async def task_list(request):
+    paginator = TaskCursorPagination()
+    serializer = FastTaskSerializer(requested_fields(request))
+    page = await paginator.apaginate_queryset(serializer.values(visible_tasks(request), ('id', 'updated_at')), request)
+    return render(paginator.get_paginated_response(serializer.serialize(page)).data)
+
+
+@async_api(['GET', 'PUT', 'PATCH'])
+async def task_detail(request, pk):
+    task = await aget_object_or_404(visible_tasks(request), pk=pk)
+    if request.method == 'GET':
+        return render(TaskSerializer(task, context={'request': request}).data)
+
+    # Only completion is served here; other edits need the admin checks
+    # and validation of /api/tasks/{id}/.
+    if not isinstance(request.data, dict) or request.data.get('status') != 'completed':
+        return render({'error': 'Only completing a task is supported on this endpoint'}, status.HTTP_400_BAD_REQUEST)
+    serializer = TaskCompletionSerializer(task, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    await sync_to_async(complete_task)(task, serializer.validated_data)
+    return render(serializer.data)
+
+
+def complete_task(task, attrs):
+    # One write transaction for the task, counters and change log, as in
+    # TaskViewSet.update().
+    for name, value in attrs.items():
+        setattr(task, name, value)
+    with transaction.atomic():
+        task.save()
+
+
+@async_api(['GET'], admin_only=True)
+async def task_report(request, pk):
+    # select_related: lazy FK loads are not allowed from async code.
+    task = await Task.objects.visible_to(request.user).select_related('assigned_to').filter(pk=pk).afirst()
+    if task is None:
+        # Completed tasks past the archive cutoff live in the cold tier.
+        task = await aget_object_or_404(ArchivedTask.objects.visible_to(request.user).select_related('assigned_to'), pk=pk)
+    if task.status != 'completed':
+        return render({'error': 'Task not completed'}, status.HTTP_400_BAD_REQUEST)
+    return render(TaskReportSerializer(task).data)
+
+
+@async_api(['GET'])
+async def task_events(request):
+    """
+    Server-Sent Events stream of task changes in the caller's scope.
+
+    Reconnecting clients send the last ``id`` they saw as ``Last-Event-ID``
+    (or ``?last_event_id=``) and get the events they missed.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    response = StreamingHttpResponse(events.stream(request.user, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
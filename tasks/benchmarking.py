@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from .models import Task
+
+User = get_user_model()
+
+STATUSES = ['pending', 'in_progress', 'completed']
+
+
+def seed_tasks(admins=10, users_per_admin=50, tasks_per_user=20):
+    """Bulk-insert a realistic Users/Task hierarchy without hashing passwords."""
+    admin_rows = User.objects.bulk_create([
+        User(username=f'admin{i}', email=f'admin{i}@example.com', role='admin')
+        for i in range(admins)
+    ])
+    user_rows = User.objects.bulk_create([
+        User(username=f'user{a}_{i}', email=f'user{a}_{i}@example.com', role='user', admin=admin)
+        for a, admin in enumerate(admin_rows)
+        for i in range(users_per_admin)
+    ])
+    statuses = itertools.cycle(STATUSES)
+    Task.objects.bulk_create([
+        seeded_task(user, i, next(statuses))
+        for user in user_rows
+        for i in range(tasks_per_user)
+    ], batch_size=2000)
+    return admin_rows, user_rows
+
+
+def seeded_task(user, index, status):
+    task = Task(title=f'task {index}', description='seeded', assigned_to=user, status=status)
+    if status == 'completed':
+        task.completion_report = f'Finished task {index}; all checks passed.'
+        task.worked_hours = Decimal(index % 8) + Decimal('0.5')
+    return task
+
+
+@contextmanager
+def benchmark_database(verbosity=0, on_disk=False):
+    """
+    Run against a freshly migrated test database so benchmarks never touch real data.
+
+    ``on_disk`` puts a SQLite test database in a temporary file instead of
+    shared-cache memory, whose table locks fail concurrent writers at once
+    rather than waiting for them.
+    """
+    test_settings = connection.settings_dict['TEST']
+    saved_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as directory:
+        if on_disk and connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        try:
+            old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        finally:
+            test_settings['NAME'] = saved_name
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies):
+    return {
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+    }
+
+
+async def run_concurrently(request, concurrency, total):
+    """
+    Call ``request(n)`` ``total`` times from ``concurrency`` clients; returns
+    requests/sec and per-request latencies. Non-2xx responses abort the run.
+    """
+    remaining = iter(range(total))
+    latencies = []
+
+    async def client():
+        for n in remaining:
+            started = time.perf_counter()
+            status = await request(n)
+            latencies.append(time.perf_counter() - started)
+            if not 200 <= status < 300:
+                raise RuntimeError(f'Benchmark request failed with HTTP {status}')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return total / (time.perf_counter() - started), latencies
+
+
+async def wsgi_request(handler, pool, method, path, query='', headers=None, body=b''):
+    """Call a WSGI ``handler`` on ``pool``, as a threaded WSGI server would; returns the status."""
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    for name, value in (headers or {}).items():
+        key = name.upper().replace('-', '_')
+        environ[key if key == 'CONTENT_TYPE' else f'HTTP_{key}'] = value
+    result = {}
+
+    def call():
+        response = handler(environ, lambda status, headers: result.update(status=int(status.split()[0])))
+        b''.join(response)
+        response.close()
+
+    await asyncio.get_running_loop().run_in_executor(pool, call)
+    return result['status']
+
+
+async def asgi_request(handler, method, path, query='', headers=None, body=b''):
+    """Call an ASGI ``handler`` in this event loop; returns the status."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'content-length', str(len(body)).encode())] + [
+            (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+        ],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    disconnected = asyncio.Event()
+    result = {}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+
+    await handler(scope, receive, send)
+    disconnected.set()
+    return result['status']
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.cache import user_cache
+from users.tokens import publish_token_version
+
+from . import changelog, stats
+from .models import Task
+from .response_cache import response_cache, task_scopes
+from .signals import task_state, tasks_changed
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def max_items():
+    return getattr(settings, 'BULK_TASK_MAX_ITEMS', 1000)
+
+
+def assignable_users(user):
+    """Users ``user`` may assign tasks to; the same rule as the panel's TaskForm."""
+    users = User.objects.filter(role='user')
+    if not user.is_superuser:
+        users = users.filter(admin_id=user.pk)
+    return users
+
+
+def parse_id(value):
+    """``value`` as an integer id (JSON numbers or numeric strings), else None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_ids(values):
+    return {pk for pk in map(parse_id, values) if pk is not None}
+
+
+def load_assignees(user, ids):
+    """One query for every assignee referenced by a bulk payload, limited to the caller's scope."""
+    return assignable_users(user).in_bulk(parse_ids(ids))
+
+
+def create_tasks(validated_data):
+    tasks = [Task(**attrs) for attrs in validated_data]
+    with transaction.atomic():
+        Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+        tasks_changed.send(sender=Task, changes=[(task.pk, None, task_state(task)) for task in tasks])
+    return tasks
+
+
+def update_tasks(updates):
+    """Apply ``[(task, validated_attrs)]`` with batched UPDATEs in one transaction."""
+    # bulk_update() skips Model.save(), so auto_now has to be set by hand.
+    now = timezone.now()
+    fields = {'updated_at'}
+    changes = []
+    for task, attrs in updates:
+        old = task._stats_state
+        for name, value in attrs.items():
+            setattr(task, name, value)
+            fields.add(name)
+        task.updated_at = now
+        task._stats_state = task_state(task)
+        changes.append((task.pk, old, task._stats_state))
+
+    tasks = [task for task, attrs in updates]
+    with transaction.atomic():
+        Task.objects.bulk_update(tasks, sorted(fields), batch_size=BATCH_SIZE)
+        tasks_changed.send(sender=Task, changes=changes)
+    return tasks
+
+
+def delete_rows(model, pks):
+    """
+    Delete ``model`` rows by primary key with plain DELETE statements.
+
+    Skips the deletion collector and the per-row delete signals, so only use
+    it for tables nothing references, and account for the rows yourself.
+    """
+    connection = connections[router.db_for_write(model)]
+    table, column = (connection.ops.quote_name(name) for name in (model._meta.db_table, model._meta.pk.column))
+    pks = list(pks)
+    size = connection.features.max_query_params or len(pks) or 1
+    with connection.cursor() as cursor:
+        for start in range(0, len(pks), size):
+            batch = pks[start:start + size]
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(batch))})', batch)
+
+
+def assign_tasks(queryset, task_ids, assignee):
+    """Reassign the tasks in ``queryset`` with the given ids in a single UPDATE; returns the ids found."""
+    with transaction.atomic():
+        current = list(
+            queryset.filter(pk__in=task_ids)
+            .select_for_update(of=('self',))
+            .values_list('id', 'assigned_to_id', 'status', 'worked_hours')
+        )
+        found = [pk for pk, *state in current]
+        Task.objects.filter(pk__in=found).update(assigned_to=assignee, updated_at=timezone.now())
+        tasks_changed.send(sender=Task, changes=[
+            (pk, (assigned_to_id, status, hours), (assignee.pk, status, hours))
+            for pk, assigned_to_id, status, hours in current
+        ])
+    return found
+
+
+def move_users(user_ids, old_admin_id, new_admin_id):
+    """
+    Move the users in ``user_ids`` still managed by ``old_admin_id`` to
+    ``new_admin_id`` in one transaction; returns the ids moved.
+
+    Does what saving each user would (counters, change log, token versions,
+    cached users and responses) with a fixed number of queries per call, so
+    keep ``user_ids`` to a bounded batch.
+    """
+    with transaction.atomic():
+        moved = list(
+            User.objects.filter(pk__in=user_ids, admin_id=old_admin_id)
+            .select_for_update().values_list('id', flat=True)
+        )
+        if not moved:
+            return []
+        User.objects.filter(pk__in=moved).update(admin_id=new_admin_id, token_version=F('token_version') + 1)
+
+        totals = stats.assignee_totals(moved)
+        totals['users_count'] = len(moved)
+        deltas = {}
+        stats.merge(deltas, old_admin_id, totals, sign=-1)
+        stats.merge(deltas, new_admin_id, totals)
+        stats.apply_deltas(deltas)
+
+        changelog.record_user_move(moved, old_admin_id, new_admin_id)
+        response_cache.invalidate_on_commit(task_scopes(moved, [old_admin_id, new_admin_id]))
+        versions = list(User.objects.filter(pk__in=moved).values_list('id', 'token_version'))
+        transaction.on_commit(lambda: _publish_moves(versions))
+    return moved
+
+
+def _publish_moves(versions):
+    user_cache.delete(*[user_id for user_id, version in versions])
+    for user_id, version in versions:
+        publish_token_version(user_id, version)
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .models import Task, TaskChange
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+
+
+def page_size():
+    return getattr(settings, 'TASK_CHANGES_PAGE_SIZE', 500)
+
+
+def safety_lag():
+    """
+    Seconds a change row must have existed before it is served.
+
+    Ids are handed out at insert time but become visible at commit, so on a
+    backend with concurrent writers id N can commit after N+1. SQLite
+    serializes writers, so ids commit in order there and no lag is needed.
+    """
+    lag = getattr(settings, 'TASK_CHANGES_SAFETY_LAG', None)
+    if lag is None:
+        lag = 0 if connections[router.db_for_write(TaskChange)].vendor == 'sqlite' else 5
+    return lag
+
+
+def watermark():
+    """
+    First sequence that may still be overtaken by an uncommitted one, or
+    None when every visible row is safe to serve.
+
+    Rows younger than the safety lag are held back, and so is everything
+    after the oldest of them, so a cursor never moves past a change that
+    commits late. Write transactions must stay shorter than the lag.
+    """
+    lag = safety_lag()
+    if not lag:
+        return None
+    cutoff = timezone.now() - timedelta(seconds=lag)
+    return TaskChange.objects.filter(created_at__gt=cutoff).aggregate(first=Min('id'))['first']
+
+
+def record_changes(changes):
+    """
+    Log ``(task_id, old_state, new_state)`` triples built with task_state().
+
+    Runs inside the writing transaction so the log commits or rolls back
+    with the change itself. Returns the rows written.
+    """
+    assignees = {state[0] for task_id, old, new in changes for state in (old, new) if state is not None}
+    if not assignees:
+        return []
+    admins = dict(User.objects.filter(pk__in=assignees).values_list('id', 'admin_id'))
+    return TaskChange.objects.bulk_create([
+        TaskChange(task_id=task_id, assigned_to_id=assigned_to_id, admin_id=admins.get(assigned_to_id))
+        for task_id, old, new in changes
+        for assigned_to_id in {state[0] for state in (old, new) if state is not None}
+    ], batch_size=BATCH_SIZE)
+
+
+def record_user_move(user_ids, old_admin_id, new_admin_id):
+    """Users changed admin: every one of their tasks changes scope for both admins."""
+    tasks = Task.objects.filter(assigned_to_id__in=user_ids).values_list('id', 'assigned_to_id')
+    TaskChange.objects.bulk_create([
+        TaskChange(task_id=task_id, assigned_to_id=user_id, admin_id=admin_id)
+        for task_id, user_id in tasks.iterator(chunk_size=BATCH_SIZE)
+        for admin_id in (old_admin_id, new_admin_id)
+    ], batch_size=BATCH_SIZE)
+
+
+def scoped_log(user):
+    log = TaskChange.objects.all()
+    if user.is_superuser:
+        return log
+    if getattr(user, 'role', None) == 'admin':
+        return log.filter(admin_id=user.pk)
+    return log.filter(assigned_to_id=user.pk)
+
+
+def changed_since(user, since, limit):
+    """
+    Task ids in ``user``'s scope changed after sequence ``since``, oldest
+    change first, at most ``limit``. Returns ``(task_ids, next_token,
+    has_more)``; tasks the caller cannot see any more are tombstones.
+    Changes past the watermark() wait for a later call.
+    """
+    log = scoped_log(user).filter(id__gt=since)
+    first_unsafe = watermark()
+    if first_unsafe is not None:
+        log = log.filter(id__lt=first_unsafe)
+    rows = list(
+        log.values('task_id').annotate(seq=Max('id')).order_by('seq')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_token = rows[-1]['seq'] if rows else since
+    return [row['task_id'] for row in rows], next_token, has_more
+
+
+def compact(batch_size=5000, progress=None):
+    """
+    Delete rows superseded by a newer row for the same task and scope;
+    returns the count. ``progress(deleted)`` runs after each batch.
+    """
+    newer = TaskChange.objects.filter(
+        task_id=OuterRef('task_id'), assigned_to_id=OuterRef('assigned_to_id'), id__gt=OuterRef('id'),
+    )
+    # admin_id = admin_id is never true for NULLs, so those rows get their own pass.
+    superseded = [
+        TaskChange.objects.filter(admin_id__isnull=False).filter(Exists(newer.filter(admin_id=OuterRef('admin_id')))),
+        TaskChange.objects.filter(admin_id__isnull=True).filter(Exists(newer.filter(admin_id__isnull=True))),
+    ]
+    total = 0
+    for queryset in superseded:
+        ids = queryset.order_by('id').values_list('id', flat=True)
+        while batch := list(ids[:batch_size]):
+            total += TaskChange.objects.filter(pk__in=batch).delete()[0]
+            if progress is not None:
+                progress(total)
+    return total
@@ -0,0 +1,121 @@
+"""
+ETag/Last-Modified validators for task reads.
+
+Validators come from a cheap probe, never from the serialized body, so a
+matching ``If-None-Match`` is answered with a 304 before any serializer
+runs: the row's ``updated_at`` for single tasks, and for lists the
+caller's ScopeVersion, which moves on every change in the scope including
+deletions.
+"""
+import hashlib
+import time
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import ScopeVersion
+
+
+def cache_control():
+    return getattr(settings, 'API_CACHE_CONTROL', 'private, no-cache')
+
+
+def scope_key(user):
+    if user.is_superuser:
+        return 'all'
+    if getattr(user, 'role', None) == 'admin':
+        return f'admin:{user.pk}'
+    return f'user:{user.pk}'
+
+
+def make_etag(request, *parts):
+    # The full path covers ?fields=, cursors and page sizes, which all
+    # change the representation.
+    key = '|'.join(map(str, (request.get_full_path(), scope_key(request.user), *parts)))
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def scope_version(scope):
+    """
+    ``(version, updated_at)`` of ``scope``; ``(0, None)`` until its first bump.
+
+    Read with the normal routing: under replica_reads() the version comes
+    from the same replica as the rows it describes, and the bump commits
+    after them. Never writes, so concurrent first reads of a scope don't
+    contend for SQLite's write lock.
+    """
+    row = ScopeVersion.objects.filter(scope=scope).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+
+def bump_scope_versions(scopes):
+    """
+    Move every scope in ``scopes`` to a new version; run after the change commits.
+
+    A missing row starts at the current time in nanoseconds rather than 1,
+    so versions handed out before a database reset or rollback are not
+    reused.
+    """
+    scopes = sorted(set(scopes))
+    db = router.db_for_write(ScopeVersion)
+    versions = ScopeVersion.objects.using(db)
+    with transaction.atomic(using=db):
+        # Locked in a fixed order: every bump includes 'all', and
+        # concurrent writers must not deadlock on it.
+        ids = list(versions.filter(scope__in=scopes).order_by('scope').select_for_update().values_list('id', flat=True))
+        versions.filter(id__in=ids).update(version=F('version') + 1, updated_at=timezone.now())
+        if len(ids) < len(scopes):
+            versions.bulk_create([ScopeVersion(scope=scope, version=time.time_ns()) for scope in scopes], ignore_conflicts=True)
+
+
+def list_validators(request):
+    """ETag and Last-Modified for a task list: the caller's scope version, so no task rows are read."""
+    version, updated_at = scope_version(scope_key(request.user))
+    return make_etag(request, version), updated_at
+
+
+def object_validators(request, queryset, pk, *fields):
+    """ETag and Last-Modified for one row; None if it is not in ``queryset`` (let the view 404)."""
+    try:
+        row = queryset.filter(pk=pk).values_list('updated_at', *fields).first()
+    except (TypeError, ValueError, ValidationError):
+        # A malformed pk; get_object() turns it into a 404.
+        return None
+    if row is None:
+        return None
+    return make_etag(request, *row), row[0]
+
+
+def respond(request, validators, build, use_last_modified=True):
+    """
+    Return a 304 when the client's validators match, otherwise ``build()``,
+    with ETag, Last-Modified and Cache-Control set on either.
+
+    ``use_last_modified=False`` ignores If-Modified-Since: HTTP dates have
+    one-second resolution, and a list can change twice within a second.
+    """
+    if validators is None:
+        return build()
+    etag, last_modified = validators
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp if use_last_modified else None,
+    )
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = cache_control()
+        patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,235 @@
+"""
+In-process pub/sub for task change events, consumed by the SSE stream.
+
+Events are published after commit from the model signals in
+``tasks.signals`` and kept in a ring buffer so a client reconnecting with
+``Last-Event-ID`` gets what it missed. Event ids are prefixed with a
+per-process epoch: an id from another process or from before a restart
+is answered with a ``reset`` event telling the client to refetch.
+
+While nobody is subscribed, changes are not serialized or buffered; they
+only use up an id, so a client resuming from before them is reset too.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+
+from users.cache import user_cache
+from . import stats
+from .models import Task
+from .serializers import TaskSerializer
+
+User = get_user_model()
+
+DEFAULTS = {
+    # Events kept for Last-Event-ID replay.
+    'BUFFER': 1000,
+    # Events queued per connection before a slow client is disconnected.
+    'QUEUE': 100,
+    # Seconds between keep-alive comments on an idle stream.
+    'KEEPALIVE': 15,
+    # Reconnect delay suggested to clients, in milliseconds.
+    'RETRY': 3000,
+}
+
+# ``users``/``admins``: ids whose scope includes the task, as in
+# Task.objects.visible_to(); superusers receive every event.
+Event = namedtuple('Event', 'id type task_id users admins data')
+
+
+def event_settings():
+    return {**DEFAULTS, **getattr(settings, 'TASK_EVENTS', {})}
+
+
+def admin_of(user_id):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user.admin_id
+    return User.objects.filter(pk=user_id).values_list('admin_id', flat=True).first()
+
+
+def audience(assigned_to_id, admins=None):
+    admin_id = admins[assigned_to_id] if admins and assigned_to_id in admins else admin_of(assigned_to_id)
+    return frozenset([assigned_to_id]), frozenset([admin_id] if admin_id else [])
+
+
+def task_payload(task):
+    return TaskSerializer(task).data
+
+
+def publish_change(task_id, old, new, data=None, admin_ids=None):
+    """
+    Publish one task change; ``old``/``new`` are task_state() tuples or
+    None. Subscribers that lose sight of a reassigned task get a
+    ``task.removed`` event instead of the update. ``admin_ids`` maps
+    assignee ids to their admin's, saving a lookup per call.
+    """
+    if not bus.subscriber_count():
+        bus.skip()
+        return
+    users, admins = audience(new[0], admin_ids) if new else (frozenset(), frozenset())
+    if old is not None and (new is None or old[0] != new[0]):
+        old_users, old_admins = audience(old[0], admin_ids)
+        if new is None:
+            users, admins = old_users, old_admins
+        elif old_users - users or old_admins - admins:
+            bus.publish('task.removed', task_id, old_users - users, old_admins - admins, None)
+    bus.publish(event_type(old, new), task_id, users, admins, data)
+
+
+def publish_bulk_changes(changes):
+    """
+    Publish ``(task_id, old, new)`` triples from a bulk write with one query
+    for the payloads and one for the assignees' admins.
+    """
+    if not bus.subscriber_count():
+        bus.skip()
+        return
+    tasks = list(Task.objects.in_bulk([task_id for task_id, old, new in changes if new is not None]).values())
+    payloads = dict(zip((task.pk for task in tasks), TaskSerializer(tasks, many=True).data))
+    admin_ids = stats.admin_ids_for(state[0] for _, old, new in changes for state in (old, new) if state)
+    for task_id, old, new in changes:
+        publish_change(task_id, old, new, payloads.get(task_id), admin_ids)
+
+
+def event_type(old, new):
+    if new is None:
+        return 'task.deleted'
+    if old is None:
+        return 'task.created'
+    if new[1] == 'completed' and old[1] != 'completed':
+        return 'task.completed'
+    return 'task.updated'
+
+
+class Subscription:
+    def __init__(self, user, loop):
+        self.user = user
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=event_settings()['QUEUE'])
+        self.overflowed = False
+
+    def matches(self, event):
+        if self.user.is_superuser:
+            # Superusers see every task, so nothing ever leaves their scope.
+            return event.type != 'task.removed'
+        if getattr(self.user, 'role', None) == 'admin':
+            return self.user.pk in event.admins
+        return self.user.pk in event.users
+
+    def push(self, event):
+        """Queue ``event`` from any thread; False once the subscriber's loop has closed."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            return False
+        return True
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client reconnects and replays from the buffer instead.
+            self.overflowed = True
+
+
+class EventBus:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=event_settings()['BUFFER'])
+        self._subscribers = set()
+        # Sequence of the last change published to nobody; ids before it
+        # cannot be resumed from.
+        self._skipped = 0
+
+    def publish(self, type, task_id, users, admins, data):
+        with self._lock:
+            event = Event(f'{self.epoch}-{next(self._ids)}', type, task_id, users, admins, data)
+            self._buffer.append(event)
+            subscribers = [subscriber for subscriber in self._subscribers if subscriber.matches(event)]
+        for subscriber in subscribers:
+            if not subscriber.push(event):
+                # Its loop closed without the stream's cleanup running.
+                self.unsubscribe(subscriber)
+        return event
+
+    def skip(self):
+        """Account for a change made while nobody was subscribed."""
+        with self._lock:
+            self._skipped = next(self._ids)
+            self._buffer.clear()
+
+    def subscribe(self, user, last_event_id=None):
+        """
+        Register a subscriber on the running loop. Returns it with the
+        buffered events after ``last_event_id``, or None as the backlog if
+        that id can no longer be resumed from.
+        """
+        subscription = Subscription(user, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+            backlog = [] if not last_event_id else self._since(last_event_id)
+        if backlog is not None:
+            backlog = [event for event in backlog if subscription.matches(event)]
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _since(self, last_event_id):
+        epoch, _, number = last_event_id.partition('-')
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        number = int(number)
+        if number < self._skipped:
+            return None
+        if self._buffer and number < sequence(self._buffer[0]) - 1:
+            return None
+        return [event for event in self._buffer if sequence(event) > number]
+
+
+def sequence(event):
+    return int(event.id.partition('-')[2])
+
+
+bus = EventBus()
+
+
+def format_event(event):
+    data = JSONRenderer().render({'id': event.task_id, **(event.data or {})}).decode()
+    return f'id: {event.id}\nevent: {event.type}\ndata: {data}\n\n'
+
+
+async def stream(user, last_event_id=None):
+    """SSE body: the resumed backlog, then live events until the client goes away."""
+    config = event_settings()
+    subscription, backlog = bus.subscribe(user, last_event_id)
+    try:
+        yield f'retry: {config["RETRY"]}\n\n'
+        if backlog is None:
+            yield f'event: reset\ndata: {json.dumps({"reason": "last_event_id_expired"})}\n\n'
+        else:
+            for event in backlog:
+                yield format_event(event)
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), config['KEEPALIVE'])
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        bus.unsubscribe(subscription)
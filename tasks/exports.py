@@ -0,0 +1,122 @@
+import csv
+import json
+from itertools import chain
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import ArchivedTask, Task
+
+# dataset -> (column, queryset lookup) pairs; mirrors TaskSerializer and
+# TaskReportSerializer so exports line up with the API payloads.
+DATASETS = {
+    'tasks': [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('assigned_to', 'assigned_to_id'),
+        ('due_date', 'due_date'),
+        ('status', 'status'),
+        ('completion_report', 'completion_report'),
+        ('worked_hours', 'worked_hours'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ],
+    'reports': [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('assigned_to_username', 'assigned_to__username'),
+        ('completion_report', 'completion_report'),
+        ('worked_hours', 'worked_hours'),
+        ('updated_at', 'updated_at'),
+    ],
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_queryset(dataset, user, start=None, end=None, model=Task):
+    queryset = model.objects.visible_to(user)
+    if dataset == 'reports':
+        queryset = queryset.filter(status='completed')
+    if start is not None:
+        queryset = queryset.filter(updated_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(updated_at__lt=end)
+    return queryset.order_by('id')
+
+
+def rows(queryset, dataset):
+    """
+    Yield plain value tuples for ``dataset``.
+
+    ``iterator()`` fetches in ``EXPORT_CHUNK_SIZE`` batches and uses a
+    server-side cursor where the backend supports one, so memory stays
+    flat however many rows match.
+    """
+    lookups = [lookup for column, lookup in DATASETS[dataset]]
+    return queryset.values_list(*lookups).iterator(chunk_size=chunk_size())
+
+
+def export_rows(dataset, user, start=None, end=None):
+    """Rows for ``dataset``; reports continue with the archived tier once the hot rows run out."""
+    querysets = [export_queryset(dataset, user, start, end)]
+    if dataset == 'reports':
+        querysets.append(export_queryset(dataset, user, start, end, model=ArchivedTask))
+    return chain.from_iterable(rows(queryset, dataset) for queryset in querysets)
+
+
+def convert(value):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to the caller."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(dataset, values):
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, lookup in DATASETS[dataset]])
+    yield from _batched(writer.writerow([convert(value) for value in row]) for row in values)
+
+
+def stream_ndjson(dataset, values):
+    columns = [column for column, lookup in DATASETS[dataset]]
+    yield from _batched(
+        json.dumps(dict(zip(columns, map(convert, row))), ensure_ascii=False, separators=(',', ':')) + '\n'
+        for row in values
+    )
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
+
+
+def _batched(lines):
+    # One write per row is a lot of tiny socket writes; group them so each
+    # chunk sent to the client is a few hundred rows.
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= 500:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
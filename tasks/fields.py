@@ -0,0 +1,91 @@
+"""
+Compressed storage for large text columns.
+
+Values are stored as binary with a one-byte header naming the codec, so
+the algorithm and level in ``TEXT_COMPRESSION`` can change at any time:
+existing rows keep decoding and new writes use the new setting. Values
+shorter than ``MIN_SIZE`` bytes are stored uncompressed.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for ALGORITHM='zstd'
+    zstandard = None
+
+DEFAULTS = {
+    'ALGORITHM': 'zlib',
+    'LEVEL': 6,
+    'MIN_SIZE': 128,
+}
+
+PLAIN, ZLIB, ZSTD = b'\x00', b'\x01', b'\x02'
+
+
+def compression_settings():
+    return {**DEFAULTS, **getattr(settings, 'TEXT_COMPRESSION', {})}
+
+
+def compress(text):
+    config = compression_settings()
+    data = text.encode()
+    if len(data) < config['MIN_SIZE'] or config['ALGORITHM'] == 'none':
+        return PLAIN + data
+    if config['ALGORITHM'] == 'zstd':
+        if zstandard is None:
+            raise ImproperlyConfigured("TEXT_COMPRESSION ALGORITHM 'zstd' requires the zstandard package")
+        packed = ZSTD + zstandard.ZstdCompressor(level=config['LEVEL']).compress(data)
+    elif config['ALGORITHM'] == 'zlib':
+        packed = ZLIB + zlib.compress(data, config['LEVEL'])
+    else:
+        raise ImproperlyConfigured(f"Unknown TEXT_COMPRESSION ALGORITHM {config['ALGORITHM']!r}")
+    # Text that does not shrink (already compressed, very short) stays plain.
+    return packed if len(packed) < len(data) + 1 else PLAIN + data
+
+
+def decompress(value):
+    value = bytes(value)
+    header, data = value[:1], value[1:]
+    if header == PLAIN:
+        return data.decode()
+    if header == ZLIB:
+        return zlib.decompress(data).decode()
+    if header == ZSTD:
+        if zstandard is None:
+            raise ImproperlyConfigured('Reading zstd-compressed text requires the zstandard package')
+        return zstandard.ZstdDecompressor().decompress(data).decode()
+    raise ValueError(f'Unknown compressed text header {header!r}')
+
+
+class CompressedTextField(models.TextField):
+    """
+    TextField stored compressed in a binary column.
+
+    Behaves like TextField everywhere above the database (forms, DRF,
+    ``values()``), but the column cannot be searched with text lookups.
+    """
+    description = 'Text (compressed)'
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decompress(value)
+        return super().to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return None
+        return connection.Database.Binary(compress(value))
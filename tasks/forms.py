@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from .models import Task
 
 User = get_user_model()
@@ -48,3 +49,43 @@ class AdminForm(forms.ModelForm):
             'username': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
         }
+
+class ReportSummaryForm(forms.Form):
+    group_by = forms.ChoiceField(choices=[('', 'Everyone'), ('user', 'Per user'), ('admin', 'Per admin')], required=False)
+    period = forms.ChoiceField(choices=[('', 'Whole range'), ('day', 'Daily'), ('week', 'Weekly'), ('month', 'Monthly')], required=False)
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+
+class ReassignUsersForm(forms.Form):
+    from_admin = forms.ModelChoiceField(queryset=User.objects.none(), label='Move users managed by')
+    to_admin = forms.ModelChoiceField(queryset=User.objects.none(), required=False, empty_label='-- No Manager --', label='To admin')
+    usernames = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 4}),
+        help_text='One username per line. Leave blank to move every user the admin manages.',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Former admins demoted before this page existed may still manage users.
+        self.fields['from_admin'].queryset = User.objects.filter(Q(role='admin') | Q(managed_users__isnull=False)).distinct()
+        self.fields['to_admin'].queryset = User.objects.filter(role='admin', is_active=True)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        from_admin, to_admin = cleaned_data.get('from_admin'), cleaned_data.get('to_admin')
+        if from_admin is None:
+            return cleaned_data
+        if to_admin == from_admin:
+            raise forms.ValidationError('Choose a different admin to move the users to.')
+
+        usernames = {name.strip() for name in cleaned_data.get('usernames', '').split() if name.strip()}
+        cleaned_data['user_ids'] = None
+        if usernames:
+            found = dict(User.objects.filter(admin=from_admin, username__in=usernames).values_list('username', 'id'))
+            missing = sorted(usernames - set(found))
+            if missing:
+                self.add_error('usernames', f'Not managed by {from_admin.username}: {", ".join(missing)}')
+            cleaned_data['user_ids'] = list(found.values())
+        return cleaned_data
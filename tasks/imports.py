@@ -0,0 +1,217 @@
+"""
+Streaming CSV/NDJSON imports for ``import_users`` and ``import_tasks``.
+
+Input is read one record at a time and written in batches. Each batch
+commits together with its ImportCheckpoint, so an interrupted run resumes
+after the last committed batch. Memory use is bounded by the batch size
+plus whatever lookup tables the command keeps (e.g. usernames to ids).
+"""
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ImportCheckpoint
+
+FORMATS = ('csv', 'ndjson')
+
+
+class InvalidRow(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def detect_format(path, file_format=None):
+    if file_format:
+        return file_format
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('json', 'jsonl', 'ndjson'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    raise ValueError(f'Cannot tell the format of {path!r}; pass --format csv or --format ndjson')
+
+
+def open_input(path):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(stream, file_format, skip=0):
+    """
+    Yield ``(line, record)`` pairs, after skipping the first ``skip``
+    records. ``line`` is the 1-based line of the record.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in itertools.islice(reader, skip, None):
+            # line_num is where the record ended; fine for single-line rows.
+            yield reader.line_num, {key: value for key, value in record.items() if key is not None}
+        return
+
+    read = 0
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        read += 1
+        if read <= skip:
+            continue
+        # Unparseable lines are passed on as InvalidRow, so --skip-invalid
+        # can skip them like any other bad row.
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            record = InvalidRow(line, f'invalid JSON: {exc}')
+        if not isinstance(record, (dict, InvalidRow)):
+            record = InvalidRow(line, 'expected a JSON object')
+        yield line, record
+
+
+def field(record, name):
+    """``record[name]`` with surrounding whitespace removed; None for a missing or empty value."""
+    value = record.get(name)
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value in ('', None) else value
+
+
+def load_checkpoint(name, resume=False, restart=False):
+    """Return the checkpoint to continue from, or raise ValueError if one is in the way."""
+    checkpoint, created = ImportCheckpoint.objects.get_or_create(name=name)
+    if created or restart:
+        checkpoint.rows_read = checkpoint.rows_imported = checkpoint.rows_skipped = 0
+        checkpoint.finished_at = None
+        checkpoint.save()
+        return checkpoint
+    if checkpoint.finished_at is not None:
+        raise ValueError(f'{name!r} was already imported on {checkpoint.finished_at:%Y-%m-%d %H:%M}; pass --restart to import it again')
+    if not resume:
+        raise ValueError(
+            f'{name!r} stopped after {checkpoint.rows_read} rows; pass --resume to continue or --restart to start over'
+        )
+    return checkpoint
+
+
+def run_import(checkpoint, records, prepare, write, batch_size, progress=None):
+    """
+    Import ``records`` in batches of ``batch_size`` ``(line, record)`` pairs.
+
+    ``prepare(batch) -> (items, skipped)`` validates and converts a batch
+    outside any transaction (password hashing and lookups belong here);
+    ``write(items) -> (imported, skipped)`` runs in the batch's
+    transaction, which also saves ``checkpoint``. ``progress(checkpoint,
+    rate)`` is called after every batch.
+    """
+    started, start_rows = time.monotonic(), checkpoint.rows_read
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+        items, invalid = prepare(batch)
+        with transaction.atomic():
+            imported, skipped = write(items) if items else (0, 0)
+            checkpoint.rows_read += len(batch)
+            checkpoint.rows_imported += imported
+            checkpoint.rows_skipped += invalid + skipped
+            checkpoint.save(update_fields=['rows_read', 'rows_imported', 'rows_skipped', 'updated_at'])
+        if progress is not None:
+            elapsed = time.monotonic() - started
+            progress(checkpoint, (checkpoint.rows_read - start_rows) / elapsed if elapsed else 0.0)
+
+    checkpoint.finished_at = timezone.now()
+    checkpoint.save(update_fields=['finished_at', 'updated_at'])
+    return checkpoint
+
+
+def clean(model, name, value, line):
+    """Run ``value`` through the model field's validation; InvalidRow on failure."""
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as exc:
+        raise InvalidRow(line, f'{name}: {" ".join(exc.messages)}')
+
+
+class ImportCommand(BaseCommand):
+    """
+    Shared options and loop for the import commands. Subclasses set
+    ``kind`` and implement ``build(line, record)`` (one record to an item,
+    raising InvalidRow) and ``write(items)``; ``prepare(items)`` may post-
+    process a validated batch before its transaction.
+    """
+    kind = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file, or '-' for standard input.")
+        parser.add_argument('--format', choices=FORMATS, help='Input format; defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per transaction.')
+        parser.add_argument('--checkpoint', help='Checkpoint name; defaults to one derived from the input path.')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted import after its last batch.')
+        parser.add_argument('--restart', action='store_true', help='Discard the checkpoint and start from the first row.')
+        parser.add_argument('--skip-invalid', action='store_true', help='Report and skip invalid rows instead of stopping.')
+        parser.add_argument('--progress-every', type=float, default=5.0, help='Seconds between progress lines.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        path = options['path']
+        try:
+            file_format = detect_format(path, options['format'])
+            name = options['checkpoint'] or f'{self.kind}:{"stdin" if path == "-" else os.path.abspath(path)}'
+            checkpoint = load_checkpoint(name, options['resume'], options['restart'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        self.setup()
+        if checkpoint.rows_read:
+            self.stdout.write(f'Resuming {name} after {checkpoint.rows_read} rows')
+        self.last_progress = time.monotonic()
+        with open_input(path) as stream:
+            records = read_records(stream, file_format, skip=checkpoint.rows_read)
+            try:
+                run_import(checkpoint, records, self.convert, self.write, options['batch_size'], self.progress)
+            except InvalidRow as exc:
+                raise CommandError(
+                    f'{exc}. Rows before its batch are imported; fix it and rerun with --resume, or use --skip-invalid.'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {checkpoint.rows_imported} {self.kind} from {checkpoint.rows_read} rows '
+            f'({checkpoint.rows_skipped} skipped)'
+        ))
+
+    def setup(self):
+        pass
+
+    def convert(self, batch):
+        items, invalid = [], 0
+        for line, record in batch:
+            try:
+                if isinstance(record, InvalidRow):
+                    raise record
+                items.append(self.build(line, record))
+            except InvalidRow as exc:
+                if not self.options['skip_invalid']:
+                    raise
+                self.stderr.write(f'Skipped {exc}')
+                invalid += 1
+        return self.prepare(items), invalid
+
+    def prepare(self, items):
+        return items
+
+    def progress(self, checkpoint, rate):
+        now = time.monotonic()
+        if now - self.last_progress >= self.options['progress_every']:
+            self.last_progress = now
+            self.stdout.write(
+                f'  {checkpoint.rows_read} rows read, {checkpoint.rows_imported} imported, '
+                f'{checkpoint.rows_skipped} skipped ({rate:.0f} rows/s)'
+            )
@@ -0,0 +1,318 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import archive, bulk, changelog, stats
+from .models import ArchivedTask, Job, Task
+from .signals import tasks_changed
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULTS = {
+    'CHUNK_SIZE': 1000,
+    # Seconds to sleep between chunk transactions so other writers, which on
+    # SQLite queue for a single database lock, get a turn.
+    'CHUNK_PAUSE': 0.05,
+    'MAX_ATTEMPTS': 3,
+    # Seconds before the first retry; doubled for each further attempt.
+    'RETRY_DELAY': 30,
+    'POLL_INTERVAL': 2,
+    'STALE_AFTER': 600,
+    # kind -> seconds between runs queued by the worker itself.
+    'SCHEDULE': {'archive_tasks': 86400},
+}
+
+# kind -> callable(job)
+HANDLERS = {}
+
+
+class JobLost(Exception):
+    """The job was reclaimed by another worker while this one was running it."""
+
+
+def job_settings():
+    return {**DEFAULTS, **getattr(settings, 'TASK_JOBS', {})}
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, params=None, key='', user=None):
+    """Queue a ``kind`` job, or return the active job already holding ``key``."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                kind=kind,
+                params=params or {},
+                key=key,
+                created_by_id=getattr(user, 'pk', None),
+                max_attempts=job_settings()['MAX_ATTEMPTS'],
+            )
+    except IntegrityError:
+        existing = Job.objects.filter(key=key, status__in=Job.ACTIVE).first() if key else None
+        if existing is None:
+            raise
+        return existing
+
+
+def retry(job):
+    """Queue a failed job again with a fresh set of attempts; False if ``key`` is taken."""
+    try:
+        with transaction.atomic():
+            updated = Job.objects.filter(pk=job.pk, status='failed').update(
+                status='queued', attempts=0, run_after=timezone.now(), error='', message='Retry requested',
+                finished_at=None,
+            )
+    except IntegrityError:
+        return False
+    return bool(updated)
+
+
+def requeue_stale(now):
+    """Hand jobs whose worker stopped heartbeating back to the queue, or fail them when out of attempts."""
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=now - timedelta(seconds=job_settings()['STALE_AFTER']))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, locked_by='', error='Worker stopped responding',
+    )
+    stale.update(status='queued', run_after=now, locked_by='', message='Worker stopped responding; requeued')
+
+
+def claim(worker):
+    """
+    Take the next due job for ``worker``, or return None.
+
+    The conditional UPDATE is the lock: if another worker got there first it
+    matches no row and the next candidate is tried. This works the same on
+    SQLite, which has no ``SELECT ... FOR UPDATE SKIP LOCKED``.
+    """
+    now = timezone.now()
+    requeue_stale(now)
+    candidates = (
+        Job.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:10]
+    )
+    for job_id in list(candidates):
+        claimed = Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', locked_by=worker, heartbeat_at=now, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def report(job, progress=None, total=None, message=None):
+    """Record progress and heartbeat; raises JobLost if another worker took the job over."""
+    fields = {'heartbeat_at': timezone.now()}
+    for name, value in (('progress', progress), ('total', total), ('message', message)):
+        if value is not None:
+            setattr(job, name, value)
+            fields[name] = value
+    if not Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(**fields):
+        raise JobLost(f'{job} is no longer held by {job.locked_by}')
+
+
+def run(job):
+    """Run a claimed job to completion, scheduling a retry or failing it on error."""
+    try:
+        func = HANDLERS.get(job.kind)
+        if func is None:
+            raise ValueError(f'Unknown job kind {job.kind!r}')
+        func(job)
+    except JobLost:
+        logger.warning('%s was reclaimed by another worker', job)
+        return job
+    except Exception:
+        logger.exception('%s failed (attempt %s of %s)', job, job.attempts, job.max_attempts)
+        fail(job, traceback.format_exc())
+    else:
+        finish(job)
+    return job
+
+
+def finish(job):
+    job.status, job.finished_at = 'succeeded', timezone.now()
+    if job.total is not None:
+        job.progress = job.total
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=job.status, finished_at=job.finished_at, progress=job.progress, locked_by='',
+    )
+
+
+def fail(job, error):
+    now = timezone.now()
+    job.error = error
+    if job.attempts < job.max_attempts and job.kind in HANDLERS:
+        delay = job_settings()['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        job.status, job.run_after = 'queued', now + timedelta(seconds=delay)
+        job.message = f'Attempt {job.attempts} failed; retrying in {delay}s'
+    else:
+        job.status, job.finished_at = 'failed', now
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=job.status, run_after=job.run_after, message=job.message, error=error,
+        finished_at=job.finished_at, locked_by='',
+    )
+
+
+def enqueue_scheduled(now=None):
+    """Queue each ``SCHEDULE`` job whose last run was queued more than its interval ago."""
+    now = now or timezone.now()
+    for kind, interval in job_settings()['SCHEDULE'].items():
+        if not interval:
+            continue
+        last = Job.objects.filter(kind=kind).order_by('-created_at').values_list('created_at', flat=True).first()
+        if last is None or last <= now - timedelta(seconds=interval):
+            enqueue(kind, key=kind)
+
+
+def work_once(worker):
+    """Claim and run one job; returns it, or None when nothing is due."""
+    job = claim(worker)
+    if job is not None:
+        run(job)
+    return job
+
+
+def delete_tasks(job, queryset):
+    """
+    Delete a Task or ArchivedTask ``queryset`` in chunks of ``CHUNK_SIZE``,
+    one transaction each, adding to the job's progress.
+
+    Each chunk holds write locks only briefly and a retry resumes where the
+    last committed chunk ended, so progress carries across attempts.
+    """
+    model, chunk_size = queryset.model, job_settings()['CHUNK_SIZE']
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('id').values_list('id', 'assigned_to_id', 'status', 'worked_hours')[:chunk_size])
+            if not rows:
+                return
+            # Nothing references either table, so skip the collector and its
+            # per-row signals and account for the chunk in one go, like the
+            # bulk endpoints do.
+            bulk.delete_rows(model, [row[0] for row in rows])
+            changes = [(pk, tuple(state), None) for pk, *state in rows]
+            if model is Task:
+                tasks_changed.send(sender=Task, changes=changes)
+            else:
+                # Archived tasks are only in the counters.
+                stats.record_task_changes(changes)
+        report(job, job.progress + len(rows))
+        pause()
+
+
+def pause():
+    delay = job_settings()['CHUNK_PAUSE']
+    if delay:
+        time.sleep(delay)
+
+
+def chunks(values):
+    size = job_settings()['CHUNK_SIZE']
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def managed_user_ids(admin_id):
+    return list(User.objects.filter(admin_id=admin_id).order_by('id').values_list('id', flat=True))
+
+
+@handler('delete_user')
+def delete_user(job):
+    """Delete a user or admin: their tasks in chunks, then the row itself."""
+    user = User.objects.filter(pk=job.params['user_id']).first()
+    if user is None:
+        report(job, message='Already deleted')
+        return
+    # Without this the delete cascades into one unbounded SET NULL update
+    # that also skips the counters and token versions.
+    for batch in chunks(managed_user_ids(user.pk)):
+        bulk.move_users(batch, user.pk, None)
+        report(job, message=f'Unassigning users managed by {user.username}')
+        pause()
+    tasks = Task.objects.filter(assigned_to_id=user.pk)
+    archived = ArchivedTask.objects.filter(assigned_to_id=user.pk)
+    report(job, job.progress, job.progress + tasks.count() + archived.count(), f'Deleting tasks of {user.username}')
+    delete_tasks(job, tasks)
+    delete_tasks(job, archived)
+    user.delete()
+    report(job, message=f'Deleted {user.username}')
+
+
+def queue_reassignment(from_admin, to_admin, user_ids=None, user=None):
+    """
+    Queue moving ``user_ids`` (default: everyone ``from_admin`` manages when
+    the job starts) to ``to_admin``, or to no admin when it is None.
+
+    Returns ``(job, queued)``; ``queued`` is False when another job for
+    ``from_admin`` is already active and was returned instead.
+    """
+    params = {
+        'from_admin_id': from_admin.pk,
+        'to_admin_id': getattr(to_admin, 'pk', None),
+        'user_ids': sorted(user_ids) if user_ids is not None else None,
+    }
+    job = enqueue('reassign_users', params, key=f'user:{from_admin.pk}', user=user)
+    return job, job.kind == 'reassign_users' and job.params == params
+
+
+@handler('reassign_users')
+def reassign_users(job):
+    """Move users between admins in ``CHUNK_SIZE`` batches; a retry resumes after the last batch reported."""
+    old, new = job.params['from_admin_id'], job.params['to_admin_id']
+    if job.params.get('user_ids') is None:
+        # Fix the set of users on the first run so progress and retries
+        # refer to the same list.
+        job.params['user_ids'] = managed_user_ids(old)
+        Job.objects.filter(pk=job.pk).update(params=job.params)
+    user_ids = job.params['user_ids']
+    target = User.objects.filter(pk=new).values_list('username', flat=True).first() if new else None
+    report(job, job.progress, len(user_ids), message=f'Moving users to {target or "no admin"}')
+    size = job_settings()['CHUNK_SIZE']
+    for start in range(job.progress, len(user_ids), size):
+        batch = user_ids[start:start + size]
+        bulk.move_users(batch, old, new)
+        report(job, start + len(batch))
+        pause()
+
+
+@handler('rebuild_stats')
+def rebuild_stats(job):
+    # One step, but several full-table aggregates: heartbeat between them so
+    # a long rebuild is not mistaken for a dead worker and run twice.
+    stats.rebuild_stats(progress=lambda: report(job))
+    report(job, message='Counters rebuilt')
+
+
+@handler('compact_task_changes')
+def compact_task_changes(job):
+    deleted = changelog.compact(batch_size=job_settings()['CHUNK_SIZE'], progress=lambda total: report(job))
+    report(job, message=f'Deleted {deleted} superseded change rows')
+
+
+@handler('archive_tasks')
+def archive_tasks(job):
+    days = job.params.get('days')
+    before = archive.cutoff(days)
+    done = job.progress
+    report(job, done, done + archive.archivable(before).count(), f'Archiving tasks completed before {before:%Y-%m-%d}')
+
+    def progress(moved):
+        report(job, done + moved)
+        pause()
+
+    archive.archive_completed(before, job_settings()['CHUNK_SIZE'], progress)
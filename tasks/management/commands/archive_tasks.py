@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from tasks import archive
+
+
+class Command(BaseCommand):
+    help = 'Move completed tasks older than TASK_ARCHIVE_AFTER_DAYS from the task table into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None, help='Age in days; defaults to TASK_ARCHIVE_AFTER_DAYS.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tasks moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many tasks would move.')
+
+    def handle(self, *args, **options):
+        before = archive.cutoff(options['older_than'])
+        pending = archive.archivable(before).count()
+        self.stdout.write(f'{pending} completed tasks last updated before {before:%Y-%m-%d %H:%M}')
+        if options['dry_run'] or not pending:
+            return
+
+        def progress(moved):
+            self.stdout.write(f'  {moved}/{pending}')
+
+        moved = archive.archive_completed(before, options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} tasks'))
@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from tasks.benchmarking import asgi_request, benchmark_database, percentile, run_concurrently, seed_tasks, wsgi_request
+from tasks.stats import rebuild_stats
+from users.tokens import RoleRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare sync WSGI and native async ASGI throughput for the task list endpoint at increasing '
+        'client concurrency, in process and against a throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100, 500], help='Concurrent clients to simulate.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per run.')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads (as in gunicorn --threads).')
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # On disk, so concurrent writes wait for SQLite's lock as in production.
+        with benchmark_database(on_disk=True):
+            admins, users = seed_tasks(admins=2, users_per_admin=20, tasks_per_user=25)
+            rebuild_stats()
+            token = str(RoleRefreshToken.for_user(admins[0]).access_token)
+            query = f'page_size={options["page_size"]}'
+
+            wsgi, asgi = WSGIHandler(), ASGIHandler()
+            pool = ThreadPoolExecutor(max_workers=options['threads'])
+            headers = {'Authorization': f'Bearer {token}'}
+            runs = [
+                ('wsgi', lambda n: wsgi_request(wsgi, pool, 'GET', '/api/tasks/', query, headers)),
+                ('asgi', lambda n: asgi_request(asgi, 'GET', '/api/async/tasks/', query, headers)),
+            ]
+            self.stdout.write(f'{"server":<6} {"clients":>7} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8}')
+            for concurrency in options['concurrency']:
+                for name, request in runs:
+                    rate, latencies = asyncio.run(run_concurrently(request, concurrency, options['requests']))
+                    self.stdout.write(
+                        f'{name:<6} {concurrency:>7} {rate:>9.1f} '
+                        f'{percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f}'
+                    )
+            pool.shutdown()
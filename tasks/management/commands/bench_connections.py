@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from tasks.benchmarking import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure database connection cost per request: a new connection per request (CONN_MAX_AGE=0), '
+        'a persistent connection, and the configured pool if any. Only runs SELECT 1.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per mode.')
+        parser.add_argument('--database', nargs='+', help='Aliases to measure (default: all configured).')
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or list(connections)
+        for alias in aliases:
+            if alias not in connections:
+                raise CommandError(f'Unknown database {alias!r}')
+
+        self.stdout.write(f'{"database":<12} {"mode":<12} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8}')
+        for alias in aliases:
+            connection = connections[alias]
+            pooled = bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+            saved = connection.settings_dict['CONN_MAX_AGE']
+            modes = [('pool', 0)] if pooled else [('per-request', 0), ('persistent', None)]
+            try:
+                for mode, max_age in modes:
+                    connection.settings_dict['CONN_MAX_AGE'] = max_age
+                    connection.close()
+                    rate, latencies = self.run(connection, options['requests'])
+                    self.stdout.write(
+                        f'{alias:<12} {mode:<12} {rate:>9.1f} '
+                        f'{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f}'
+                    )
+            finally:
+                connection.settings_dict['CONN_MAX_AGE'] = saved
+                connection.close()
+
+    def run(self, connection, total):
+        # request_started/request_finished run close_old_connections(), which
+        # is what closes or keeps the connection between real requests.
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(total):
+            began = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            latencies.append(time.perf_counter() - began)
+        return total / (time.perf_counter() - started), latencies
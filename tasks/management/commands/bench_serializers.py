@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from tasks.benchmarking import benchmark_database, seed_tasks
+from tasks.fast_serializers import FastTaskReportSerializer, FastTaskSerializer
+from tasks.models import Task
+from tasks.renderers import FastJSONRenderer, orjson
+from tasks.serializers import TaskReportSerializer, TaskSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/sec of the DRF task serializers with the values()-based read path, query to JSON bytes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Tasks to seed and serialize per run.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the best is reported.')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            users_needed = max(1, options['rows'] // 50)
+            seed_tasks(admins=1, users_per_admin=users_needed, tasks_per_user=50)
+            Task.objects.filter(id__in=list(Task.objects.order_by('id').values_list('id', flat=True))[::3]).update(
+                status='completed', completion_report='Finished ✓', worked_hours='3.25',
+            )
+            tasks = Task.objects.order_by('id')[:options['rows']]
+            reports = Task.objects.filter(status='completed').select_related('assigned_to').order_by('id')[:options['rows']]
+
+            fast_task, fast_report = FastTaskSerializer(), FastTaskReportSerializer()
+            variants = [
+                ('TaskSerializer', 'drf', lambda: JSONRenderer().render(TaskSerializer(list(tasks), many=True).data)),
+                ('TaskSerializer', 'fast', lambda: FastJSONRenderer().render(fast_task.serialize(fast_task.values(tasks)))),
+                ('TaskReportSerializer', 'drf', lambda: JSONRenderer().render(TaskReportSerializer(list(reports), many=True).data)),
+                ('TaskReportSerializer', 'fast', lambda: FastJSONRenderer().render(fast_report.serialize(fast_report.values(reports)))),
+            ]
+
+            self.stdout.write(f'json encoder: {"orjson" if orjson else "stdlib json"}')
+            self.stdout.write(f'{"serializer":<22} {"path":<5} {"rows":>6} {"rows/sec":>10} {"speedup":>8}')
+            baseline, output = {}, {}
+            for name, path, run in variants:
+                rows = (tasks if name == 'TaskSerializer' else reports).count()
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    output[name, path] = run()
+                    timings.append(time.perf_counter() - started)
+                rate = rows / min(timings)
+                baseline.setdefault(name, rate)
+                self.stdout.write(f'{name:<22} {path:<5} {rows:>6} {rate:>10.0f} {rate / baseline[name]:>7.1f}x')
+
+            for name in ('TaskSerializer', 'TaskReportSerializer'):
+                if output[name, 'drf'] != output[name, 'fast']:
+                    raise CommandError(f'{name}: fast path output differs from DRF')
+            self.stdout.write(self.style.SUCCESS('Fast path output is byte-identical to DRF'))
@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from task_manager.database import sqlite_options
+from tasks.benchmarking import benchmark_database, percentile, seed_tasks
+from tasks.models import Task
+from tasks.stats import rebuild_stats
+
+# Django's SQLite defaults (rollback journal, deferred transactions, 5 second
+# busy timeout), then the configured SQLITE_* settings without and with the
+# in-process write lock.
+MODES = {
+    'default': ('django.db.backends.sqlite3', None),
+    'tuned-no-lock': ('task_manager.sqlite', {'serialize_writes': False}),
+    'tuned': ('task_manager.sqlite', {}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Complete tasks from concurrent threads against a throwaway SQLite file and report writes/sec '
+        'and "database is locked" errors with Django\'s defaults and with the tuned SQLite settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help='Task completions per thread.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite.')
+        db = connections.settings['default']
+        saved = db['ENGINE'], db['OPTIONS']
+        tuned = getattr(settings, 'DATABASE_OPTIONS', {}).get('sqlite') or {}
+
+        # In-memory SQLite has no cross-connection locking to measure.
+        with benchmark_database(on_disk=True):
+            seed_tasks(admins=1, users_per_admin=options['threads'], tasks_per_user=20)
+            rebuild_stats()
+            ids = list(Task.objects.order_by('id').values_list('id', flat=True))
+
+            self.stdout.write(f'{"mode":<14} {"writes/s":>9} {"locked":>7} {"p50 ms":>8} {"p99 ms":>8}')
+            try:
+                for mode, (engine, overrides) in MODES.items():
+                    connections.close_all()
+                    db['ENGINE'] = engine
+                    if overrides is None:
+                        db['OPTIONS'] = {'init_command': 'PRAGMA journal_mode=DELETE'}
+                    else:
+                        db['OPTIONS'] = sqlite_options(**{**tuned, **overrides})
+                    rate, errors, latencies = self.run(ids, options['threads'], options['writes'])
+                    self.stdout.write(
+                        f'{mode:<14} {rate:>9.1f} {errors:>7} '
+                        f'{percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f}'
+                    )
+                connections.close_all()
+            finally:
+                db['ENGINE'], db['OPTIONS'] = saved
+
+    def run(self, ids, threads, writes):
+        results = []
+
+        def writer(index):
+            errors, latencies = 0, []
+            mine = ids[index::threads]
+            try:
+                for n in range(writes):
+                    began = time.perf_counter()
+                    try:
+                        # Read-modify-write in one transaction, as the
+                        # completion and bulk endpoints do.
+                        with transaction.atomic():
+                            task = Task.objects.get(pk=mine[n % len(mine)])
+                            task.status = 'completed' if task.status != 'completed' else 'in_progress'
+                            task.worked_hours = 1
+                            task.save()
+                        latencies.append(time.perf_counter() - began)
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connections.close_all()
+            results.append((errors, latencies))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(writer, range(threads)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for errors, samples in results for latency in samples]
+        return len(latencies) / elapsed, sum(errors for errors, samples in results), latencies
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from tasks import metrics
+from tasks.benchmarking import (
+    asgi_request, benchmark_database, run_concurrently, seed_tasks, summarize, wsgi_request,
+)
+from tasks.models import Task
+from tasks.stats import rebuild_stats
+from users.tokens import RoleRefreshToken
+
+PASSWORD = 'benchmark-password'
+DRIVERS = ('client', 'wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and drive the task API, login and panel list pages through the test client '
+        'and in-process WSGI/ASGI handlers; report throughput, latency percentiles and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admins', type=int, default=5)
+        parser.add_argument('--users', type=int, default=20, help='Users per admin.')
+        parser.add_argument('--tasks', type=int, default=20, help='Tasks per user.')
+        parser.add_argument('--requests', type=int, default=300, help='Requests per scenario and driver.')
+        parser.add_argument('--login-requests', type=int, default=30, help='Requests for the login scenario (password hashing is slow by design).')
+        parser.add_argument('--concurrency', type=int, default=10, help='Concurrent clients for the wsgi and asgi drivers.')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads.')
+        parser.add_argument('--drivers', nargs='+', choices=DRIVERS, default=list(DRIVERS))
+        parser.add_argument('--scenarios', nargs='+', help='Run only these scenarios.')
+        parser.add_argument('--cold', action='store_true', help='Run with the response cache disabled.')
+        parser.add_argument('--json', metavar='PATH', help="Also write results as JSON to PATH ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        # On disk, so concurrent writes wait for SQLite's lock as in production.
+        with benchmark_database(on_disk=True):
+            started = time.perf_counter()
+            admins, users = seed_tasks(options['admins'], options['users'], options['tasks'])
+            rebuild_stats()
+            fixtures = self.fixtures(admins, users)
+            seed_seconds = time.perf_counter() - started
+
+            scenarios = self.scenarios(fixtures, options)
+            names = options['scenarios'] or list(scenarios)
+            unknown = set(names) - set(scenarios)
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}. Choose from {", ".join(scenarios)}.')
+
+            self.stdout.write(
+                f'seeded {len(admins)} admins, {len(users)} users, {Task.objects.count()} tasks in {seed_seconds:.1f}s'
+            )
+            self.stdout.write(
+                f'{"scenario":<16} {"driver":<7} {"requests":>8} {"req/s":>9} '
+                f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8}'
+            )
+            results = []
+            handlers = {'wsgi': WSGIHandler(), 'asgi': ASGIHandler()}
+            with ExitStack() as stack:
+                pool = stack.enter_context(ThreadPoolExecutor(max_workers=options['threads']))
+                if options['cold']:
+                    stack.enter_context(self.without_response_cache())
+                for name in names:
+                    view, total, make_request = scenarios[name]
+                    for driver in options['drivers']:
+                        result = self.run(driver, handlers, pool, view, make_request, total, options)
+                        result.update(scenario=name, driver=driver, requests=total)
+                        results.append(result)
+                        self.stdout.write(
+                            f'{name:<16} {driver:<7} {total:>8} {result["rps"]:>9.1f} {result["p50"]:>8.2f} '
+                            f'{result["p95"]:>8.2f} {result["p99"]:>8.2f} {self.format_queries(result["queries"]):>8}'
+                        )
+
+            if options['json']:
+                self.write_json(options, results, seed_seconds)
+
+    def fixtures(self, admins, users):
+        superuser = admins[0].__class__.objects.create_superuser('bench-root', 'root@example.com', PASSWORD)
+        login_user = users[0]
+        login_user.set_password(PASSWORD)
+        login_user.save(update_fields=['password'])
+        worker = users[1]
+
+        client = Client()
+        client.force_login(superuser)
+        return {
+            'admin': {'Authorization': f'Bearer {RoleRefreshToken.for_user(admins[0]).access_token}'},
+            'worker': {'Authorization': f'Bearer {RoleRefreshToken.for_user(worker).access_token}'},
+            'session': {'Cookie': f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'},
+            'login_user': login_user.username,
+            'worker_tasks': list(Task.objects.filter(assigned_to=worker).order_by('id').values_list('id', flat=True)),
+            'reports': list(
+                Task.objects.visible_to(admins[0]).filter(status='completed').order_by('id').values_list('id', flat=True)
+            ),
+        }
+
+    def scenarios(self, fixtures, options):
+        """name -> (metrics view name, request count, request(n) -> (method, path, query, headers, body))."""
+        requests = options['requests']
+        json_headers = {**fixtures['worker'], 'Content-Type': 'application/json'}
+        completion = json.dumps({
+            'status': 'completed', 'completion_report': 'Benchmark completion', 'worked_hours': '1.50',
+        }).encode()
+        login = json.dumps({'username': fixtures['login_user'], 'password': PASSWORD}).encode()
+        tasks, reports = fixtures['worker_tasks'], fixtures['reports']
+        return {
+            'task_list': ('TaskViewSet.list', requests, lambda n: ('GET', '/api/tasks/', 'page_size=20', fixtures['admin'], b'')),
+            'task_complete': ('TaskViewSet.partial_update', requests, lambda n: (
+                'PATCH', f'/api/tasks/{tasks[n % len(tasks)]}/', '', json_headers, completion,
+            )),
+            'task_report': ('TaskViewSet.get_report', requests, lambda n: (
+                'GET', f'/api/tasks/{reports[n % len(reports)]}/report/', '', fixtures['admin'], b'',
+            )),
+            'login': ('LoginAPIView.post', options['login_requests'], lambda n: (
+                'POST', '/api/auth/login/', '', {'Content-Type': 'application/json'}, login,
+            )),
+            'panel_tasks': ('admin_views.manage_tasks', requests, lambda n: ('GET', '/panel/tasks/', '', fixtures['session'], b'')),
+            'panel_reports': ('admin_views.reports_list', requests, lambda n: ('GET', '/panel/reports/', '', fixtures['session'], b'')),
+            'panel_users': ('admin_views.manage_users', requests, lambda n: ('GET', '/panel/users/', '', fixtures['session'], b'')),
+        }
+
+    def run(self, driver, handlers, pool, view, make_request, total, options):
+        metrics.registry.reset()
+
+        if driver == 'client':
+            client = Client()
+            latencies = []
+            began = time.perf_counter()
+            for n in range(total):
+                method, path, query, headers, body = make_request(n)
+                started = time.perf_counter()
+                response = client.generic(
+                    method, f'{path}?{query}' if query else path, body,
+                    content_type=headers.get('Content-Type', 'application/octet-stream'), headers=headers,
+                )
+                latencies.append(time.perf_counter() - started)
+                if not 200 <= response.status_code < 300:
+                    raise CommandError(f'{method} {path} failed with HTTP {response.status_code}')
+            rate = total / (time.perf_counter() - began)
+        else:
+            def request(n):
+                method, path, query, headers, body = make_request(n)
+                if driver == 'wsgi':
+                    return wsgi_request(handlers['wsgi'], pool, method, path, query, headers, body)
+                return asgi_request(handlers['asgi'], method, path, query, headers, body)
+
+            try:
+                rate, latencies = asyncio.run(run_concurrently(request, options['concurrency'], total))
+            except RuntimeError as exc:
+                raise CommandError(f'{driver}: {exc}')
+
+        recorded = {row['view']: row for row in metrics.registry.snapshot()}.get(view)
+        return {
+            'rps': rate,
+            **{key: value * 1000 for key, value in summarize(latencies).items()},
+            # None when request metrics are disabled.
+            'queries': recorded['queries'] / recorded['count'] if recorded else None,
+        }
+
+    def without_response_cache(self):
+        # Every lookup misses and nothing is stored.
+        return override_settings(
+            CACHES={**settings.CACHES, 'benchmark-cold': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            TASK_RESPONSE_CACHE={**getattr(settings, 'TASK_RESPONSE_CACHE', {}), 'ALIAS': 'benchmark-cold'},
+        )
+
+    def format_queries(self, value):
+        return '-' if value is None else f'{value:.2f}'
+
+    def write_json(self, options, results, seed_seconds):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        report = {
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'machine': platform.machine(),
+            },
+            'parameters': {
+                key: options[key]
+                for key in ('admins', 'users', 'tasks', 'requests', 'login_requests', 'concurrency', 'threads', 'cold')
+            },
+            'seed_seconds': seed_seconds,
+            'results': results,
+        }
+        text = json.dumps(report, indent=2)
+        if options['json'] == '-':
+            sys.stdout.write(text + '\n')
+        else:
+            with open(options['json'], 'w') as output:
+                output.write(text + '\n')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.changelog import compact
+
+
+class Command(BaseCommand):
+    help = 'Delete TaskChange rows superseded by a newer change to the same task and scope.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        deleted = compact(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} superseded task changes'))
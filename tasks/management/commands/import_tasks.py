@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from tasks import bulk
+from tasks.imports import ImportCommand, InvalidRow, clean, field
+from tasks.models import Task
+
+User = get_user_model()
+
+
+class Command(ImportCommand):
+    help = (
+        'Stream tasks from a CSV or NDJSON file into the task table in batched inserts. Columns: title, '
+        'description, assigned_to (a username), and optionally due_date, status, completion_report, worked_hours. '
+        'Progress is checkpointed per batch, so an interrupted import can be continued with --resume.'
+    )
+    kind = 'tasks'
+
+    def setup(self):
+        # Usernames to ids for every assignable user, loaded once instead of
+        # one lookup per row. The same rule as the panel's TaskForm.
+        self.assignees = dict(User.objects.filter(role='user').values_list('username', 'id').iterator(chunk_size=10000))
+        self.stdout.write(f'{len(self.assignees)} assignable users')
+
+    def build(self, line, record):
+        username = field(record, 'assigned_to')
+        if username is None:
+            raise InvalidRow(line, 'assigned_to is required')
+        if username not in self.assignees:
+            raise InvalidRow(line, f'assigned_to: no user with role "user" named {username!r}')
+
+        attrs = {
+            'assigned_to_id': self.assignees[username],
+            'title': clean(Task, 'title', field(record, 'title'), line),
+            'description': clean(Task, 'description', field(record, 'description'), line),
+            'status': clean(Task, 'status', field(record, 'status') or 'pending', line),
+            'completion_report': clean(Task, 'completion_report', field(record, 'completion_report'), line),
+            'worked_hours': clean(Task, 'worked_hours', field(record, 'worked_hours') or 0, line),
+        }
+        due_date = clean(Task, 'due_date', field(record, 'due_date'), line)
+        if due_date is not None and timezone.is_naive(due_date):
+            due_date = timezone.make_aware(due_date)
+        attrs['due_date'] = due_date
+        return attrs
+
+    def write(self, items):
+        # create_tasks sends tasks_changed, which keeps TaskStats, the
+        # change log and cached responses in step.
+        return len(bulk.create_tasks(items)), 0
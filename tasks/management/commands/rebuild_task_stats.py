@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-admin TaskStats counters from the Task and Users tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admin', type=int, action='append', dest='admin_ids', help='Only rebuild the row for this admin id (repeatable).')
+
+    def handle(self, *args, **options):
+        rebuild_stats(options['admin_ids'])
+        scope = ', '.join(map(str, options['admin_ids'])) if options['admin_ids'] else 'all admins'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt task stats for {scope}'))
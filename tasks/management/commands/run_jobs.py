@@ -0,0 +1,41 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued and scheduled background jobs (user deletions, archiving, maintenance) until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling.')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after running this many jobs.')
+        parser.add_argument('--worker', default=None, help='Name recorded on claimed jobs; defaults to host:pid.')
+
+    def handle(self, *args, **options):
+        worker = options['worker'] or f'{socket.gethostname()}:{os.getpid()}'
+        poll_interval = jobs.job_settings()['POLL_INTERVAL']
+        count = 0
+        self.stdout.write(f'Worker {worker} waiting for jobs')
+        try:
+            while options['max_jobs'] is None or count < options['max_jobs']:
+                # A long-running worker is a long-running "request" as far as
+                # connection reuse goes; drop connections past CONN_MAX_AGE.
+                close_old_connections()
+                jobs.enqueue_scheduled()
+                job = jobs.work_once(worker)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                count += 1
+                style = self.style.SUCCESS if job.status == 'succeeded' else self.style.WARNING
+                self.stdout.write(style(f'{job}: {job.status} {job.message}'.rstrip()))
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted; a job left running is requeued once it goes stale')
+        self.stdout.write(f'Ran {count} jobs')
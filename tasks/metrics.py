@@ -0,0 +1,281 @@
+"""
+Per-view request metrics: wall time, database queries and query time, and
+time spent serializing and rendering templates.
+
+PerformanceMiddleware keeps the current request's counters in a context
+variable, so ORM calls an async view hands to a worker thread are counted
+too, and adds them to a per-process registry when the response is ready.
+Streaming bodies (exports, event streams) are not timed. The registry is
+served as Prometheus text at ``/metrics`` and on the panel's performance
+page.
+
+A ``TRACE_SAMPLE_RATE`` fraction of requests also records each SQL
+statement; sampled requests slower than ``SLOW_REQUEST_MS`` are logged.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_MS': 500,
+    'TRACE_SAMPLE_RATE': 0.0,
+    # Recent wall times kept per view for the panel's percentiles.
+    'SAMPLES': 1000,
+}
+
+# Histogram upper bounds in seconds (Prometheus' defaults).
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ('db', 'serialize', 'template')
+
+_current = ContextVar('request_stats', default=None)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db', 'serialize', 'template', 'trace')
+
+    def __init__(self, trace=False):
+        self.queries = 0
+        self.db = self.serialize = self.template = 0.0
+        self.trace = [] if trace else None
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in this block to ``phase`` of the current request."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, phase, getattr(stats, phase) + time.perf_counter() - started)
+
+
+def track_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        stats.queries += 1
+        stats.db += duration
+        if stats.trace is not None:
+            stats.trace.append((duration, sql))
+
+
+@receiver(connection_created)
+def install_query_tracker(sender, connection, **kwargs):
+    # Wrappers outlive reconnects of the same DatabaseWrapper.
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_query)
+
+
+def view_name(request):
+    """``TaskViewSet.list`` for DRF views, ``admin_views.manage_tasks`` for function views."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    if cls is not None:
+        method = request.method.lower()
+        actions = getattr(func, 'actions', None)
+        return f'{cls.__name__}.{actions.get(method, method) if actions else method}'
+    return f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}'
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ViewMetrics:
+    __slots__ = ('count', 'buckets', 'wall', 'queries', 'db', 'serialize', 'template', 'samples')
+
+    def __init__(self, samples):
+        self.count = self.queries = 0
+        self.wall = self.db = self.serialize = self.template = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.samples = deque(maxlen=samples)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, wall, stats):
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = ViewMetrics(metrics_settings()['SAMPLES'])
+            entry.count += 1
+            entry.buckets[bisect_left(BUCKETS, wall)] += 1
+            entry.wall += wall
+            entry.queries += stats.queries
+            entry.db += stats.db
+            entry.serialize += stats.serialize
+            entry.template += stats.template
+            entry.samples.append(wall)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        """One dict per view, busiest (by total wall time) first."""
+        with self._lock:
+            views = [
+                (view, entry.count, list(entry.buckets), entry.wall, entry.queries,
+                 entry.db, entry.serialize, entry.template, list(entry.samples))
+                for view, entry in self._views.items()
+            ]
+        results = []
+        for view, count, buckets, wall, queries, db, serialize, template, samples in views:
+            results.append({
+                'view': view,
+                'count': count,
+                'buckets': list(zip((*BUCKETS, None), buckets)),
+                'wall': wall,
+                'queries': queries,
+                'db': db,
+                'serialize': serialize,
+                'template': template,
+                'p50': percentile(samples, 0.5),
+                'p95': percentile(samples, 0.95),
+                'p99': percentile(samples, 0.99),
+            })
+        results.sort(key=lambda row: row['wall'], reverse=True)
+        return results
+
+    def prometheus(self):
+        lines = []
+        views = sorted(self.snapshot(), key=lambda row: row['view'])
+
+        lines += [
+            '# HELP task_manager_request_duration_seconds Wall time per request, by view.',
+            '# TYPE task_manager_request_duration_seconds histogram',
+        ]
+        for row in views:
+            label = _label(row['view'])
+            cumulative = 0
+            for bound, count in row['buckets']:
+                cumulative += count
+                le = '+Inf' if bound is None else repr(bound)
+                lines.append(f'task_manager_request_duration_seconds_bucket{{view="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'task_manager_request_duration_seconds_sum{{view="{label}"}} {row["wall"]!r}')
+            lines.append(f'task_manager_request_duration_seconds_count{{view="{label}"}} {row["count"]}')
+
+        counters = [
+            ('task_manager_request_db_queries_total', 'queries', 'Database queries run, by view.'),
+            ('task_manager_request_db_seconds_total', 'db', 'Time spent in database queries, by view.'),
+            ('task_manager_request_serialize_seconds_total', 'serialize', 'Time spent serializing and rendering API data, by view.'),
+            ('task_manager_request_template_seconds_total', 'template', 'Time spent rendering templates, by view.'),
+        ]
+        for name, key, help_text in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{view="{_label(row["view"])}"}} {row[key]!r}' for row in views]
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['TRACE_SAMPLE_RATE']
+        self.slow = config['SLOW_REQUEST_MS'] / 1000
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            return self.get_response(request)
+        finally:
+            self.finish(request, stats, token, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            return await self.get_response(request)
+        finally:
+            self.finish(request, stats, token, started)
+
+    def start(self):
+        stats = RequestStats(trace=self.sample_rate > 0 and random.random() < self.sample_rate)
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, stats, token, started):
+        wall = time.perf_counter() - started
+        _current.reset(token)
+        view = view_name(request)
+        registry.record(view, wall, stats)
+        if stats.trace is not None and wall >= self.slow:
+            log_trace(request, view, wall, stats)
+
+
+def log_trace(request, view, wall, stats):
+    slowest = sorted(stats.trace, key=lambda entry: entry[0], reverse=True)[:10]
+    logger.warning(
+        'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, serialize %.1f ms, templates %.1f ms\n%s',
+        request.method, request.get_full_path(), view, wall * 1000, stats.queries, stats.db * 1000,
+        stats.serialize * 1000, stats.template * 1000,
+        '\n'.join(f'  {duration * 1000:8.2f} ms  {sql}' for duration, sql in slowest),
+    )
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time counted per request."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # One row per existing task so `since=0` is a complete initial sync.
+    Task = apps.get_model('tasks', 'Task')
+    TaskChange = apps.get_model('tasks', 'TaskChange')
+    rows = Task.objects.order_by('id').values_list('id', 'assigned_to_id', 'assigned_to__admin_id').iterator(chunk_size=2000)
+    batch = []
+    for task_id, assigned_to_id, admin_id in rows:
+        batch.append(TaskChange(task_id=task_id, assigned_to_id=assigned_to_id, admin_id=admin_id))
+        if len(batch) >= 2000:
+            TaskChange.objects.bulk_create(batch)
+            batch = []
+    TaskChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_taskstats'),
+        ('users', '0002_users_admin_alter_users_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('assigned_to_id', models.BigIntegerField()),
+                ('admin_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['assigned_to_id', 'id'], name='taskchange_assignee_seq_idx'), models.Index(fields=['admin_id', 'id'], name='taskchange_admin_seq_idx'), models.Index(fields=['task_id', 'assigned_to_id', 'admin_id'], name='taskchange_task_scope_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+import sys
+
+from django.db import migrations, models
+
+import tasks.fields
+
+BATCH_SIZE = 1000
+MODELS = ('Task', 'ArchivedTask')
+
+
+def copy_text(apps, source, target, report=False):
+    for name in MODELS:
+        model = apps.get_model('tasks', name)
+        before = after = rows = 0
+        batch = []
+        values = model.objects.order_by('id').values_list('id', *source).iterator(chunk_size=BATCH_SIZE)
+        for pk, description, completion_report in values:
+            batch.append(model(id=pk, **dict(zip(target, (description, completion_report)))))
+            if report:
+                for text in (description, completion_report):
+                    if text is not None:
+                        before += len(text.encode())
+                        after += len(tasks.fields.compress(text))
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, target)
+                rows += len(batch)
+                batch = []
+        model.objects.bulk_update(batch, target)
+        rows += len(batch)
+        if report and rows:
+            sys.stdout.write(
+                f'\n  {name}: {rows} rows, description + completion_report '
+                f'{before / 1024:.1f} KiB -> {after / 1024:.1f} KiB ({after / (before or 1):.0%})'
+            )
+
+
+def compress_text(apps, schema_editor):
+    copy_text(apps, ('description', 'completion_report'), ('description_z', 'completion_report_z'), report=True)
+
+
+def decompress_text(apps, schema_editor):
+    copy_text(apps, ('description_z', 'completion_report_z'), ('description', 'completion_report'))
+
+
+class Migration(migrations.Migration):
+    """
+    Rewrite Task/ArchivedTask text columns as compressed binary.
+
+    Copying through new columns (rather than altering the type in place)
+    behaves the same on every backend and prints the storage before and
+    after for each table.
+    """
+
+    dependencies = [
+        ('tasks', '0007_archivedtask'),
+    ]
+
+    operations = [
+        *[
+            operation
+            for model in ('task', 'archivedtask')
+            for operation in (
+                migrations.AddField(model, 'description_z', tasks.fields.CompressedTextField(null=True)),
+                migrations.AddField(model, 'completion_report_z', tasks.fields.CompressedTextField(blank=True, null=True)),
+            )
+        ],
+        migrations.RunPython(compress_text, decompress_text),
+        *[
+            operation
+            for model in ('task', 'archivedtask')
+            for operation in (
+                # A default lets reversing re-add the column to existing rows
+                # before decompress_text fills it in.
+                migrations.AlterField(model, 'description', models.TextField(default='')),
+                migrations.RemoveField(model, 'description'),
+                migrations.RemoveField(model, 'completion_report'),
+                migrations.RenameField(model, 'description_z', 'description'),
+                migrations.RenameField(model, 'completion_report_z', 'completion_report'),
+                migrations.AlterField(model, 'description', tasks.fields.CompressedTextField()),
+            )
+        ],
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:09
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_global_rows(apps, schema_editor):
+    # Which duplicate holds the right totals is unknown; without any, the
+    # next read or update rebuilds the global row from the tables.
+    TaskStats = apps.get_model('tasks', 'TaskStats')
+    if TaskStats.objects.filter(admin__isnull=True).count() > 1:
+        TaskStats.objects.filter(admin__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_importcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_global_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taskstats',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('admin_id', models.Value(0), output_field=models.BigIntegerField()), condition=models.Q(('admin__isnull', True)), name='taskstats_single_global_row'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_taskstats_single_global_row'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskchange',
+            index=models.Index(fields=['created_at'], name='taskchange_created_idx'),
+        ),
+    ]
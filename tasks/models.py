@@ -1,5 +1,28 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+
+from .fields import CompressedTextField
+
+# Compressed, potentially large columns that list pages leave deferred.
+LARGE_TEXT_FIELDS = ('description', 'completion_report')
+
+
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Tasks ``user`` may see: all for superusers, managed users' for admins, otherwise their own."""
+        if user.is_superuser:
+            return self
+        # Filter on ids so token-claim users (no model instance) work too.
+        if getattr(user, 'role', None) == 'admin':
+            return self.filter(assigned_to__admin_id=user.pk)
+        return self.filter(assigned_to_id=user.pk)
+
+    def without_text(self):
+        """Defer LARGE_TEXT_FIELDS; they load from the database on first access."""
+        return self.defer(*LARGE_TEXT_FIELDS)
+
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -9,14 +32,222 @@ class Task(models.Model):
     ]
 
     title = models.CharField(max_length=255)
-    description = models.TextField()
+    description = CompressedTextField()
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='assigned_tasks')
     due_date = models.DateTimeField(null=True, blank=True)  
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    completion_report = models.TextField(blank=True, null=True)
+    completion_report = CompressedTextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     worked_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='task_updated_at_id_idx'),
+            models.Index(fields=['assigned_to', 'updated_at', 'id'], name='task_assignee_updated_idx'),
+            models.Index(fields=['status', 'assigned_to'], name='task_status_assignee_idx'),
+            models.Index(
+                fields=['assigned_to', 'updated_at'],
+                condition=models.Q(status='completed'),
+                name='task_completed_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
+
+
+class ArchivedTask(models.Model):
+    """
+    Cold tier for completed tasks, moved here by ``tasks.archive`` once they
+    are older than ``TASK_ARCHIVE_AFTER_DAYS``.
+
+    Rows keep their Task id and columns, so report queries and serializers
+    work on either table. Archived tasks still count towards TaskStats but
+    no longer appear in task lists or the sync feed.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = CompressedTextField()
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_tasks')
+    due_date = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES, default='completed')
+    completion_report = CompressedTextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    worked_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assigned_to', 'updated_at'], name='archivedtask_assignee_idx'),
+            models.Index(fields=['updated_at', 'id'], name='archivedtask_updated_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class TaskStats(models.Model):
+    """
+    Denormalised task counters per managing admin.
+
+    The row with ``admin=None`` holds the system-wide totals. Rows are kept
+    current by the signal handlers in ``tasks.signals`` and can be rebuilt
+    from scratch with ``manage.py rebuild_task_stats``.
+    """
+    admin = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='task_stats')
+    pending_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    # Hours reported on completed tasks.
+    worked_hours = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    users_count = models.IntegerField(default=0)
+    admins_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # NULLs never collide in a unique column, so the global row needs
+            # its own constraint: every admin=None row indexes as 0.
+            models.UniqueConstraint(
+                Coalesce('admin_id', models.Value(0), output_field=models.BigIntegerField()),
+                condition=models.Q(admin__isnull=True),
+                name='taskstats_single_global_row',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Stats for {self.admin or "all tasks"}'
+
+    @property
+    def tasks_count(self):
+        return self.pending_count + self.in_progress_count + self.completed_count
+
+
+class TaskChange(models.Model):
+    """
+    Append-only change log behind the incremental sync endpoint.
+
+    The auto-increment id is the sync sequence. A change writes one row per
+    scope it touches (assignee and their admin at that moment), so a
+    reassigned or deleted task still reaches the scope that lost it as a
+    tombstone. ``task_id`` is a plain column because rows outlive tasks.
+    """
+    task_id = models.BigIntegerField()
+    assigned_to_id = models.BigIntegerField()
+    admin_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assigned_to_id', 'id'], name='taskchange_assignee_seq_idx'),
+            models.Index(fields=['admin_id', 'id'], name='taskchange_admin_seq_idx'),
+            models.Index(fields=['task_id', 'assigned_to_id', 'admin_id'], name='taskchange_task_scope_idx'),
+            # The sync watermark looks up the youngest rows.
+            models.Index(fields=['created_at'], name='taskchange_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'Change {self.pk} of task {self.task_id}'
+
+
+class ScopeVersion(models.Model):
+    """
+    Change counter for one role scope (``all``, ``admin:<id>``, ``user:<id>``),
+    bumped after every commit that touches a task or user in it. List ETags
+    and cached response keys are built from it, so every process sees a
+    change as soon as it commits.
+    """
+    scope = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.scope} v{self.version}'
+
+
+class Job(models.Model):
+    """
+    Background operation queued from the panel and run by ``manage.py run_jobs``.
+
+    Handlers live in ``tasks.jobs`` and work in chunks, reporting
+    ``progress`` out of ``total`` as they go. A failed run is retried after
+    a delay until ``max_attempts`` is reached. Only one active job may hold
+    a given ``key`` (e.g. ``user:42``).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE = ('queued', 'running')
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Worker holding the job and its last heartbeat; a running job whose
+    # heartbeat is older than TASK_JOBS['STALE_AFTER'] is picked up again.
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status__in=['queued', 'running']) & ~models.Q(key=''),
+                name='job_active_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} job {self.pk}'
+
+    @property
+    def percent(self):
+        if self.status == 'succeeded':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, self.progress * 100 // self.total)
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE
+
+
+class ImportCheckpoint(models.Model):
+    """
+    How far an import_users/import_tasks run got through its input. Saved in
+    the same transaction as each batch, so a resumed run neither repeats nor
+    skips rows.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    rows_read = models.BigIntegerField(default=0)
+    rows_imported = models.BigIntegerField(default=0)
+    rows_skipped = models.BigIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
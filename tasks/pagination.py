@@ -0,0 +1,116 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (updated_at, id).
+
+    DRF's CursorPagination only seeks on the first ordering field and falls
+    back to OFFSET for ties, which degrades once many rows share the same
+    updated_at. Here the cursor position carries both columns so every page
+    is a single range scan on the (updated_at, id) index.
+    """
+    ordering = ('-updated_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        return self.set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views; the page is fetched with the async ORM."""
+        page = self.page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        return self.set_page([obj async for obj in page])
+
+    def page_queryset(self, queryset, request, view=None):
+        """Decode the cursor and return the unevaluated slice holding the page plus one row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*[self._flip(order) for order in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._seek(current_position, reverse))
+
+        self.offset, self.reverse, self.current_position = offset, reverse, current_position
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        offset, reverse, current_position = self.offset, self.reverse, self.current_position
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _flip(self, order):
+        return order[1:] if order.startswith('-') else '-' + order
+
+    def _seek(self, position, reverse):
+        timestamp, _, pk = position.rpartition('|')
+        updated_at = parse_datetime(timestamp)
+        if updated_at is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+
+        # Written as `updated_at <= ts AND (updated_at < ts OR id < pk)` so the
+        # leading column gives the planner a plain index range to scan.
+        descending = self.ordering[0].startswith('-')
+        lookup = 'lt' if reverse != descending else 'gt'
+        return (
+            Q(**{f'updated_at__{lookup}e': updated_at}) &
+            (Q(**{f'updated_at__{lookup}': updated_at}) | Q(**{f'id__{lookup}': int(pk)}))
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            updated_at, pk = instance['updated_at'], instance['id']
+        else:
+            updated_at, pk = instance.updated_at, instance.pk
+        return f'{updated_at.isoformat()}|{pk}'
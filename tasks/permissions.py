@@ -13,5 +13,5 @@ class IsOwnerOrAdmin(BasePermission):
         if request.user.is_superuser:
             return True
         if getattr(request.user, 'role', None) == 'admin' and hasattr(obj, 'assigned_to'):
-            return getattr(obj.assigned_to, 'admin', None) == request.user
-        return getattr(obj, 'assigned_to', None) == request.user
+            return getattr(obj.assigned_to, 'admin_id', None) == request.user.pk
+        return getattr(obj, 'assigned_to_id', None) == request.user.pk
@@ -0,0 +1,75 @@
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc
+
+from .models import ArchivedTask, Task
+
+PERIODS = ('day', 'week', 'month')
+
+# group_by -> {output key: queryset lookup}
+GROUPINGS = {
+    'user': {'user_id': 'assigned_to_id', 'username': 'assigned_to__username'},
+    'admin': {'admin_id': 'assigned_to__admin_id', 'admin_username': 'assigned_to__admin__username'},
+}
+
+
+def completed_tasks(user, start=None, end=None):
+    """
+    Completed tasks visible to ``user``, optionally limited to ``start <=
+    updated_at < end``, as one queryset per storage tier (hot, archived).
+    """
+    tiers = [Task.objects.visible_to(user).filter(status='completed'), ArchivedTask.objects.visible_to(user)]
+    if start is not None:
+        tiers = [queryset.filter(updated_at__gte=start) for queryset in tiers]
+    if end is not None:
+        tiers = [queryset.filter(updated_at__lt=end) for queryset in tiers]
+    return tiers
+
+
+def totals(tiers):
+    result = {'tasks': 0, 'hours': 0}
+    for queryset in tiers:
+        tier = queryset.aggregate(tasks=Count('id'), hours=Sum('worked_hours'))
+        result['tasks'] += tier['tasks']
+        result['hours'] += tier['hours'] or 0
+    return result
+
+
+def worked_hours_summary(tiers, group_by=None, period=None):
+    """
+    Task counts and summed worked hours, aggregated in the database.
+
+    ``group_by`` is ``'user'``, ``'admin'`` or None; ``period`` buckets
+    ``updated_at`` (the completion time) by ``'day'``, ``'week'`` or
+    ``'month'``. Each tier is aggregated separately and the groups merged.
+    Returns one dict per group/bucket, newest bucket first.
+    """
+    keys = {}
+    if period is not None:
+        if period not in PERIODS:
+            raise ValueError(f'Unknown period {period!r}')
+        keys['period'] = 'period'
+    if group_by is not None:
+        if group_by not in GROUPINGS:
+            raise ValueError(f'Unknown grouping {group_by!r}')
+        keys.update(GROUPINGS[group_by])
+
+    if not keys:
+        return [totals(tiers)]
+
+    merged = {}
+    for queryset in tiers:
+        if period is not None:
+            queryset = queryset.annotate(period=Trunc('updated_at', period, output_field=DateField()))
+        rows = queryset.order_by().values(*keys.values()).annotate(tasks=Count('id'), hours=Sum('worked_hours'))
+        for row in rows:
+            group = tuple(row[lookup] for lookup in keys.values())
+            entry = merged.setdefault(group, {**{key: row[lookup] for key, lookup in keys.items()}, 'tasks': 0, 'hours': 0})
+            entry['tasks'] += row['tasks']
+            entry['hours'] += row['hours']
+
+    results = list(merged.values())
+    # Grouping columns ascending (no admin last), then newest bucket first.
+    results.sort(key=lambda row: [(row[key] is None, row[key]) for key in keys if key != 'period'])
+    if period is not None:
+        results.sort(key=lambda row: row['period'], reverse=True)
+    return results
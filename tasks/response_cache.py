@@ -0,0 +1,131 @@
+"""
+Per-scope cache of task list/report responses.
+
+Keys combine the caller's role scope, that scope's current version and the
+request path, so invalidation is a version bump: entries for the old
+version are never read again and age out of the backend. Versions are the
+ScopeVersion rows in the database, bumped after commit by the handlers in
+``tasks.signals`` for every scope a Task or Users change touches, so a
+write in one process invalidates entries in all of them even when each
+keeps its own backend such as LocMemCache.
+
+Entries hold the response data together with its ETag/Last-Modified, so a
+hit can also answer conditional requests without touching the database.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from . import conditional
+from .routers import current_replica
+
+DEFAULTS = {
+    'ALIAS': 'task_responses',
+    'TTL': 300,
+}
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'TASK_RESPONSE_CACHE', {})}
+
+
+def user_scope(user):
+    return conditional.scope_key(user)
+
+
+def task_scopes(assignee_ids, admin_ids):
+    """Scopes that can see tasks assigned to ``assignee_ids`` managed by ``admin_ids``."""
+    scopes = {'all'}
+    scopes.update(f'user:{pk}' for pk in assignee_ids if pk is not None)
+    scopes.update(f'admin:{pk}' for pk in admin_ids if pk is not None)
+    return scopes
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    @property
+    def backend(self):
+        return caches[cache_settings()['ALIAS']]
+
+    def version(self, scope):
+        # A read only: a scope that was never bumped is version 0, and its
+        # row is created by the first invalidation.
+        return conditional.scope_version(scope)[0]
+
+    def invalidate(self, *scopes):
+        if scopes:
+            conditional.bump_scope_versions(scopes)
+
+    def invalidate_on_commit(self, scopes):
+        scopes = tuple(scopes)
+        transaction.on_commit(lambda: self.invalidate(*scopes))
+
+    def key(self, request, name):
+        scope = user_scope(request.user)
+        path = hashlib.sha1(f'{request.get_host()}{request.get_full_path()}'.encode()).hexdigest()
+        return f'task-responses:{name}:{scope}:{self.version(scope)}:{path}'
+
+    def get(self, key, name):
+        entry = self.backend.get(key)
+        with self._lock:
+            (self.misses if entry is None else self.hits)[name] += 1
+        return entry
+
+    def set(self, key, entry):
+        ttl = cache_settings()['TTL']
+        if current_replica():
+            # Built from a replica that may lag behind the invalidation.
+            ttl = min(ttl, getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 5))
+        self.backend.set(key, entry, ttl)
+
+    def metrics(self):
+        with self._lock:
+            names = sorted(set(self.hits) | set(self.misses))
+            views = {}
+            for name in names:
+                total = self.hits[name] + self.misses[name]
+                views[name] = {
+                    'hits': self.hits[name],
+                    'misses': self.misses[name],
+                    'hit_rate': round(self.hits[name] / total, 4) if total else 0.0,
+                }
+        return {
+            'hits': sum(view['hits'] for view in views.values()),
+            'misses': sum(view['misses'] for view in views.values()),
+            'views': views,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def respond(request, name, probe, build, use_last_modified=True):
+    """
+    Serve ``name`` for this request from the cache, else ``build()`` it and
+    store the data of a 200. ``probe()`` returns conditional validators and
+    only runs on a miss.
+    """
+    key = response_cache.key(request, name)
+    entry = response_cache.get(key, name)
+    if entry is not None:
+        validators, data = entry
+        return conditional.respond(request, validators, lambda: Response(data), use_last_modified)
+
+    validators = probe()
+
+    def build_and_store():
+        response = build()
+        if response.status_code == 200:
+            response_cache.set(key, (validators, response.data))
+        return response
+
+    return conditional.respond(request, validators, build_and_store, use_last_modified)
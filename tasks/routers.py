@@ -0,0 +1,50 @@
+"""
+Send selected reads to the read replicas in ``settings.DATABASE_REPLICAS``.
+
+Only code running under ``replica_reads()`` reads from a replica; the task
+list/detail and report endpoints opt in, while writes, authentication and
+everything that reads its own writes stay on ``default``.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica = ContextVar('replica', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def current_replica():
+    """The replica the current request reads from, or None."""
+    return _replica.get()
+
+
+@contextmanager
+def replica_reads():
+    """Route ORM reads in this block (or decorated view) to one replica."""
+    aliases = replicas()
+    token = _replica.set(random.choice(aliases) if aliases else None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as default.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in replicas()
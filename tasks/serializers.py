@@ -1,5 +1,8 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Task
+from .models import Job, Task
+
+User = get_user_model()
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,6 +10,67 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'assigned_to', 'due_date', 'status', 'completion_report', 'worked_hours', 'created_at', 'updated_at']
         read_only_fields = ('created_at', 'updated_at')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldsets (?fields=id,title,status) only apply to reads so a
+        # write can never silently drop validated fields.
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+class PreloadedUserField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves primary keys from ``context['assignees']`` (pk -> user) instead
+    of one query per value. Keys missing from the mapping are rejected as if
+    the user did not exist.
+    """
+    def to_internal_value(self, data):
+        assignees = self.context.get('assignees')
+        if assignees is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return assignees[int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+def require_completion_fields(attrs):
+    """Completing a task needs a report and hours, in partial updates too."""
+    if attrs.get('status') == 'completed':
+        missing = {
+            name: ['This field is required.']
+            for name in ('completion_report', 'worked_hours') if attrs.get(name) in (None, '')
+        }
+        if missing:
+            raise serializers.ValidationError(missing)
+    return attrs
+
+class BulkTaskSerializer(TaskSerializer):
+    assigned_to = PreloadedUserField(queryset=User.objects.all())
+
+    class Meta(TaskSerializer.Meta):
+        pass
+
+    def validate(self, attrs):
+        return require_completion_fields(attrs)
+
+class BulkAssignSerializer(serializers.Serializer):
+    task_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    assigned_to = PreloadedUserField(queryset=User.objects.all())
+
 class TaskCompletionSerializer(serializers.ModelSerializer):
     completion_report = serializers.CharField(required=True)
     worked_hours = serializers.DecimalField(max_digits=5, decimal_places=2, required=True)
@@ -20,9 +84,51 @@ class TaskCompletionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Status must be 'completed'")
         return value
 
+    def validate(self, attrs):
+        return require_completion_fields(attrs)
+
 class TaskReportSerializer(serializers.ModelSerializer):
     assigned_to_username = serializers.CharField(source='assigned_to.username', read_only=True)
     
     class Meta:
         model = Task
         fields = ['id', 'title', 'assigned_to_username', 'completion_report', 'worked_hours', 'updated_at']
+
+class DateRangeQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+class ReportSummaryQuerySerializer(DateRangeQuerySerializer):
+    group_by = serializers.ChoiceField(choices=['user', 'admin'], required=False)
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], required=False)
+
+class ReportSummarySerializer(serializers.Serializer):
+    period = serializers.DateField(required=False)
+    user_id = serializers.IntegerField(required=False)
+    username = serializers.CharField(required=False)
+    admin_id = serializers.IntegerField(required=False)
+    admin_username = serializers.CharField(required=False)
+    tasks = serializers.IntegerField()
+    hours = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class ReassignUsersSerializer(serializers.Serializer):
+    # Any user still managing others can be a source, including former admins.
+    from_admin = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    to_admin = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role='admin', is_active=True), allow_null=True)
+    users = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate(self, data):
+        if data['to_admin'] == data['from_admin']:
+            raise serializers.ValidationError({'to_admin': 'Must differ from from_admin.'})
+        if 'users' in data:
+            users = set(data['users'])
+            managed = set(User.objects.filter(pk__in=users, admin=data['from_admin']).values_list('pk', flat=True))
+            if users - managed:
+                raise serializers.ValidationError({'users': f'Not managed by from_admin: {sorted(users - managed)}'})
+            data['users'] = sorted(users)
+        return data
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'total', 'percent', 'message', 'error', 'attempts', 'max_attempts', 'run_after', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import changelog, events, stats
+from .models import Task
+from .response_cache import response_cache, task_scopes
+
+User = get_user_model()
+
+# Sent for Task writes that bypass Model.save()/delete(), such as the bulk
+# endpoints. ``changes`` is a list of ``(task_id, old_state, new_state)``
+# triples built with task_state(); None means created or deleted.
+tasks_changed = Signal()
+
+
+def task_state(instance):
+    # (assigned_to_id, status, worked_hours), or None if any is deferred.
+    values = instance.__dict__
+    if not all(name in values for name in ('assigned_to_id', 'status', 'worked_hours')):
+        return None
+    return (values['assigned_to_id'], values['status'], values['worked_hours'])
+
+
+def user_state(instance):
+    values = instance.__dict__
+    if not all(name in values for name in ('role', 'admin_id')):
+        return None
+    return (values['role'], values['admin_id'])
+
+
+def deleted_with_user(origin):
+    # Tasks only cascade from their assignee; those are accounted for in
+    # bulk by update_stats_on_user_delete.
+    return isinstance(origin, User) or (isinstance(origin, QuerySet) and origin.model is User)
+
+
+def stored_task_state(pk):
+    return Task.objects.filter(pk=pk).values_list('assigned_to_id', 'status', 'worked_hours').first()
+
+
+@receiver(post_init, sender=Task)
+def remember_task_state(sender, instance, **kwargs):
+    instance._stats_state = instance._event_state = task_state(instance)
+
+
+@receiver(pre_save, sender=Task)
+def load_deferred_task_state(sender, instance, raw=False, **kwargs):
+    # An instance loaded with a state field deferred has no old state to
+    # diff against; read it before the save overwrites the row.
+    if not raw and not instance._state.adding and instance._stats_state is None:
+        instance._stats_state = instance._event_state = stored_task_state(instance.pk)
+
+
+@receiver(pre_delete, sender=Task)
+def load_deleted_task_state(sender, instance, **kwargs):
+    # By post_delete the row is gone; read a deferred instance's state now.
+    instance._deleted_state = task_state(instance) or stored_task_state(instance.pk)
+
+
+def deleted_task_state(instance):
+    return getattr(instance, '_deleted_state', None) or task_state(instance)
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_task_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._stats_state
+    new = task_state(instance) or stored_task_state(instance.pk)
+    instance._stats_state = new
+    if old != new:
+        stats.record_task_changes([(instance.pk, old, new)])
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_task_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_user(origin):
+        return
+    state = deleted_task_state(instance)
+    if state is not None:
+        stats.record_task_changes([(instance.pk, state, None)])
+
+
+@receiver(tasks_changed)
+def update_stats_on_bulk_change(sender, changes, **kwargs):
+    stats.record_task_changes(changes)
+
+
+# The handlers below feed the sync change log in the writing transaction,
+# then publish to the SSE bus and invalidate cached responses once it
+# commits.
+
+
+def invalidate_logged_scopes(rows):
+    response_cache.invalidate_on_commit(task_scopes(
+        {row.assigned_to_id for row in rows}, {row.admin_id for row in rows},
+    ))
+
+
+@receiver(post_save, sender=Task)
+def track_task_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new = task_state(instance) or stored_task_state(instance.pk)
+    old = None if created else (instance._event_state or new)
+    instance._event_state = new
+    # Published even when the state is unchanged: title and description
+    # edits matter to clients too. With nobody listening, skip serializing
+    # (and loading any deferred fields); a subscriber arriving before the
+    # commit gets the event without a payload.
+    task_id = instance.pk
+    data = events.task_payload(instance) if events.bus.subscriber_count() else None
+    invalidate_logged_scopes(changelog.record_changes([(task_id, old, new)]))
+    transaction.on_commit(lambda: events.publish_change(task_id, old, new, data))
+
+
+@receiver(post_delete, sender=Task)
+def track_task_delete(sender, instance, **kwargs):
+    task_id, old = instance.pk, deleted_task_state(instance)
+    invalidate_logged_scopes(changelog.record_changes([(task_id, old, None)]))
+    transaction.on_commit(lambda: events.publish_change(task_id, old, None))
+
+
+@receiver(tasks_changed)
+def track_bulk_change(sender, changes, **kwargs):
+    invalidate_logged_scopes(changelog.record_changes(changes))
+    transaction.on_commit(lambda: events.publish_bulk_changes(changes))
+
+
+@receiver(post_init, sender=User)
+def remember_user_state(sender, instance, **kwargs):
+    instance._stats_state = user_state(instance)
+
+
+@receiver(pre_save, sender=User)
+def load_deferred_user_state(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding and instance._stats_state is None:
+        instance._stats_state = User.objects.filter(pk=instance.pk).values_list('role', 'admin_id').first()
+
+
+@receiver(post_save, sender=User)
+def update_stats_on_user_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._stats_state
+    new = user_state(instance) or User.objects.filter(pk=instance.pk).values_list('role', 'admin_id').first()
+    instance._stats_state = new
+    if old == new:
+        return
+
+    old_role, old_admin = old if old else (None, None)
+    role, admin_id = new
+    deltas = {}
+    if created:
+        stats.merge(deltas, admin_id, {'users_count': 1})
+    elif old_admin != admin_id:
+        changelog.record_user_move([instance.pk], old_admin, admin_id)
+        response_cache.invalidate_on_commit(task_scopes([instance.pk], [old_admin, admin_id]))
+        moved = stats.assignee_totals([instance.pk])
+        moved['users_count'] = 1
+        stats.merge(deltas, old_admin, moved, sign=-1)
+        stats.merge(deltas, admin_id, moved)
+    if (old_role == 'admin') != (role == 'admin'):
+        stats.merge(deltas, None, {'admins_count': 1 if role == 'admin' else -1})
+    stats.apply_deltas(deltas)
+
+
+@receiver(pre_delete, sender=User)
+def update_stats_on_user_delete(sender, instance, **kwargs):
+    removed = stats.assignee_totals([instance.pk])
+    removed['users_count'] = 1
+    deltas = {}
+    stats.merge(deltas, instance.admin_id, removed, sign=-1)
+    if instance.role == 'admin':
+        stats.merge(deltas, None, {'admins_count': 1}, sign=-1)
+    stats.apply_deltas(deltas)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, instance, update_fields=None, **kwargs):
+    # Usernames appear in reports; admin moves are handled with the stats
+    # above, where the previous admin is still known.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    response_cache.invalidate_on_commit(task_scopes([instance.pk], [instance.admin_id, instance.pk]))
@@ -0,0 +1,200 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import ArchivedTask, Task, TaskStats
+
+User = get_user_model()
+
+STATUS_COUNTERS = {
+    'pending': 'pending_count',
+    'in_progress': 'in_progress_count',
+    'completed': 'completed_count',
+}
+COUNTER_FIELDS = list(STATUS_COUNTERS.values()) + ['worked_hours', 'users_count', 'admins_count']
+
+# admin_id (None for the global row) -> (expires_at, values)
+_cache = {}
+
+
+def cache_ttl():
+    return getattr(settings, 'TASK_STATS_CACHE_TTL', 30)
+
+
+def invalidate(*admin_ids):
+    for admin_id in admin_ids:
+        _cache.pop(admin_id, None)
+
+
+def get_stats(user, cached=True):
+    """
+    Return the counters visible to ``user`` as a dict.
+
+    ``cached=False`` reads the row even if this process holds a fresh copy,
+    for callers that must agree with the rows they list, such as a page
+    count; other processes' writes only reach the cache after its TTL.
+    """
+    admin_id = None if user.is_superuser else user.pk
+    entry = _cache.get(admin_id) if cached else None
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    row = TaskStats.objects.filter(admin_id=admin_id).values(*COUNTER_FIELDS).first()
+    if row is None:
+        rebuild_stats(None if admin_id is None else [admin_id])
+        row = TaskStats.objects.filter(admin_id=admin_id).values(*COUNTER_FIELDS).first()
+    row['tasks_count'] = sum(row[field] for field in STATUS_COUNTERS.values())
+    _cache[admin_id] = (time.monotonic() + cache_ttl(), row)
+    return row
+
+
+def contribution(status, worked_hours):
+    """What a single task in the given state adds to its admin's counters."""
+    counter = STATUS_COUNTERS.get(status)
+    values = {counter: 1} if counter else {}
+    if status == 'completed':
+        values['worked_hours'] = Decimal(worked_hours or 0)
+    return values
+
+
+def merge(deltas, admin_id, values, sign=1):
+    target = deltas.setdefault(admin_id, {})
+    for field, value in values.items():
+        target[field] = target.get(field, 0) + sign * value
+
+
+def apply_deltas(deltas):
+    """
+    Apply ``{admin_id: {field: delta}}`` with F() updates.
+
+    Every delta is also added to the global row. Missing rows are rebuilt
+    from the tasks table, which already reflects the change being applied.
+    """
+    totals = {}
+    for admin_id, values in deltas.items():
+        merge(totals, None, values)
+        if admin_id is not None:
+            _apply(admin_id, values)
+    _apply(None, totals.get(None, {}))
+
+
+def _apply(admin_id, values):
+    values = {field: value for field, value in values.items() if value}
+    if not values:
+        return
+    updated = TaskStats.objects.filter(admin_id=admin_id).update(
+        **{field: F(field) + value for field, value in values.items()}
+    )
+    if not updated:
+        rebuild_stats(None if admin_id is None else [admin_id])
+    invalidate(admin_id)
+
+
+def record_task_changes(changes):
+    """
+    Apply counter deltas for ``(task_id, old_state, new_state)`` triples.
+
+    States are ``(assigned_to_id, status, worked_hours)`` tuples as built by
+    ``tasks.signals.task_state``; None stands for "did not exist".
+    """
+    assignees = {state[0] for _, old, new in changes for state in (old, new) if state}
+    admins = admin_ids_for(assignees)
+    deltas = {}
+    for _, old, new in changes:
+        if old:
+            merge(deltas, admins.get(old[0]), contribution(old[1], old[2]), sign=-1)
+        if new:
+            merge(deltas, admins.get(new[0]), contribution(new[1], new[2]))
+    apply_deltas(deltas)
+
+
+def admin_ids_for(user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+    return dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'admin_id'))
+
+
+def accumulate(values, status, count, hours):
+    counter = STATUS_COUNTERS.get(status)
+    if counter:
+        values[counter] = values.get(counter, 0) + count
+    if status == 'completed':
+        values['worked_hours'] = values.get('worked_hours', 0) + (hours or Decimal('0'))
+    return values
+
+
+def task_totals(*querysets):
+    """Aggregate Task (or ArchivedTask) querysets into counter values."""
+    values = {}
+    for queryset in querysets:
+        rows = queryset.order_by().values('status').annotate(count=Count('id'), hours=Sum('worked_hours'))
+        for row in rows:
+            accumulate(values, row['status'], row['count'], row['hours'])
+    return values
+
+
+def assignee_totals(user_ids):
+    """Counter values for every task, hot or archived, assigned to ``user_ids``."""
+    return task_totals(
+        Task.objects.filter(assigned_to_id__in=user_ids),
+        ArchivedTask.objects.filter(assigned_to_id__in=user_ids),
+    )
+
+
+def rebuild_stats(admin_ids=None, progress=None):
+    """
+    Recompute counters from the Task, ArchivedTask and Users tables.
+
+    With ``admin_ids=None`` every row, including the global one, is rebuilt
+    and rows for users who no longer manage anyone are dropped.
+    ``progress()`` runs between the aggregate queries, e.g. to heartbeat.
+    """
+    progress = progress or (lambda: None)
+    tiers = [Task.objects.order_by(), ArchivedTask.objects.order_by()]
+    users = User.objects.order_by()
+    if admin_ids is not None:
+        admin_ids = set(admin_ids)
+        tiers = [tasks.filter(assigned_to__admin_id__in=admin_ids) for tasks in tiers]
+        users = users.filter(admin_id__in=admin_ids)
+
+    if admin_ids is None:
+        rows = {admin_id: {} for admin_id in User.objects.filter(role='admin').values_list('pk', flat=True)}
+    else:
+        rows = {admin_id: {} for admin_id in admin_ids}
+    for tasks in tiers:
+        grouped = tasks.values('assigned_to__admin_id', 'status').annotate(count=Count('id'), hours=Sum('worked_hours'))
+        for row in grouped:
+            if row['assigned_to__admin_id'] is not None:
+                target = rows.setdefault(row['assigned_to__admin_id'], {})
+                accumulate(target, row['status'], row['count'], row['hours'])
+        progress()
+    for row in users.exclude(admin_id=None).values('admin_id').annotate(count=Count('id')):
+        rows.setdefault(row['admin_id'], {})['users_count'] = row['count']
+    progress()
+
+    stats = [
+        TaskStats(admin_id=admin_id, **{field: values.get(field, 0) for field in COUNTER_FIELDS})
+        for admin_id, values in rows.items()
+    ]
+    with transaction.atomic():
+        TaskStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['admin'],
+            update_fields=COUNTER_FIELDS,
+        )
+        if admin_ids is None:
+            TaskStats.objects.exclude(admin_id=None).exclude(admin_id__in=rows).delete()
+            global_values = task_totals(Task.objects.all(), ArchivedTask.objects.all())
+            global_values['users_count'] = User.objects.count()
+            global_values['admins_count'] = User.objects.filter(role='admin').count()
+            TaskStats.objects.update_or_create(
+                admin_id=None,
+                defaults={field: global_values.get(field, 0) for field in COUNTER_FIELDS},
+            )
+    invalidate(None, *rows)
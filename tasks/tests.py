@@ -1,3 +1,1309 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, router, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.db.utils import ConnectionHandler
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from task_manager.database import database_config
+from task_manager.sqlite.base import write_lock
+from users.tokens import RoleRefreshToken
+
+from . import archive, bulk, changelog, conditional, events, exports, jobs, metrics, reports, stats
+from .async_views import complete_task
+from .benchmarking import seed_tasks
+from .fast_serializers import FastTaskReportSerializer, FastTaskSerializer
+from .fields import compress
+from .models import ArchivedTask, ImportCheckpoint, Job, ScopeVersion, Task, TaskChange, TaskStats
+from .renderers import FastJSONRenderer
+from .response_cache import response_cache
+from .routers import replica_reads
+from .serializers import TaskReportSerializer, TaskSerializer
+from .signals import task_state
+from .stats import COUNTER_FIELDS, rebuild_stats
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """
+    Pin the indexes used by the hot Task/Users access paths.
+
+    A migration or query change that makes one of these fall back to a
+    full table scan fails here instead of in production.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Keep the planner honest on a table that still fits in a few pages.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f'Expected one of {index_names} in plan:\n{plan}',
+        )
+
+    def test_status_count(self):
+        self.assertUsesIndex(
+            Task.objects.filter(status='completed'),
+            'task_status_assignee_idx', 'task_completed_idx',
+        )
+
+    def test_completed_for_admin(self):
+        self.assertUsesIndex(
+            Task.objects.filter(status='completed', assigned_to__admin=self.admins[0]),
+            'task_status_assignee_idx', 'task_completed_idx',
+        )
+
+    def test_completed_for_user_by_date(self):
+        self.assertUsesIndex(
+            Task.objects.filter(status='completed', assigned_to=self.users[0]).order_by('-updated_at'),
+            'task_completed_idx',
+        )
+
+    def test_task_list_ordering(self):
+        self.assertUsesIndex(
+            Task.objects.order_by('-updated_at', '-id')[:50],
+            'task_updated_at_id_idx',
+        )
+
+    def test_user_task_list_ordering(self):
+        self.assertUsesIndex(
+            Task.objects.filter(assigned_to=self.users[0]).order_by('-updated_at', '-id')[:50],
+            'task_assignee_updated_idx',
+        )
+
+    def test_managed_users(self):
+        self.assertUsesIndex(
+            User.objects.filter(admin=self.admins[0], role='user'),
+            'users_admin_role_idx',
+        )
+
+    def test_admins(self):
+        self.assertUsesIndex(User.objects.filter(role='admin'), 'users_role_idx')
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Per-view ceilings on the number of SQL queries for the panel pages.
+
+    Budgets are independent of the number of rows on the page, so a
+    template that starts following a relation per row (an N+1) blows
+    through them straight away.
+    """
+    # Session + user lookup account for two queries on every page.
+    VIEW_BUDGETS = {
+        'dashboard': 3,
+        'tasks_list': 4,
+        'users_list': 4,
+        'admins_list': 4,
+        'reports_list': 4,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=3, users_per_admin=20, tasks_per_user=3)
+        cls.superuser = User.objects.create_superuser('root', 'root@example.com', 'password')
+
+    def assertWithinBudget(self, url_name, user):
+        self.client.force_login(user)
+        budget = self.VIEW_BUDGETS[url_name]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url_name} ran {len(queries)} queries (budget {budget}):\n' +
+            '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+
+    def test_superuser_pages(self):
+        for url_name in self.VIEW_BUDGETS:
+            with self.subTest(url_name):
+                self.assertWithinBudget(url_name, self.superuser)
+
+    def test_admin_pages(self):
+        for url_name in ['dashboard', 'tasks_list', 'reports_list']:
+            with self.subTest(url_name):
+                self.assertWithinBudget(url_name, self.admins[0])
+
+
+class TaskStatsTests(TestCase):
+    """Counters maintained by the signal handlers must equal a full rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=2, tasks_per_user=3)
+        rebuild_stats()
+
+    def assertCountersMatchRebuild(self):
+        def counters():
+            return list(TaskStats.objects.order_by('admin_id').values_list('admin_id', *COUNTER_FIELDS))
+        maintained = counters()
+        rebuild_stats()
+        self.assertEqual(maintained, counters())
+
+    def test_counters_follow_writes(self):
+        worker, other = self.users[0], self.users[-1]
+        with mock.patch('tasks.stats.rebuild_stats', wraps=rebuild_stats) as rebuild:
+            task = Task.objects.create(title='New', description='d', assigned_to=worker)
+            task.status, task.worked_hours = 'completed', Decimal('2.25')
+            task.save()
+            # Reassigned to a user of the other admin.
+            task.assigned_to = other
+            task.save()
+            # Loaded without its state fields.
+            deferred = Task.objects.only('title').get(pk=Task.objects.filter(assigned_to=worker, status='pending').values('pk')[:1])
+            deferred.status, deferred.worked_hours = 'completed', Decimal('1.50')
+            deferred.save()
+            Task.objects.only('id').get(pk=task.pk).delete()
+            worker.admin = self.admins[1]
+            worker.save()
+            self.assertFalse(rebuild.called)
+        self.assertCountersMatchRebuild()
+
+    def test_reports_page_ignores_stale_process_cache(self):
+        admin = self.admins[0]
+        fresh = stats.get_stats(admin)
+        # As if another worker had since completed every task of this admin.
+        Task.objects.filter(assigned_to__admin=admin).exclude(status='completed').update(
+            status='completed', completion_report='Done.', worked_hours=Decimal('1.00'),
+        )
+        rebuild_stats([admin.pk])
+        # This process still holds its copy from before those writes.
+        stats._cache[admin.pk] = (time.monotonic() + 60, fresh)
+        completed = Task.objects.filter(assigned_to__admin=admin, status='completed').count()
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse('reports_list'))
+        self.assertEqual(response.context['total_count'], completed)
+        self.assertEqual(response.context['page_obj'].paginator.count, completed)
+
+    def test_single_global_row(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TaskStats.objects.create(admin=None)
+        TaskStats.objects.filter(admin=None).delete()
+        self.assertEqual(stats.get_stats(User(is_superuser=True))['tasks_count'], Task.objects.count())
+        self.assertEqual(TaskStats.objects.filter(admin=None).count(), 1)
+
+
+class FastSerializerTests(TestCase):
+    """The values()-based read path must render exactly what DRF renders."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admins, users = seed_tasks(admins=1, users_per_admin=2, tasks_per_user=3)
+        Task.objects.filter(pk=Task.objects.order_by('id').values('id')[:1]).update(
+            title='Ünïcode \u2028 line \u2029 sep "quoted"', due_date=timezone.now(),
+            status='completed', completion_report='done ✓', worked_hours=Decimal('7.5'),
+        )
+
+    def test_task_rows_match_drf(self):
+        for only in [None, {'id', 'title', 'worked_hours', 'updated_at'}]:
+            with self.subTest(only=only):
+                fast = FastTaskSerializer(only)
+                drf = TaskSerializer(Task.objects.order_by('id'), many=True).data
+                if only:
+                    drf = [{name: value for name, value in row.items() if name in only} for row in drf]
+                self.assertEqual(
+                    FastJSONRenderer().render(fast.serialize(fast.values(Task.objects.order_by('id')))),
+                    JSONRenderer().render(drf),
+                )
+
+    def test_report_rows_match_drf(self):
+        fast = FastTaskReportSerializer()
+        tasks = Task.objects.filter(status='completed').order_by('id')
+        self.assertEqual(
+            FastJSONRenderer().render(fast.serialize(fast.values(tasks))),
+            JSONRenderer().render(TaskReportSerializer(tasks, many=True).data),
+        )
+
+
+class TaskListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=1, users_per_admin=2, tasks_per_user=6)
+        # Half the tasks share one updated_at, so pages must break ties on id.
+        tied = list(Task.objects.order_by('id').values_list('id', flat=True)[::2])
+        Task.objects.filter(pk__in=tied).update(updated_at=timezone.now() - timezone.timedelta(days=1))
+        cls.expected = list(Task.objects.visible_to(cls.admins[0]).order_by('-updated_at', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admins[0])
+
+    def test_pages_are_stable_across_equal_timestamps(self):
+        seen, pages = [], []
+        url = reverse('tasks-list') + '?page_size=5'
+        while url:
+            body = self.api.get(url).json()
+            pages.append(body)
+            seen += [task['id'] for task in body['results']]
+            url = body['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        # Walking back from the last page returns the same pages.
+        back, url = [], pages[-1]['previous']
+        while url:
+            body = self.api.get(url).json()
+            back = [task['id'] for task in body['results']] + back
+            url = body['previous']
+        self.assertEqual(back, self.expected[:10])
+
+    def test_fields_projection(self):
+        body = self.api.get(reverse('tasks-list'), {'fields': 'id,title,status', 'page_size': 2}).json()
+        self.assertEqual([set(task) for task in body['results']], [{'id', 'title', 'status'}] * 2)
+        self.assertEqual(body['results'][0]['id'], self.expected[0])
+        task = self.api.get(reverse('tasks-detail', args=[self.expected[0]]), {'fields': 'id,description'}).json()
+        self.assertEqual(set(task), {'id', 'description'})
+        # Writes always use every field.
+        self.assertEqual(self.api.patch(
+            reverse('tasks-detail', args=[self.expected[0]]) + '?fields=id', {'title': 'Renamed'}, format='json',
+        ).json()['title'], 'Renamed')
+
+
+class WorkedHoursReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser('root', 'root@example.com', 'password')
+        cls.boss = User.objects.create_user('boss', 'boss@example.com', 'password', role='admin')
+        cls.other_boss = User.objects.create_user('other', 'other@example.com', 'password', role='admin')
+        cls.ann = User.objects.create_user('ann', 'ann@example.com', 'password', role='user', admin=cls.boss)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'password', role='user', admin=cls.other_boss)
+        when = lambda day: timezone.datetime(2026, 3, day, 12, tzinfo=timezone.get_current_timezone())
+        # (assignee, completed on, hours); Monday 2 March and Wednesday 4
+        # March share a week, Tuesday 10 March starts the next one.
+        for user, day, hours in [(cls.ann, 2, '1.50'), (cls.ann, 4, '2.00'), (cls.ann, 10, '4.00'), (cls.bob, 4, '3.25')]:
+            task = Task.objects.create(
+                title='t', description='d', assigned_to=user, status='completed', worked_hours=Decimal(hours),
+            )
+            Task.objects.filter(pk=task.pk).update(updated_at=when(day))
+        Task.objects.create(title='open', description='d', assigned_to=cls.ann, worked_hours=Decimal('9'))
+        ArchivedTask.objects.create(
+            id=10_000, title='old', description='d', assigned_to=cls.ann, status='completed',
+            worked_hours=Decimal('0.50'), created_at=when(1), updated_at=when(2),
+        )
+
+    def test_groupings_and_buckets(self):
+        tiers = reports.completed_tasks(self.superuser)
+        self.assertEqual(reports.totals(tiers), {'tasks': 5, 'hours': Decimal('11.25')})
+        self.assertEqual(
+            [(row['username'], row['tasks'], row['hours']) for row in reports.worked_hours_summary(tiers, 'user')],
+            [(self.ann.username, 4, Decimal('8.00')), (self.bob.username, 1, Decimal('3.25'))],
+        )
+        self.assertEqual(
+            [(row['admin_username'], row['hours']) for row in reports.worked_hours_summary(tiers, 'admin')],
+            [('boss', Decimal('8.00')), ('other', Decimal('3.25'))],
+        )
+        self.assertEqual(
+            [(str(row['period']), row['tasks'], row['hours']) for row in reports.worked_hours_summary(tiers, period='week')],
+            [('2026-03-09', 1, Decimal('4.00')), ('2026-03-02', 4, Decimal('7.25'))],
+        )
+        by_day = reports.worked_hours_summary(tiers, 'user', 'day')
+        self.assertEqual(
+            [(str(row['period']), row['username'], row['tasks']) for row in by_day],
+            [('2026-03-10', 'ann', 1), ('2026-03-04', 'ann', 1), ('2026-03-04', 'bob', 1), ('2026-03-02', 'ann', 2)],
+        )
+        self.assertEqual(
+            [(str(row['period']), row['tasks']) for row in reports.worked_hours_summary(tiers, period='month')],
+            [('2026-03-01', 5)],
+        )
+
+    def test_summary_endpoint_is_scoped(self):
+        api = APIClient()
+        api.force_authenticate(self.boss)
+        body = api.get(reverse('report_summary_api'), {'group_by': 'user', 'start': '2026-03-03T00:00:00Z'}).json()
+        self.assertEqual(body['total'], {'tasks': 2, 'hours': '6.00'})
+        self.assertEqual([(row['username'], row['tasks']) for row in body['results']], [('ann', 2)])
+        self.assertEqual(api.get(reverse('report_summary_api'), {'period': 'year'}).status_code, 400)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create(username='boss', email='boss@example.com', role='admin')
+        cls.ann = User.objects.create(username='ann', email='ann@example.com', role='user', admin=cls.boss)
+        cls.bob = User.objects.create(username='bob', email='bob@example.com', role='user')
+        cls.tasks = [
+            Task.objects.create(title='Quote, "comma"', description='line one\nline two', assigned_to=cls.ann),
+            Task.objects.create(
+                title='Done', description='d', assigned_to=cls.ann, status='completed',
+                completion_report='Ünïcode report', worked_hours=Decimal('2.50'),
+            ),
+            Task.objects.create(title='Not mine', description='d', assigned_to=cls.bob),
+        ]
+        cls.archived = ArchivedTask.objects.create(
+            id=10_000, title='Archived', description='d', assigned_to=cls.ann, status='completed',
+            worked_hours=Decimal('1.00'), created_at=timezone.now(), updated_at=timezone.now(),
+        )
+
+    def export(self, user, name, **params):
+        api = APIClient()
+        api.force_authenticate(user)
+        response = api.get(reverse('export', kwargs=dict(zip(('dataset', 'file_type'), name.split('.')))), params)
+        return response, b''.join(response.streaming_content).decode() if response.streaming else None
+
+    def test_csv(self):
+        response, body = self.export(self.ann, 'tasks.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="tasks-', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], [column for column, lookup in exports.DATASETS['tasks']])
+        self.assertEqual([row[:3] for row in rows[1:]], [
+            [str(self.tasks[0].pk), 'Quote, "comma"', 'line one\nline two'],
+            [str(self.tasks[1].pk), 'Done', 'd'],
+        ])
+        self.assertEqual(rows[2][7], '2.50')
+        self.assertTrue(rows[2][9].endswith('Z'))
+
+    def test_ndjson_reports_include_archive(self):
+        response, body = self.export(self.boss, 'reports.ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['id'], row['assigned_to_username'], row['worked_hours']) for row in rows], [
+            (self.tasks[1].pk, 'ann', '2.50'), (self.archived.pk, 'ann', '1.00'),
+        ])
+        self.assertEqual(rows[0]['completion_report'], 'Ünïcode report')
+
+        tomorrow = (timezone.now() + timezone.timedelta(days=1)).isoformat()
+        self.assertEqual(self.export(self.boss, 'reports.ndjson', start=tomorrow)[1], '')
+        self.assertEqual(self.export(self.ann, 'reports.csv')[0].status_code, 403)
+        self.assertEqual(self.export(self.ann, 'tasks.csv', start='yesterday')[0].status_code, 400)
+
+
+class BulkTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=2, tasks_per_user=2)
+        rebuild_stats()
+        cls.own = list(Task.objects.filter(assigned_to__admin=cls.admins[0], status='pending').order_by('id'))
+        cls.foreign = Task.objects.filter(assigned_to__admin=cls.admins[1]).order_by('id').first()
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admins[0])
+
+    def assertCountersMatchRebuild(self):
+        def counters():
+            return list(TaskStats.objects.order_by('admin_id').values_list('admin_id', *COUNTER_FIELDS))
+        maintained = counters()
+        rebuild_stats()
+        self.assertEqual(maintained, counters())
+
+    def test_create(self):
+        worker = self.users[0]
+        response = self.api.post(reverse('tasks-bulk'), [
+            {'title': 'One', 'description': 'd', 'assigned_to': worker.pk},
+            {'title': 'Two', 'description': 'd', 'assigned_to': str(worker.pk)},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([task['title'] for task in response.json()], ['One', 'Two'])
+        self.assertEqual(Task.objects.filter(title__in=['One', 'Two'], assigned_to=worker).count(), 2)
+        self.assertCountersMatchRebuild()
+
+        # Assignees outside the admin's scope are rejected per item.
+        response = self.api.post(reverse('tasks-bulk'), [
+            {'title': 'Three', 'description': 'd', 'assigned_to': self.users[-1].pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('assigned_to', response.json()[0])
+        self.assertFalse(Task.objects.filter(title='Three').exists())
+
+    def test_update_accepts_string_ids(self):
+        first, second = self.own[:2]
+        response = self.api.patch(reverse('tasks-bulk'), [
+            {'id': str(first.pk), 'title': 'Renamed'},
+            {'id': second.pk, 'status': 'in_progress'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.title, second.status), ('Renamed', 'in_progress'))
+
+    def test_update_reports_missing_tasks_and_writes_nothing(self):
+        response = self.api.patch(reverse('tasks-bulk'), [
+            {'id': self.own[0].pk, 'title': 'Renamed'},
+            {'id': self.foreign.pk, 'title': 'Renamed'},
+            {'id': 'nope', 'title': 'Renamed'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{}, {'id': ['Task not found']}, {'id': ['Task not found']}])
+        self.assertFalse(Task.objects.filter(title='Renamed').exists())
+
+    def test_completion_needs_report_and_hours(self):
+        task = self.own[0]
+        response = self.api.patch(reverse('tasks-bulk'), [{'id': task.pk, 'status': 'completed'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()[0]), {'completion_report', 'worked_hours'})
+        response = self.api.patch(reverse('tasks-detail', args=[task.pk]), {'status': 'completed'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+
+        response = self.api.patch(reverse('tasks-bulk'), [
+            {'id': task.pk, 'status': 'completed', 'completion_report': 'Done.', 'worked_hours': '3.50'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.worked_hours), ('completed', Decimal('3.50')))
+        self.assertCountersMatchRebuild()
+
+    def test_assign(self):
+        target = self.users[1]
+        ids = [task.pk for task in self.own]
+        response = self.api.post(reverse('tasks-bulk-assign'), {
+            'task_ids': ids + [self.foreign.pk], 'assigned_to': target.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json(), {'updated': len(ids), 'errors': {str(self.foreign.pk): 'Task not found'}})
+        self.assertEqual(set(Task.objects.filter(pk__in=ids).values_list('assigned_to', flat=True)), {target.pk})
+        self.assertNotEqual(Task.objects.get(pk=self.foreign.pk).assigned_to_id, target.pk)
+        self.assertCountersMatchRebuild()
+
+        response = self.api.post(reverse('tasks-bulk-assign'), {
+            'task_ids': ids, 'assigned_to': self.users[-1].pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BULK_TASK_MAX_ITEMS=1)
+    def test_item_limit(self):
+        response = self.api.patch(reverse('tasks-bulk'), [{'id': task.pk} for task in self.own[:2]], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('At most 1', response.json()['error'])
+
+    def test_users_cannot_bulk_write(self):
+        self.api.force_authenticate(self.users[0])
+        response = self.api.post(reverse('tasks-bulk'), [
+            {'title': 'One', 'description': 'd', 'assigned_to': self.users[0].pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class AsyncTaskViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=1, tasks_per_user=4)
+        cls.worker = cls.users[0]
+        cls.pending = Task.objects.filter(assigned_to=cls.worker, status='pending').first()
+        cls.completed = Task.objects.filter(assigned_to=cls.worker, status='completed').first()
+        cls.foreign = Task.objects.filter(assigned_to=cls.users[1]).first()
+
+    def headers(self, user):
+        return {'Authorization': f'Bearer {RoleRefreshToken.for_user(user).access_token}'}
+
+    async def get_both(self, user, sync_url, async_url):
+        sync_response = await sync_to_async(self.client.get)(sync_url, headers=self.headers(user))
+        async_response = await self.async_client.get(async_url, headers=self.headers(user))
+        return sync_response, async_response
+
+    async def test_list_matches_sync_api(self):
+        for query in ('?page_size=3', '?page_size=3&fields=id,title'):
+            sync_response, async_response = await self.get_both(
+                self.admins[0], reverse('tasks-list') + query, reverse('async_task_list') + query,
+            )
+            self.assertEqual(async_response.status_code, 200)
+            body, expected = async_response.json(), sync_response.json()
+            self.assertEqual(body['results'], expected['results'])
+            # Same cursor, on this endpoint's own path.
+            self.assertEqual(body['next'].split('?')[1], expected['next'].split('?')[1])
+            self.assertIn(reverse('async_task_list'), body['next'])
+
+    async def test_detail_is_scoped(self):
+        sync_response, async_response = await self.get_both(
+            self.worker, reverse('tasks-detail', args=[self.pending.pk]), reverse('async_task_detail', args=[self.pending.pk]),
+        )
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+        response = await self.async_client.get(reverse('async_task_detail', args=[self.foreign.pk]), headers=self.headers(self.worker))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse('async_task_list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = await self.async_client.get(reverse('async_task_list'), headers={'Authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.delete(reverse('async_task_detail', args=[self.pending.pk]), headers=self.headers(self.worker))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_complete(self):
+        url = reverse('async_task_detail', args=[self.pending.pk])
+        response = await self.async_client.patch(url, {'title': 'Renamed'}, content_type='application/json', headers=self.headers(self.worker))
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.patch(url, {'status': 'completed'}, content_type='application/json', headers=self.headers(self.worker))
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.patch(url, {
+            'status': 'completed', 'completion_report': 'Done.', 'worked_hours': '1.25',
+        }, content_type='application/json', headers=self.headers(self.worker))
+        self.assertEqual(response.status_code, 200)
+        task = await Task.objects.aget(pk=self.pending.pk)
+        self.assertEqual((task.status, task.worked_hours), ('completed', Decimal('1.25')))
+
+    def test_complete_rolls_back_on_failure(self):
+        task = Task.objects.get(pk=self.pending.pk)
+        attrs = {'status': 'completed', 'completion_report': 'Done.', 'worked_hours': Decimal('1.25')}
+        with mock.patch('tasks.changelog.record_changes', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                complete_task(task, attrs)
+        self.assertEqual(Task.objects.get(pk=self.pending.pk).status, 'pending')
+
+    async def test_report(self):
+        sync_response, async_response = await self.get_both(
+            self.admins[0], reverse('tasks-get-report', args=[self.completed.pk]),
+            reverse('async_task_report', args=[self.completed.pk]),
+        )
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+        response = await self.async_client.get(reverse('async_task_report', args=[self.pending.pk]), headers=self.headers(self.admins[0]))
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get(reverse('async_task_report', args=[self.completed.pk]), headers=self.headers(self.admins[1]))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('async_task_report', args=[self.completed.pk]), headers=self.headers(self.worker))
+        self.assertEqual(response.status_code, 403)
+
+
+class TaskEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=1, tasks_per_user=2)
+        cls.superuser = User.objects.create(username='root', email='root@example.com', is_superuser=True)
+        cls.task = Task.objects.filter(assigned_to=cls.users[0]).first()
+
+    def subscribe(self, user, last_event_id=None, bus=events.bus):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def register():
+            return bus.subscribe(user, last_event_id)
+        subscription, backlog = loop.run_until_complete(register())
+        self.addCleanup(bus.unsubscribe, subscription)
+        return subscription, backlog
+
+    def received(self, subscription):
+        subscription.loop.run_until_complete(asyncio.sleep(0))
+        queued = []
+        while not subscription.queue.empty():
+            queued.append(subscription.queue.get_nowait())
+        return [(event.type, event.task_id) for event in queued]
+
+    def test_events_follow_scope(self):
+        owner, other = self.users
+        watchers = {user: self.subscribe(user)[0] for user in [owner, other, *self.admins, self.superuser]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = 'Renamed'
+            self.task.save()
+        self.assertEqual({user: self.received(sub) for user, sub in watchers.items()}, {
+            owner: [('task.updated', self.task.pk)],
+            other: [],
+            self.admins[0]: [('task.updated', self.task.pk)],
+            self.admins[1]: [],
+            self.superuser: [('task.updated', self.task.pk)],
+        })
+
+        # Reassigned: the old side sees it leave, the new side sees it arrive.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to = other
+            self.task.save()
+        self.assertEqual(self.received(watchers[owner]), [('task.removed', self.task.pk)])
+        self.assertEqual(self.received(watchers[self.admins[0]]), [('task.removed', self.task.pk)])
+        self.assertEqual(self.received(watchers[other]), [('task.updated', self.task.pk)])
+        self.assertEqual(self.received(watchers[self.admins[1]]), [('task.updated', self.task.pk)])
+        self.assertEqual(self.received(watchers[self.superuser]), [('task.updated', self.task.pk)])
+
+        task_id = self.task.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.delete()
+        self.assertEqual(self.received(watchers[self.admins[1]]), [('task.deleted', task_id)])
+        self.assertEqual(self.received(watchers[self.admins[0]]), [])
+
+    def test_last_event_id_replay(self):
+        bus = events.EventBus()
+        first = bus.publish('task.updated', 1, frozenset([5]), frozenset(), {})
+        second = bus.publish('task.updated', 2, frozenset([6]), frozenset(), {})
+        third = bus.publish('task.updated', 3, frozenset([5]), frozenset(), {})
+        user = User(pk=5, role='user')
+        self.assertEqual(self.subscribe(user, first.id, bus)[1], [third])
+        self.assertEqual(self.subscribe(user, third.id, bus)[1], [])
+        self.assertIsNone(self.subscribe(user, 'elsewhere-1', bus)[1])
+        # Only events in the subscriber's scope are replayed.
+        self.assertEqual(self.subscribe(User(pk=6, role='user'), first.id, bus)[1], [second])
+
+        # A change nobody received: ids from before it cannot resume.
+        bus.skip()
+        self.assertIsNone(self.subscribe(user, third.id, bus)[1])
+        fourth = bus.publish('task.updated', 4, frozenset([5]), frozenset(), {})
+        self.assertEqual(self.subscribe(user, fourth.id, bus)[1], [])
+
+    def test_stream_replays_backlog(self):
+        user = User(pk=5, role='user')
+        event = events.bus.publish('task.updated', 7, frozenset([5]), frozenset(), {'title': 'x'})
+        previous = f'{events.bus.epoch}-{events.sequence(event) - 1}'
+
+        async def read(last_event_id, count):
+            body = events.stream(user, last_event_id)
+            chunks = [await anext(body) for _ in range(count)]
+            await body.aclose()
+            return chunks
+
+        self.assertEqual(asyncio.run(read(previous, 2))[1], format_event_text(event.id, 'task.updated', 7, 'x'))
+        self.assertIn('event: reset', asyncio.run(read('elsewhere-1', 2))[1])
+        self.assertEqual(events.bus.subscriber_count(), 0)
+
+    def test_closed_loop_drops_subscriber(self):
+        subscription, _ = self.subscribe(self.superuser)
+        subscription.loop.close()
+        events.bus.publish('task.updated', 1, frozenset(), frozenset(), {})
+        self.assertEqual(events.bus.subscriber_count(), 0)
+
+    def test_no_work_without_subscribers(self):
+        self.assertEqual(events.bus.subscriber_count(), 0)
+        with mock.patch.object(events, 'task_payload') as payload, \
+                mock.patch.object(events, 'TaskSerializer') as serializer, \
+                self.captureOnCommitCallbacks(execute=True):
+            deferred = Task.objects.only('id').get(pk=self.task.pk)
+            deferred.title = 'Renamed'
+            deferred.save()
+            Task.objects.filter(assigned_to=self.users[1]).update(title='Renamed')
+            bulk.assign_tasks(Task.objects.all(), [self.task.pk], self.users[1])
+        payload.assert_not_called()
+        serializer.assert_not_called()
+
+
+def format_event_text(event_id, event_type, task_id, title):
+    return f'id: {event_id}\nevent: {event_type}\ndata: {{"id":{task_id},"title":"{title}"}}\n\n'
+
+
+@override_settings(TASK_CHANGES_PAGE_SIZE=2)
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=1, tasks_per_user=3)
+        cls.mine = list(Task.objects.filter(assigned_to=cls.users[0]).order_by('id'))
+        # seed_tasks bulk-inserts, so log the initial state by hand.
+        changelog.record_changes([(task.pk, None, task_state(task)) for task in Task.objects.order_by('id')])
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admins[0])
+
+    def sync(self, since='0'):
+        changed, deleted = [], []
+        while True:
+            body = self.api.get(reverse('tasks-changes'), {'since': since}).json()
+            changed += [task['id'] for task in body['changed']]
+            deleted += body['deleted']
+            since = body['next']
+            if not body['has_more']:
+                return changed, deleted, since
+
+    def test_incremental_pages(self):
+        changed, deleted, since = self.sync()
+        self.assertEqual(changed, [task.pk for task in self.mine])
+        self.assertEqual((deleted, self.sync(since)[:2]), ([], ([], [])))
+
+        first, second = self.mine[0], self.mine[1]
+        second.title = 'Renamed'
+        second.save()
+        first.title = 'Renamed'
+        first.save()
+        # Oldest change first; a task changed twice is listed once.
+        second.save()
+        changed, deleted, since = self.sync(since)
+        self.assertEqual((changed, deleted), ([first.pk, second.pk], []))
+        self.assertEqual(self.api.get(reverse('tasks-changes'), {'since': 'x'}).status_code, 400)
+
+    def test_reassign_and_delete_leave_tombstones(self):
+        since = self.sync()[2]
+        moved, removed = self.mine[0], self.mine[1]
+        removed_id = removed.pk
+        moved.assigned_to = self.users[1]
+        moved.save()
+        removed.delete()
+        self.assertEqual(self.sync(since)[:2], ([], [moved.pk, removed_id]))
+
+        # The other admin sees the moved task arrive.
+        self.api.force_authenticate(self.admins[1])
+        self.assertIn(moved.pk, self.sync()[0])
+        self.api.force_authenticate(self.users[0])
+        self.assertEqual(self.sync(since)[:2], ([], [moved.pk, removed_id]))
+
+    def test_compaction_keeps_latest_row(self):
+        task = self.mine[0]
+        for title in ('one', 'two', 'three'):
+            task.title = title
+            task.save()
+        latest = TaskChange.objects.filter(task_id=task.pk).latest('id').pk
+        before = self.sync()
+        self.assertEqual(changelog.compact(batch_size=2), 3)
+        self.assertEqual(list(TaskChange.objects.filter(task_id=task.pk).values_list('id', flat=True)), [latest])
+        self.assertEqual(self.sync(), before)
+
+    @override_settings(TASK_CHANGES_SAFETY_LAG=60)
+    def test_young_changes_wait_for_safety_lag(self):
+        TaskChange.objects.update(created_at=timezone.now() - timezone.timedelta(minutes=5))
+        since = self.sync()[2]
+        task = self.mine[0]
+        task.title = 'Renamed'
+        task.save()
+        self.assertEqual(self.sync(since), ([], [], since))
+        # The cursor never moves past a held-back change.
+        self.mine[1].title = 'Renamed'
+        self.mine[1].save()
+        TaskChange.objects.filter(task_id=self.mine[1].pk).update(created_at=timezone.now() - timezone.timedelta(minutes=5))
+        self.assertEqual(self.sync(since), ([], [], since))
+
+        TaskChange.objects.update(created_at=timezone.now() - timezone.timedelta(minutes=5))
+        self.assertEqual(self.sync(since)[:2], ([task.pk, self.mine[1].pk], []))
+
+
+class ConditionalRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=1, tasks_per_user=3)
+        cls.task = Task.objects.filter(assigned_to=cls.users[0]).first()
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admins[0])
+
+    def test_list_etag_round_trip(self):
+        response = self.api.get(reverse('tasks-list'))
+        etag = response['ETag']
+        # Nothing has changed in this scope yet, so there is no date to send.
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(reverse('tasks-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+        self.assertFalse(any(Task._meta.db_table in query['sql'] for query in queries.captured_queries))
+        # Another representation has its own ETag.
+        self.assertEqual(self.api.get(reverse('tasks-list'), {'page_size': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deletion_changes_list_etag(self):
+        etag = self.api.get(reverse('tasks-list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(assigned_to=self.users[1]).first().delete()
+        # Outside this admin's scope.
+        self.assertEqual(self.api.get(reverse('tasks-list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.get(pk=self.task.pk).delete()
+        response = self.api.get(reverse('tasks-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn(self.task.pk, [task['id'] for task in response.json()['results']])
+
+    def test_scope_version_starts_without_a_row(self):
+        scope = f'admin:{self.admins[0].pk}'
+        self.assertEqual(conditional.scope_version(scope), (0, None))
+        self.assertFalse(ScopeVersion.objects.filter(scope=scope).exists())
+
+        conditional.bump_scope_versions([scope, 'all'])
+        version, updated_at = conditional.scope_version(scope)
+        self.assertGreater(version, 0)
+        self.assertIsNotNone(updated_at)
+        conditional.bump_scope_versions([scope])
+        self.assertEqual(conditional.scope_version(scope)[0], version + 1)
+
+    def test_detail_round_trip(self):
+        url = reverse('tasks-detail', args=[self.task.pk])
+        response = self.api.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.api.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        Task.objects.filter(pk=self.task.pk).update(updated_at=timezone.now() + timezone.timedelta(seconds=5))
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.api.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=1, users_per_admin=1, tasks_per_user=3)
+        cls.completed = Task.objects.filter(status='completed').first()
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admins[0])
+        # Scopes without a row share version 0 across tests.
+        response_cache.backend.clear()
+
+    def get(self, url, **params):
+        before = response_cache.metrics()['hits']
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), response_cache.metrics()['hits'] - before
+
+    def test_write_invalidates_list(self):
+        url = reverse('tasks-list')
+        self.assertEqual(self.get(url)[1], 0)
+        self.assertEqual(self.get(url)[1], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.completed.title = 'Renamed'
+            self.completed.save()
+        body, hits = self.get(url)
+        self.assertEqual(hits, 0)
+        self.assertEqual(body['results'][0]['title'], 'Renamed')
+
+    def test_cold_scope_read_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(reverse('tasks-list'))
+        self.assertFalse(any(query['sql'].startswith('INSERT') for query in queries.captured_queries))
+        self.assertFalse(ScopeVersion.objects.exists())
+
+    def test_version_bump_from_another_process(self):
+        # Another worker's write reaches this one through the database,
+        # even though each keeps its own cached entries.
+        url = reverse('tasks-list')
+        self.get(url)
+        conditional.bump_scope_versions([f'admin:{self.admins[0].pk}'])
+        self.assertEqual(self.get(url)[1], 0)
+
+    def test_write_invalidates_reports(self):
+        report = reverse('tasks-get-report', args=[self.completed.pk])
+        summary = reverse('report_summary_api')
+        self.get(report)
+        self.get(summary)
+        self.assertEqual(self.get(report)[1], 1)
+        total = self.get(summary)[0]['total']['hours']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            worker = self.users[0]
+            worker.username = 'renamed'
+            worker.save()
+            self.completed.worked_hours += 1
+            self.completed.save()
+        body, hits = self.get(report)
+        self.assertEqual((body['assigned_to_username'], hits), ('renamed', 0))
+        body, hits = self.get(summary)
+        self.assertEqual(hits, 0)
+        self.assertEqual(Decimal(body['total']['hours']), Decimal(total) + 1)
+
+
+@override_settings(TASK_JOBS={'CHUNK_SIZE': 7, 'CHUNK_PAUSE': 0, 'RETRY_DELAY': 0})
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=2, users_per_admin=2, tasks_per_user=20)
+        rebuild_stats()
+
+    def counters(self):
+        return list(TaskStats.objects.order_by('admin_id').values_list(
+            'admin_id', 'pending_count', 'in_progress_count', 'completed_count', 'worked_hours', 'users_count',
+        ))
+
+    def test_delete_user_in_chunks(self):
+        user = self.users[0]
+        job = jobs.enqueue('delete_user', {'user_id': user.pk}, key=f'user:{user.pk}')
+        self.assertEqual(jobs.enqueue('delete_user', {'user_id': user.pk}, key=f'user:{user.pk}'), job)
+
+        self.assertEqual(jobs.work_once('test'), job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total), ('succeeded', 20, 20))
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+        self.assertFalse(Task.objects.filter(assigned_to_id=user.pk).exists())
+
+        counters = self.counters()
+        rebuild_stats()
+        self.assertEqual(counters, self.counters())
+
+    def test_failed_run_is_retried_and_resumes(self):
+        user = self.users[1]
+        real_report, calls = jobs.report, []
+
+        def flaky_report(job, progress=None, *args, **kwargs):
+            real_report(job, progress, *args, **kwargs)
+            calls.append(progress)
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+
+        job = jobs.enqueue('delete_user', {'user_id': user.pk})
+        with mock.patch.object(jobs, 'report', flaky_report), self.assertLogs('tasks.jobs', 'ERROR'):
+            jobs.work_once('test')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.progress), ('queued', 1, 14))
+        self.assertIn('connection lost', job.error)
+        self.assertEqual(Task.objects.filter(assigned_to_id=user.pk).count(), 6)
+
+        jobs.work_once('test')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.progress, job.total), ('succeeded', 2, 20, 20))
+
+    @override_settings(TASK_JOBS={'CHUNK_SIZE': 1, 'CHUNK_PAUSE': 0})
+    def test_reassign_users_in_batches(self):
+        old_admin, new_admin = self.admins
+        moving = list(old_admin.managed_users.order_by('id'))
+        job, queued = jobs.queue_reassignment(old_admin, new_admin)
+        self.assertTrue(queued)
+
+        jobs.work_once('test')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total), ('succeeded', 2, 2))
+        self.assertFalse(old_admin.managed_users.exists())
+        for user in moving:
+            user.refresh_from_db()
+            self.assertEqual((user.admin_id, user.token_version), (new_admin.pk, 1))
+        # Old admin's sync clients get tombstones for every task that left.
+        self.assertEqual(TaskChange.objects.filter(admin_id=old_admin.pk).values('task_id').distinct().count(), 40)
+
+        counters = self.counters()
+        rebuild_stats()
+        self.assertEqual(counters, self.counters())
+
+    def test_user_deletion_waits_for_reassignment(self):
+        old_admin, new_admin = self.admins
+        superuser = User.objects.create(username='root', email='root@example.com', is_superuser=True)
+        reassignment, _ = jobs.queue_reassignment(old_admin, new_admin)
+        self.client.force_login(superuser)
+
+        response = self.client.post(reverse('admin_delete', args=[old_admin.pk]))
+        self.assertRedirects(response, reverse('job_detail', args=[reassignment.pk]), fetch_redirect_response=False)
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)], [f'Another job for {old_admin.username} is still in progress'])
+        old_admin.refresh_from_db()
+        self.assertTrue(old_admin.is_active)
+        self.assertFalse(Job.objects.filter(kind='delete_user').exists())
+
+    def test_long_handlers_heartbeat(self):
+        TaskStats.objects.all().delete()
+        job = jobs.enqueue('rebuild_stats')
+        with mock.patch.object(jobs, 'report', wraps=jobs.report) as report:
+            jobs.work_once('test')
+        # One heartbeat per aggregate step, then the final report.
+        self.assertGreaterEqual(report.call_count, 4)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        counters = self.counters()
+        rebuild_stats()
+        self.assertEqual(counters, self.counters())
+
+    def test_reclaimed_rebuild_stops_before_writing(self):
+        TaskStats.objects.all().delete()
+        job = jobs.enqueue('rebuild_stats')
+        claimed = jobs.claim('test')
+        accumulate = stats.accumulate
+
+        def reclaim_midway(*args):
+            # Another worker took the job over during the first aggregate.
+            Job.objects.filter(pk=job.pk).update(locked_by='other')
+            accumulate(*args)
+        with mock.patch.object(stats, 'accumulate', reclaim_midway), self.assertLogs('tasks.jobs', 'WARNING'):
+            jobs.run(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'other'))
+        self.assertFalse(TaskStats.objects.exists())
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=1, users_per_admin=2, tasks_per_user=30)
+        cls.superuser = User.objects.create_superuser('root', 'root@example.com', 'password')
+        completed = Task.objects.filter(status='completed').order_by('id')
+        Task.objects.filter(pk__in=list(completed.values_list('id', flat=True))).update(worked_hours=Decimal('1.50'))
+        # The older half of the completed tasks falls past the cutoff.
+        old = list(completed.values_list('id', flat=True))[:10]
+        Task.objects.filter(pk__in=old).update(updated_at=timezone.now() - timezone.timedelta(days=400))
+        rebuild_stats()
+
+    def test_reports_read_both_tiers(self):
+        tiers = reports.completed_tasks(self.superuser)
+        summary, totals = reports.worked_hours_summary(tiers, 'user'), reports.totals(tiers)
+        counters = list(TaskStats.objects.values_list('admin_id', 'completed_count', 'worked_hours'))
+
+        self.assertEqual(archive.archive_completed(archive.cutoff(180), batch_size=3), 10)
+        self.assertEqual(ArchivedTask.objects.count(), 10)
+        self.assertEqual(Task.objects.filter(status='completed').count(), 10)
+        self.assertEqual(counters, list(TaskStats.objects.values_list('admin_id', 'completed_count', 'worked_hours')))
+        rebuild_stats()
+        self.assertEqual(counters, list(TaskStats.objects.values_list('admin_id', 'completed_count', 'worked_hours')))
+
+        tiers = reports.completed_tasks(self.superuser)
+        self.assertEqual(reports.worked_hours_summary(tiers, 'user'), summary)
+        self.assertEqual(reports.totals(tiers), totals)
+
+        archived = ArchivedTask.objects.order_by('id').first()
+        self.client.force_login(self.superuser)
+        response = self.client.get(reverse('report_detail', args=[archived.pk]))
+        self.assertContains(response, archived.title)
+        api = APIClient()
+        api.force_authenticate(self.superuser)
+        response = api.get(reverse('tasks-get-report', args=[archived.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], archived.pk)
+
+    def test_tiered_pages(self):
+        archive.archive_completed(archive.cutoff(180))
+        hot = Task.objects.filter(status='completed').order_by('-updated_at', '-id')
+        cold = ArchivedTask.objects.order_by('-updated_at', '-id')
+        expected = [task.pk for task in hot] + [task.pk for task in cold]
+
+        for size in (3, 10, 7):
+            results = archive.TieredResults(hot.all(), cold.all())
+            with self.assertNumQueries(1):
+                first = results[0:size]
+            pages = [first] + [results[start:start + size] for start in range(size, len(expected) + size, size)]
+            self.assertEqual([task.pk for page in pages for task in page], expected)
+        self.assertEqual(archive.TieredResults(hot, cold).count(), 20)
+
+
+class CompressedTextTests(TestCase):
+    def test_round_trip(self):
+        user = User.objects.create_user('worker', 'worker@example.com', 'password', role='user')
+        report = 'Checked every requirement and tested thoroughly. ' * 40
+        task = Task.objects.create(title='Long', description='Short text', assigned_to=user, due_date=timezone.now(), completion_report=report)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT description, completion_report FROM tasks_task WHERE id = %s', [task.pk])
+            description, stored = cursor.fetchone()
+        self.assertEqual(bytes(description), compress('Short text'))
+        self.assertLess(len(stored), len(report) // 10)
+
+        self.assertEqual(Task.objects.values_list('description', 'completion_report').get(pk=task.pk), ('Short text', report))
+        with override_settings(TEXT_COMPRESSION={'ALGORITHM': 'none'}):
+            Task.objects.filter(pk=task.pk).update(completion_report=report)
+        self.assertEqual(Task.objects.get(pk=task.pk).completion_report, report)
+        self.assertEqual(Task.objects.without_text().get(pk=task.pk).get_deferred_fields(), {'description', 'completion_report'})
+
+
+class DatabaseRoutingTests(TestCase):
+    def test_database_url(self):
+        config = database_config('postgres://app:p%40ss@db:5432/tasks?sslmode=require', '/srv', 60, True, {'max_size': 4})
+        self.assertEqual((config['USER'], config['PASSWORD'], config['HOST'], config['PORT']), ('app', 'p@ss', 'db', '5432'))
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require', 'pool': {'max_size': 4}})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        config = database_config('sqlite:///db.sqlite3', '/srv', 60)
+        self.assertEqual((str(config['NAME']), config['CONN_MAX_AGE']), ('/srv/db.sqlite3', 60))
+        config = database_config('sqlite:///db.sqlite3', '/srv', sqlite={'busy_timeout': 20})
+        self.assertEqual(config['ENGINE'], 'task_manager.sqlite')
+        self.assertEqual((config['OPTIONS']['transaction_mode'], config['OPTIONS']['timeout']), ('IMMEDIATE', 20))
+        self.assertIn('PRAGMA journal_mode=WAL', config['OPTIONS']['init_command'])
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    def test_only_opted_in_reads_use_replicas(self):
+        with replica_reads():
+            self.assertEqual(Task.objects.all().db, 'replica_0')
+            self.assertEqual(router.db_for_write(Task), 'default')
+        self.assertEqual(Task.objects.all().db, 'default')
+        with override_settings(DATABASE_REPLICAS=[]), replica_reads():
+            self.assertEqual(Task.objects.all().db, 'default')
+
+
+class SQLiteWriteLockTests(SimpleTestCase):
+    """The in-process write lock, against a database file as in production."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.config = database_config('sqlite:///db.sqlite3', directory.name, sqlite={'busy_timeout': 1})
+        self.databases_for({})
+
+    def databases_for(self, options):
+        config = {**self.config, 'OPTIONS': {**self.config['OPTIONS'], **options}}
+        self.handler = ConnectionHandler({'default': {'ENGINE': 'django.db.backends.dummy'}, 'file': config})
+        self.addCleanup(self.handler.close_all)
+        with self.handler['file'].cursor() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS counter (n integer)')
+        self.lock = write_lock(config['NAME'])
+
+    def begin(self):
+        # What atomic() does for this backend, on this test's connections.
+        connection = self.handler['file']
+        connection.ensure_connection()
+        connection._start_transaction_under_autocommit()
+        return connection
+
+    def lock_is_free(self):
+        # Asked from another thread: the lock is reentrant.
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self.lock.acquire(blocking=False) and not self.lock.release()))
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_transactions_hold_the_lock(self):
+        self.assertTrue(self.lock_is_free())
+        connection = self.begin()
+        self.assertFalse(self.lock_is_free())
+        connection.commit()
+        self.assertTrue(self.lock_is_free())
+
+        connection = self.begin()
+        connection.rollback()
+        self.assertTrue(self.lock_is_free())
+        self.begin()
+        connection.close()
+        self.assertTrue(self.lock_is_free())
+
+    def test_writers_queue_behind_each_other(self):
+        events, started = [], threading.Event()
+
+        def second_writer():
+            started.wait()
+            connection = self.begin()
+            events.append('second began')
+            with connection.cursor() as cursor:
+                cursor.execute('INSERT INTO counter VALUES (2)')
+            connection.commit()
+            connection.close()
+
+        thread = threading.Thread(target=second_writer)
+        thread.start()
+        connection = self.begin()
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO counter VALUES (1)')
+        started.set()
+        time.sleep(0.2)
+        events.append('first committed')
+        connection.commit()
+        thread.join()
+        self.assertEqual(events, ['first committed', 'second began'])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT n FROM counter ORDER BY rowid')
+            self.assertEqual(cursor.fetchall(), [(1,), (2,)])
+
+    def test_lock_wait_times_out(self):
+        self.begin()
+        errors = []
+
+        def blocked_writer():
+            try:
+                self.begin()
+            except OperationalError as error:
+                errors.append(str(error))
+            finally:
+                self.handler['file'].close()
+
+        thread = threading.Thread(target=blocked_writer)
+        thread.start()
+        thread.join()
+        self.assertEqual(errors, ['database is locked'])
+
+    def test_serialize_writes_false_turns_lock_off(self):
+        self.databases_for({'serialize_writes': False})
+        connection = self.begin()
+        self.assertTrue(self.lock_is_free())
+        connection.rollback()
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins, cls.users = seed_tasks(admins=1, users_per_admin=2, tasks_per_user=3)
+        cls.superuser = User.objects.create_superuser('root', 'root@example.com', 'password')
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_views_are_recorded(self):
+        api = APIClient()
+        api.force_authenticate(self.superuser)
+        self.assertEqual(api.get(reverse('tasks-list')).status_code, 200)
+        self.client.force_login(self.superuser)
+        self.assertEqual(self.client.get(reverse('tasks_list')).status_code, 200)
+
+        views = {row['view']: row for row in metrics.registry.snapshot()}
+        self.assertEqual(views['TaskViewSet.list']['count'], 1)
+        self.assertGreater(views['TaskViewSet.list']['queries'], 0)
+        self.assertGreater(views['TaskViewSet.list']['serialize'], 0)
+        self.assertGreater(views['admin_views.manage_tasks']['template'], 0)
+
+        self.client.logout()
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertContains(response, 'task_manager_request_duration_seconds_count{view="TaskViewSet.list"} 1')
+        self.assertContains(response, 'task_manager_request_db_queries_total{view="admin_views.manage_tasks"}')
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as output:
+            output.write(text)
+        return path
+
+    def test_users_then_resumable_tasks(self):
+        users = self.write('users.csv', (
+            'username,email,role,admin,password\n'
+            'boss,boss@example.com,admin,,secret\n'
+            'ann,ann@example.com,user,boss,secret\n'
+            'bob,bob@example.com,,boss,\n'
+            'ann,other@example.com,user,,\n'
+        ))
+        call_command('import_users', users, '--fast-hash', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(User.objects.get(username='ann').admin.username, 'boss')
+        self.assertEqual(User.objects.get(username='bob').admin.username, 'boss')
+        self.assertTrue(User.objects.get(username='ann').check_password('secret'))
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertEqual(ImportCheckpoint.objects.get().rows_skipped, 1)
+        with self.assertRaisesMessage(CommandError, 'already imported'):
+            call_command('import_users', users, stdout=StringIO())
+
+        tasks = self.write('tasks.ndjson', '\n'.join([
+            json.dumps({'title': 'One', 'description': 'a', 'assigned_to': 'ann'}),
+            json.dumps({'title': 'Two', 'description': 'b', 'assigned_to': 'bob', 'status': 'completed',
+                        'completion_report': 'done', 'worked_hours': '2.5', 'due_date': '2030-01-01'}),
+            json.dumps({'title': 'Three', 'description': 'c', 'assigned_to': 'boss'}),
+            json.dumps({'title': 'Four', 'description': 'd', 'assigned_to': 'ann', 'status': 'completed',
+                        'worked_hours': '1'}),
+        ]))
+        with self.assertRaisesMessage(CommandError, 'line 3: assigned_to'):
+            call_command('import_tasks', tasks, '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(Task.objects.get(title='Two').due_date.year, 2030)
+
+        with self.assertRaisesMessage(CommandError, '--resume'):
+            call_command('import_tasks', tasks, stdout=StringIO())
+        errors = StringIO()
+        call_command('import_tasks', tasks, '--resume', '--skip-invalid', stdout=StringIO(), stderr=errors)
+        self.assertIn('line 3', errors.getvalue())
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), ['Four', 'One', 'Two'])
+        checkpoint = ImportCheckpoint.objects.get(name__startswith='tasks:')
+        self.assertEqual((checkpoint.rows_read, checkpoint.rows_imported, checkpoint.rows_skipped), (4, 3, 1))
+
+        counters = list(TaskStats.objects.order_by('admin_id').values_list(
+            'admin_id', 'users_count', 'admins_count', 'completed_count', 'worked_hours',
+        ))
+        rebuild_stats()
+        self.assertEqual(counters, list(TaskStats.objects.order_by('admin_id').values_list(
+            'admin_id', 'users_count', 'admins_count', 'completed_count', 'worked_hours',
+        )))
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -6,5 +6,10 @@ router = DefaultRouter()
 router.register(r'tasks', views.TaskViewSet, basename='tasks')
 
 urlpatterns = [
+    path('reports/summary/', views.ReportSummaryAPIView.as_view(), name='report_summary_api'),
+    path('admins/reassign/', views.ReassignUsersAPIView.as_view(), name='reassign_users_api'),
+    path('jobs/<int:pk>/', views.JobDetailAPIView.as_view(), name='job_detail_api'),
+    path('cache/metrics/', views.ResponseCacheMetricsAPIView.as_view(), name='response_cache_metrics'),
+    re_path(r'^export/(?P<dataset>tasks|reports)\.(?P<file_type>csv|ndjson)$', views.ExportAPIView.as_view(), name='export'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
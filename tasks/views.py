@@ -1,25 +1,42 @@
 # tasks/views.py
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets, status
+from django.utils import timezone
+from rest_framework import generics, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Task
-from .serializers import TaskSerializer, TaskCompletionSerializer, TaskReportSerializer
-from .permissions import IsSuperAdminOrAdmin
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.views import APIView
+from .models import LARGE_TEXT_FIELDS, ArchivedTask, Job, Task
+from .serializers import (
+    TaskSerializer, TaskCompletionSerializer, requested_fields,
+    DateRangeQuerySerializer, ReportSummaryQuerySerializer, ReportSummarySerializer,
+    BulkTaskSerializer, BulkAssignSerializer, ReassignUsersSerializer, JobSerializer,
+)
+from .permissions import IsSuperAdminOnly, IsSuperAdminOrAdmin
+from .pagination import TaskCursorPagination
+from .fast_serializers import FastTaskReportSerializer, FastTaskSerializer
+from . import bulk, changelog, conditional, exports, jobs, reports
+from .response_cache import response_cache, respond as cached_response
+from .routers import replica_reads
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Task.objects.all()
-        elif getattr(user, 'role', None) == 'admin':
-            return Task.objects.filter(assigned_to__admin=user)
-        else:
-            return Task.objects.filter(assigned_to=user)
+        queryset = Task.objects.visible_to(self.request.user)
+
+        if self.action in ['list', 'retrieve', 'changes']:
+            requested = requested_fields(self.request)
+            if requested:
+                skipped = [name for name in LARGE_TEXT_FIELDS if name not in requested]
+                if skipped:
+                    queryset = queryset.defer(*skipped)
+        return queryset
 
     def get_permissions(self):
         if self.action in ['create', 'destroy']:
@@ -28,23 +45,218 @@ class TaskViewSet(viewsets.ModelViewSet):
             if self.request.data.get('status') == 'completed':
                 return [IsAuthenticated()]  
             return [IsSuperAdminOrAdmin()]
-        return [IsAuthenticated()]
+        return super().get_permissions()
+
+    @replica_reads()
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, 'tasks-list',
+            lambda: conditional.list_validators(request),
+            lambda: self.build_list(request),
+            use_last_modified=False,
+        )
+
+    def build_list(self, request):
+        # Rows come straight from .values(); the pagination key is always
+        # fetched, whatever ?fields= selects.
+        serializer = FastTaskSerializer(requested_fields(request))
+        page = self.paginate_queryset(serializer.values(self.filter_queryset(self.get_queryset()), ('id', 'updated_at')))
+        return self.get_paginated_response(serializer.serialize(page))
+
+    @replica_reads()
+    def retrieve(self, request, *args, **kwargs):
+        validators = conditional.object_validators(request, self.get_queryset(), kwargs['pk'])
+        return conditional.respond(request, validators, lambda: super(TaskViewSet, self).retrieve(request, *args, **kwargs))
 
     def update(self, request, *args, **kwargs):
         task = self.get_object()
         if request.data.get('status') == 'completed':
             serializer = TaskCompletionSerializer(task, data=request.data, partial=True)
             if serializer.is_valid():
-                serializer.save()
+                # One write transaction for the task, counters and change log.
+                with transaction.atomic():
+                    serializer.save()
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return super().update(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk', permission_classes=[IsSuperAdminOrAdmin])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a list of tasks'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > bulk.max_items():
+            return Response({'error': f'At most {bulk.max_items()} tasks per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        assignees = bulk.load_assignees(request.user, [item.get('assigned_to') for item in items if isinstance(item, dict)])
+        context = {**self.get_serializer_context(), 'assignees': assignees}
+
+        if request.method == 'POST':
+            serializer = BulkTaskSerializer(data=items, many=True, context=context)
+            serializer.is_valid(raise_exception=True)
+            tasks = bulk.create_tasks(serializer.validated_data)
+            return Response(TaskSerializer(tasks, many=True).data, status=status.HTTP_201_CREATED)
+
+        instances = self.get_queryset().in_bulk(bulk.parse_ids(item.get('id') for item in items if isinstance(item, dict)))
+        updates, errors = [], []
+        for item in items:
+            task = instances.get(bulk.parse_id(item.get('id'))) if isinstance(item, dict) else None
+            if task is None:
+                errors.append({'id': ['Task not found']})
+                continue
+            serializer = BulkTaskSerializer(task, data=item, partial=True, context=context)
+            if serializer.is_valid():
+                updates.append((task, serializer.validated_data))
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = bulk.update_tasks(updates)
+        return Response(TaskSerializer(tasks, many=True).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-assign', permission_classes=[IsSuperAdminOrAdmin])
+    def bulk_assign(self, request):
+        assignees = bulk.load_assignees(request.user, [request.data.get('assigned_to')])
+        serializer = BulkAssignSerializer(data=request.data, context={'assignees': assignees})
+        serializer.is_valid(raise_exception=True)
+
+        task_ids = serializer.validated_data['task_ids']
+        if len(task_ids) > bulk.max_items():
+            return Response({'error': f'At most {bulk.max_items()} tasks per request'}, status=status.HTTP_400_BAD_REQUEST)
+        found = bulk.assign_tasks(self.get_queryset(), task_ids, serializer.validated_data['assigned_to'])
+        missing = sorted(set(task_ids) - set(found))
+        return Response({
+            'updated': len(found),
+            'errors': {str(pk): 'Task not found' for pk in missing},
+        })
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        since = request.query_params.get('since', '0')
+        if not since.isdigit():
+            return Response({'error': 'since must be a token returned by this endpoint'}, status=status.HTTP_400_BAD_REQUEST)
+
+        task_ids, next_token, has_more = changelog.changed_since(request.user, int(since), changelog.page_size())
+        serializer = FastTaskSerializer(requested_fields(request))
+        rows = {row['id']: row for row in serializer.values(self.get_queryset().filter(pk__in=task_ids), ('id',))}
+        return Response({
+            'next': str(next_token),
+            'has_more': has_more,
+            'changed': serializer.serialize(rows[pk] for pk in task_ids if pk in rows),
+            'deleted': [pk for pk in task_ids if pk not in rows],
+        })
+
     @action(detail=True, methods=['get'], url_path='report', permission_classes=[IsSuperAdminOrAdmin])
+    @replica_reads()
     def get_report(self, request, pk=None):
-        task = self.get_object()
-        if task.status != 'completed':
+        # The username is part of the report but not of the task's updated_at.
+        return cached_response(
+            request, 'task-report',
+            lambda: self.report_validators(request, pk),
+            lambda: self.build_report(request, pk),
+        )
+
+    def report_tiers(self):
+        # Completed tasks past the archive cutoff live in the cold tier.
+        return [self.get_queryset(), ArchivedTask.objects.visible_to(self.request.user)]
+
+    def report_validators(self, request, pk):
+        for tier in self.report_tiers():
+            validators = conditional.object_validators(request, tier, pk, 'status', 'assigned_to__username')
+            if validators is not None:
+                return validators
+        return None
+
+    def build_report(self, request, pk):
+        serializer = FastTaskReportSerializer()
+        hot, archived = self.report_tiers()
+        try:
+            row = generics.get_object_or_404(serializer.values(hot, ('status',)), pk=pk)
+        except Http404:
+            row = generics.get_object_or_404(serializer.values(archived, ('status',)), pk=pk)
+        if row['status'] != 'completed':
             return Response({'error': 'Task not completed'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        serializer = TaskReportSerializer(task)
-        return Response(serializer.data)
+        return Response(serializer.to_representation(row))
+
+
+class ReportSummaryAPIView(APIView):
+    permission_classes = [IsSuperAdminOrAdmin]
+
+    @replica_reads()
+    def get(self, request):
+        return cached_response(request, 'report-summary', lambda: None, lambda: self.build(request))
+
+    def build(self, request):
+        params = ReportSummaryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+
+        tiers = reports.completed_tasks(request.user, filters.get('start'), filters.get('end'))
+        rows = reports.worked_hours_summary(tiers, filters.get('group_by'), filters.get('period'))
+        return Response({
+            'total': ReportSummarySerializer(reports.totals(tiers)).data,
+            'results': ReportSummarySerializer(rows, many=True).data,
+        })
+
+
+class ResponseCacheMetricsAPIView(APIView):
+    permission_classes = [IsSuperAdminOnly]
+
+    def get(self, request):
+        return Response(response_cache.metrics())
+
+
+class ReassignUsersAPIView(APIView):
+    """Queue moving users (all, or ``users``) from one admin to another; poll the returned job."""
+    permission_classes = [IsSuperAdminOnly]
+
+    def post(self, request):
+        serializer = ReassignUsersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        job, queued = jobs.queue_reassignment(data['from_admin'], data['to_admin'], data.get('users'), user=request.user)
+        if not queued:
+            return Response(
+                {'error': 'Another job for from_admin is still in progress', 'job': JobSerializer(job).data},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailAPIView(generics.RetrieveAPIView):
+    permission_classes = [IsSuperAdminOnly]
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    # Export responses bypass renderers entirely; errors are always JSON,
+    # whatever the client put in Accept (e.g. text/csv).
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class ExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def get_permissions(self):
+        if self.kwargs.get('dataset') == 'reports':
+            return [IsSuperAdminOrAdmin()]
+        return super().get_permissions()
+
+    def get(self, request, dataset, file_type):
+        params = DateRangeQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        values = exports.export_rows(dataset, request.user, params.validated_data.get('start'), params.validated_data.get('end'))
+        stream = exports.STREAMS[file_type](dataset, values)
+        response = StreamingHttpResponse(stream, content_type=exports.CONTENT_TYPES[file_type])
+        filename = f'{dataset}-{timezone.now():%Y%m%d}.{file_type}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import async_login, async_register
+
+urlpatterns = [
+    path("register/", async_register, name="async_register"),
+    path("login/", async_login, name="async_login"),
+]
@@ -0,0 +1,104 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import user_cache
+from .tokens import VERSION_CLAIM, ClaimsUser, acurrent_token_version, current_token_version
+
+
+async def aauthenticate(request):
+    """
+    Run the configured authentication classes for an async view.
+
+    Classes without ``aauthenticate`` are skipped. Returns the first
+    ``(user, token)`` pair, or None for anonymous requests.
+    """
+    for authentication_class in drf_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authenticator = authentication_class()
+        if not hasattr(authenticator, 'aauthenticate'):
+            continue
+        result = await authenticator.aauthenticate(request)
+        if result is not None:
+            return result
+    return None
+
+
+class AsyncJWTAuthenticationMixin:
+    """authenticate() with the user lookup awaited through ``aget_user``."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+
+class CachedJWTAuthentication(AsyncJWTAuthenticationMixin, JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through ``user_cache``
+    instead of querying the users table on every request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    async def aget_user(self, validated_token):
+        user_id = self.user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.set(user)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class TokenClaimsAuthentication(AsyncJWTAuthenticationMixin, JWTAuthentication):
+    """
+    Stateless JWT authentication: the request user is built from the role
+    claims in the token, with no users-table lookup.
+
+    Revocation is checked against the user's token_version, which is read
+    through the cache and bumped whenever one of the embedded claims changes.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if validated_token.get(VERSION_CLAIM) != current_token_version(user_id):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        return ClaimsUser(validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.user_id(validated_token)
+        if validated_token.get(VERSION_CLAIM) != await acurrent_token_version(user_id):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        return ClaimsUser(validated_token)
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+
+# Enough to authorise an API request without touching the users table.
+# Any other field is loaded lazily from the database if a view needs it.
+CACHED_FIELDS = ('id', 'username', 'email', 'role', 'admin_id', 'is_superuser', 'is_staff', 'is_active')
+
+DEFAULTS = {
+    'TTL': 60,
+    'MAX_SIZE': 10000,
+    # Alias from CACHES to share entries between processes, or None.
+    'DJANGO_CACHE': None,
+}
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_USER_CACHE', {})}
+
+
+def shared_cache(alias):
+    """The cache behind ``alias`` when every process sees the same entries, else None."""
+    if not alias:
+        return None
+    backend = caches[alias]
+    # A write to a process-local cache never reaches the other workers.
+    if isinstance(backend, LocMemCache):
+        return None
+    return backend
+
+
+class UserCache:
+    """
+    Two-level cache of authenticated user rows.
+
+    A per-process LRU with a TTL sits in front of an optional Django cache
+    backend. Entries are plain field dicts; ``get`` rebuilds a ``Users``
+    instance with the remaining fields deferred, so a stray ``save()`` only
+    writes the cached columns.
+
+    ``delete`` only reaches this process's LRU and the shared backend;
+    other processes serve their local copy until its TTL runs out.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, user_id):
+        return f'auth-user:{user_id}'
+
+    def get(self, user_id):
+        # Token claims carry the id as a string; normalise so both sides match.
+        user_id = str(user_id)
+        config = cache_settings()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(user_id)
+                    return self.build(entry[1])
+                del self._entries[user_id]
+
+        if config['DJANGO_CACHE']:
+            values = caches[config['DJANGO_CACHE']].get(self.key(user_id))
+            if values is not None:
+                self._remember(user_id, values, config)
+                return self.build(values)
+        return None
+
+    def set(self, user):
+        config = cache_settings()
+        values = {name: getattr(user, name) for name in CACHED_FIELDS}
+        self._remember(str(user.pk), values, config)
+        if config['DJANGO_CACHE']:
+            caches[config['DJANGO_CACHE']].set(self.key(user.pk), values, config['TTL'])
+
+    def delete(self, *user_ids):
+        user_ids = [str(user_id) for user_id in user_ids]
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+        config = cache_settings()
+        if config['DJANGO_CACHE']:
+            caches[config['DJANGO_CACHE']].delete_many([self.key(user_id) for user_id in user_ids])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def build(self, values):
+        User = get_user_model()
+        # from_db() expects values in concrete field order.
+        names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+        return User.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+    def _remember(self, user_id, values, config):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + config['TTL'], values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > config['MAX_SIZE']:
+                self._entries.popitem(last=False)
+
+
+user_cache = UserCache()
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from PASSWORD_HASH_ITERATIONS.
+
+    It keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes still
+    verify. Django's must_update() compares the stored iteration count with
+    ours, so every successful login transparently rehashes at the configured
+    cost, whether it was raised or lowered.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+def make_fast_password(password, iterations):
+    """
+    A ``pbkdf2_sha256`` hash at a low work factor, for bulk-created test
+    accounts. It verifies like any other hash, and must_update() rehashes it
+    at PASSWORD_HASH_ITERATIONS on the account's first login.
+    """
+    hasher = PBKDF2PasswordHasher()
+    return hasher.encode(password, hasher.salt(), iterations)
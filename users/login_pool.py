@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class LoginPoolFull(Exception):
+    pass
+
+
+class LoginPool:
+    """
+    Bounded thread pool for password verification.
+
+    PBKDF2 runs in OpenSSL with the GIL released, so a few threads keep every
+    core busy. The pool caps how many logins run or wait at once, which keeps
+    a login storm from taking all the workers that serve the task API. Calls
+    beyond the cap fail fast with LoginPoolFull.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.peak_depth = 0
+
+    @property
+    def workers(self):
+        return settings.LOGIN_POOL.get('WORKERS') or os.cpu_count() or 1
+
+    @property
+    def max_queue(self):
+        return settings.LOGIN_POOL.get('MAX_QUEUE', 64)
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='login')
+        return self._executor
+
+    async def run(self, func, *args):
+        executor = self.start()
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise LoginPoolFull()
+            self.in_flight += 1
+            self.peak_depth = max(self.peak_depth, self.in_flight)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, self._call, func, args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _call(self, func, args):
+        # Pool threads outlive requests, so tidy their DB connections the
+        # way the request cycle would.
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queued': max(0, self.in_flight - self.workers),
+                'peak_depth': self.peak_depth,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+
+
+login_pool = LoginPool()
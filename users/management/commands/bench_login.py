@@ -0,0 +1,36 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Measure password-verification logins/sec at several thread counts with the configured hasher.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, help='Override PASSWORD_HASH_ITERATIONS for this run.')
+        parser.add_argument('--threads', type=int, nargs='+', help='Thread counts to try (default: 1, cores/2, cores, cores*2).')
+        parser.add_argument('--logins', type=int, default=200, help='Verifications per thread count.')
+
+    def handle(self, *args, **options):
+        if options['iterations']:
+            settings.PASSWORD_HASH_ITERATIONS = options['iterations']
+        cores = os.cpu_count() or 1
+        thread_counts = options['threads'] or sorted({1, max(1, cores // 2), cores, cores * 2})
+        encoded = make_password('benchmark-password')
+        self.stdout.write(f'hasher={encoded.split("$", 1)[0]} iterations={settings.PASSWORD_HASH_ITERATIONS} cores={cores}')
+
+        for threads in thread_counts:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                started = time.perf_counter()
+                results = list(executor.map(lambda _: check_password('benchmark-password', encoded), range(options['logins'])))
+                elapsed = time.perf_counter() - started
+            assert all(results)
+            rate = options['logins'] / elapsed
+            self.stdout.write(
+                f'threads={threads:<3} logins/sec={rate:8.1f} '
+                f'per core={rate / min(threads, cores):7.1f} avg ms={elapsed / options["logins"] * threads * 1000:7.1f}'
+            )
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import CommandError
+
+from tasks import stats
+from tasks.imports import ImportCommand, InvalidRow, clean, field
+from tasks.response_cache import response_cache, task_scopes
+from users.hashers import make_fast_password
+
+User = get_user_model()
+
+BOOLEANS = {'1': True, 'true': True, 'yes': True, 't': True, '0': False, 'false': False, 'no': False, 'f': False}
+
+
+class Command(ImportCommand):
+    help = (
+        'Stream users from a CSV or NDJSON file into the user table in batched inserts. Columns: username, '
+        'email, and optionally role, admin (the managing admin\'s username), password or password_hash, '
+        'first_name, last_name, is_active. Existing usernames and emails are skipped.'
+    )
+    kind = 'users'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--default-password', help='Password for rows without one; otherwise they get an unusable password.')
+        parser.add_argument(
+            '--fast-hash', type=int, nargs='?', const=1000, metavar='ITERATIONS',
+            help='Hash with this many PBKDF2 iterations (default 1000) instead of PASSWORD_HASH_ITERATIONS, for '
+                 'synthetic accounts. Hashes are upgraded on first login.',
+        )
+        parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1, help='Threads hashing passwords.')
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['hash_workers']) as self.hash_pool:
+            super().handle(*args, **options)
+
+    def setup(self):
+        self.admins = dict(User.objects.filter(role='admin').values_list('username', 'id').iterator(chunk_size=10000))
+        self.stdout.write(f'{len(self.admins)} admins')
+        iterations = self.options['fast_hash']
+        if iterations is not None and iterations < 1:
+            raise CommandError('--fast-hash needs at least one iteration.')
+        if iterations is None:
+            self.hash = make_password
+        else:
+            self.hash = lambda password: make_fast_password(password, iterations)
+
+    def build(self, line, record):
+        role = clean(User, 'role', field(record, 'role') or 'user', line)
+        user = User(
+            username=clean(User, 'username', field(record, 'username'), line),
+            email=clean(User, 'email', field(record, 'email'), line),
+            role=role,
+            first_name=clean(User, 'first_name', field(record, 'first_name') or '', line),
+            last_name=clean(User, 'last_name', field(record, 'last_name') or '', line),
+            is_active=self.boolean(line, field(record, 'is_active'), default=True),
+        )
+        # Resolved to an id in write(), after admins earlier in the same
+        # batch have been inserted.
+        user._admin_name = field(record, 'admin')
+        if user._admin_name is not None and role != 'user':
+            raise InvalidRow(line, 'admin: only users with role "user" have an admin')
+        user._line = line
+
+        password_hash = field(record, 'password_hash')
+        if password_hash is not None:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise InvalidRow(line, 'password_hash: not a hash any configured hasher recognises')
+            user.password = password_hash
+        else:
+            user._raw_password = field(record, 'password') or self.options['default_password']
+        return user
+
+    def boolean(self, line, value, default):
+        if value is None:
+            return default
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() not in BOOLEANS:
+            raise InvalidRow(line, f'is_active: expected true or false, got {value!r}')
+        return BOOLEANS[str(value).lower()]
+
+    def prepare(self, users):
+        # Outside the batch transaction, on several threads: PBKDF2 releases
+        # the GIL, and the database stays unlocked while it runs.
+        pending = [user for user in users if hasattr(user, '_raw_password')]
+        hashes = self.hash_pool.map(
+            lambda password: self.hash(password) if password else make_password(None),
+            [user._raw_password for user in pending],
+        )
+        for user, encoded in zip(pending, hashes):
+            user.password = encoded
+        return users
+
+    def write(self, users):
+        usernames = {user.username for user in users}
+        emails = {user.email for user in users}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        new = []
+        for user in users:
+            if user.username in taken_usernames or user.email in taken_emails:
+                continue
+            taken_usernames.add(user.username)
+            taken_emails.add(user.email)
+            new.append(user)
+
+        # Admins first, so users in the same batch can name them.
+        admins = [user for user in new if user.role == 'admin']
+        User.objects.bulk_create(admins)
+        self.admins.update((admin.username, admin.pk) for admin in admins)
+        members = []
+        for user in new:
+            if user.role == 'admin':
+                continue
+            if user._admin_name is not None:
+                if user._admin_name not in self.admins:
+                    error = InvalidRow(user._line, f'admin: no admin named {user._admin_name!r}')
+                    if not self.options['skip_invalid']:
+                        raise error
+                    self.stderr.write(f'Skipped {error}')
+                    continue
+                user.admin_id = self.admins[user._admin_name]
+            members.append(user)
+        User.objects.bulk_create(members)
+        new = admins + members
+
+        # bulk_create() sends no post_save, so apply what the user signals
+        # would have: one users_count per new user, admins_count per admin.
+        deltas = {}
+        for user in new:
+            stats.merge(deltas, user.admin_id, {'users_count': 1})
+        if admins:
+            stats.merge(deltas, None, {'admins_count': len(admins)})
+        stats.apply_deltas(deltas)
+        response_cache.invalidate_on_commit(task_scopes([], {user.admin_id for user in members}))
+        return len(new), len(users) - len(new)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -10,6 +10,15 @@ class Users(AbstractUser):
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
     admin = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='managed_users')
+    # Bumped whenever a claim embedded in issued tokens (role, superuser flag,
+    # managing admin, active flag) changes; older tokens stop validating.
+    token_version = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['admin', 'role'], name='users_admin_role_idx'),
+            models.Index(fields=['role'], name='users_role_idx'),
+        ]
 
     def __str__(self):
         return self.username
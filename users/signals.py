@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .cache import user_cache
+from .tokens import publish_token_version
+
+User = get_user_model()
+
+CLAIM_FIELDS = ('role', 'is_superuser', 'admin_id', 'is_active')
+
+
+def claims_state(instance):
+    values = instance.__dict__
+    if not all(name in values for name in CLAIM_FIELDS):
+        return None
+    return tuple(values[name] for name in CLAIM_FIELDS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers role/manager changes from the panel (edit_user, demote_admin,
+    # assign_user_to_admin) as well as API and admin-site edits.
+    # Evict again after commit so a request that re-cached the old row
+    # before the transaction finished does not keep it until the TTL.
+    user_id = instance.pk
+    user_cache.delete(user_id)
+    transaction.on_commit(lambda: user_cache.delete(user_id))
+
+
+@receiver(post_init, sender=User)
+def remember_claims(sender, instance, **kwargs):
+    instance._claims_state = claims_state(instance)
+
+
+@receiver(post_save, sender=User)
+def bump_token_version(sender, instance, created, raw=False, **kwargs):
+    old, new = instance._claims_state, claims_state(instance)
+    instance._claims_state = new
+    if raw or created or old is None or old == new:
+        return
+    # e.g. demote_admin: tokens issued with role=admin stop working now
+    # rather than when they expire.
+    User.objects.filter(pk=instance.pk).update(token_version=F('token_version') + 1)
+    instance.token_version = User.objects.filter(pk=instance.pk).values_list('token_version', flat=True).get()
+    user_id, version = instance.pk, instance.token_version
+    transaction.on_commit(lambda: publish_token_version(user_id, version))
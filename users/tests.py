@@ -1,3 +1,184 @@
-from django.test import TestCase
+import asyncio
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication, TokenClaimsAuthentication
+from .cache import user_cache
+from .hashers import make_fast_password
+from .login_pool import LoginPool, LoginPoolFull, login_pool
+from .tokens import RoleRefreshToken
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ann', email='ann@example.com', password='secret', role='user')
+
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        token = RoleRefreshToken.for_user(self.user).access_token
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_second_request_skips_users_table(self):
+        authentication = CachedJWTAuthentication()
+        with self.assertNumQueries(1):
+            user, _ = authentication.authenticate(self.request)
+        with self.assertNumQueries(0):
+            cached, _ = authentication.authenticate(self.request)
+        self.assertEqual((cached.pk, cached.role, cached.admin_id), (user.pk, 'user', None))
+
+    def test_saving_user_evicts_entry(self):
+        authentication = CachedJWTAuthentication()
+        authentication.authenticate(self.request)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate(self.request)
+
+    @override_settings(AUTH_USER_CACHE={'TTL': 0})
+    def test_zero_ttl_turns_cache_off(self):
+        authentication = CachedJWTAuthentication()
+        authentication.authenticate(self.request)
+        with self.assertNumQueries(1):
+            authentication.authenticate(self.request)
+
+    async def test_async_lookup_shares_cache(self):
+        authentication = CachedJWTAuthentication()
+        user, _ = await authentication.aauthenticate(self.request)
+        self.assertIsNotNone(user_cache.get(user.pk))
+        cached, _ = await authentication.aauthenticate(self.request)
+        self.assertEqual(cached.pk, self.user.pk)
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='boss', email='boss@example.com', password='secret', role='admin')
+        cls.user = User.objects.create_user(username='ann', email='ann@example.com', password='secret', role='user')
+
+    def setUp(self):
+        self.refresh = RoleRefreshToken.for_user(self.user)
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def assertRevoked(self):
+        with self.assertRaises(AuthenticationFailed):
+            TokenClaimsAuthentication().authenticate(self.request)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_revoked')
+
+    def test_claim_change_revokes_tokens(self):
+        user, _ = TokenClaimsAuthentication().authenticate(self.request)
+        self.assertEqual((user.pk, user.role, user.admin_id), (self.user.pk, 'user', None))
+        self.user.admin = self.admin
+        self.user.save()
+        self.assertRevoked()
+
+    @override_settings(TOKEN_VERSION_CACHE_ALIAS='default')
+    def test_process_local_cache_is_not_trusted(self):
+        TokenClaimsAuthentication().authenticate(self.request)
+        # As another worker would: bump in the database without touching
+        # this process's cache.
+        User.objects.filter(pk=self.user.pk).update(token_version=F('token_version') + 1)
+        self.assertRevoked()
+
+    async def test_async_check(self):
+        authentication = TokenClaimsAuthentication()
+        await authentication.aauthenticate(self.request)
+        await User.objects.filter(pk=self.user.pk).aupdate(token_version=F('token_version') + 1)
+        with self.assertRaises(AuthenticationFailed):
+            await authentication.aauthenticate(self.request)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=2000)
+class LoginTests(TransactionTestCase):
+    """Logins verify on the pool's threads, which need committed rows."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='ann', email='ann@example.com', role='user', password=make_fast_password('secret', 1000),
+        )
+
+    def iterations(self):
+        self.user.refresh_from_db()
+        algorithm, iterations, *rest = self.user.password.split('$')
+        return algorithm, int(iterations)
+
+    def test_login_upgrades_hash_to_configured_cost(self):
+        self.assertEqual(self.iterations(), ('pbkdf2_sha256', 1000))
+        response = self.client.post('/api/auth/login/', {'username': 'ann', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.iterations(), ('pbkdf2_sha256', 1000))
+
+        response = self.client.post('/api/auth/login/', {'username': 'ann', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.iterations(), ('pbkdf2_sha256', 2000))
+
+        # Lowering the cost rehashes too.
+        with override_settings(PASSWORD_HASH_ITERATIONS=1500):
+            self.client.post('/api/auth/login/', {'username': 'ann', 'password': 'secret'})
+        self.assertEqual(self.iterations(), ('pbkdf2_sha256', 1500))
+
+    async def test_async_login_runs_on_pool(self):
+        before = login_pool.metrics()
+        response = await self.async_client.post(
+            reverse('async_login'), {'username': 'ann', 'password': 'secret'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['user']['username'], 'ann')
+        self.assertIn('access', body)
+        self.assertEqual(await sync_to_async(self.iterations)(), ('pbkdf2_sha256', 2000))
+
+        response = await self.async_client.post(
+            reverse('async_login'), {'username': 'ann', 'password': 'wrong'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        after = login_pool.metrics()
+        self.assertEqual(after['completed'] - before['completed'], 2)
+        self.assertEqual(after['in_flight'], 0)
+
+    async def test_async_login_rejects_bad_body(self):
+        response = await self.async_client.post(reverse('async_login'), '[]', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_full_pool_returns_503(self):
+        with mock.patch.object(login_pool, 'run', side_effect=LoginPoolFull):
+            response = await self.async_client.post(
+                reverse('async_login'), {'username': 'ann', 'password': 'secret'}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class LoginPoolTests(SimpleTestCase):
+    @override_settings(LOGIN_POOL={'WORKERS': 1, 'MAX_QUEUE': 1})
+    def test_rejects_beyond_workers_and_queue(self):
+        pool, release = LoginPool(), threading.Event()
+
+        async def storm():
+            calls = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(LoginPoolFull):
+                await pool.run(release.wait)
+            self.assertEqual(pool.metrics()['queued'], 1)
+            release.set()
+            return await asyncio.gather(*calls)
+
+        self.assertEqual(asyncio.run(storm()), [True, True])
+        metrics = pool.metrics()
+        self.assertEqual(
+            (metrics['completed'], metrics['rejected'], metrics['peak_depth'], metrics['in_flight']), (2, 1, 2, 0),
+        )
+        pool.start().shutdown()
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import shared_cache
+
+VERSION_CLAIM = 'ver'
+
+
+def version_cache_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def version_cache_ttl():
+    return getattr(settings, 'TOKEN_VERSION_CACHE_TTL', 60)
+
+
+def version_cache():
+    """
+    Where token versions are cached, or None to read them from the database.
+
+    Only a cache shared by every worker is used: a bump published to a
+    per-process cache would leave revoked tokens valid in the others.
+    """
+    return shared_cache(getattr(settings, 'TOKEN_VERSION_CACHE_ALIAS', None))
+
+
+def stored_token_versions():
+    # Always the primary: a lagging replica would un-revoke tokens.
+    User = get_user_model()
+    return User.objects.using(router.db_for_write(User)).values_list('token_version', flat=True)
+
+
+def current_token_version(user_id):
+    """The user's token_version; None if the user is gone."""
+    cache = version_cache()
+    version = cache.get(version_cache_key(user_id)) if cache is not None else None
+    if version is None:
+        version = stored_token_versions().filter(pk=user_id).first()
+        if version is not None and cache is not None:
+            cache.set(version_cache_key(user_id), version, version_cache_ttl())
+    return version
+
+
+async def acurrent_token_version(user_id):
+    cache = version_cache()
+    version = await cache.aget(version_cache_key(user_id)) if cache is not None else None
+    if version is None:
+        version = await stored_token_versions().filter(pk=user_id).afirst()
+        if version is not None and cache is not None:
+            await cache.aset(version_cache_key(user_id), version, version_cache_ttl())
+    return version
+
+
+def publish_token_version(user_id, version):
+    cache = version_cache()
+    if cache is not None:
+        cache.set(version_cache_key(user_id), version, version_cache_ttl())
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token carrying the claims permission checks need; access tokens inherit them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['is_superuser'] = user.is_superuser
+        token['admin_id'] = user.admin_id
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from token claims alone.
+
+    Exposes ``role``, ``is_superuser`` and ``admin_id`` like ``Users`` so
+    permission classes and ``Task.objects.visible_to`` work unchanged.
+    """
+
+    @property
+    def id(self):
+        user_id = self.token[api_settings.USER_ID_CLAIM]
+        return int(user_id) if str(user_id).isdigit() else user_id
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def role(self):
+        return self.token.get('role')
+
+    @property
+    def admin_id(self):
+        return self.token.get('admin_id')
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        # Tokens issued before claims existed carry no version; let them
+        # refresh until they expire.
+        if VERSION_CLAIM in refresh.payload:
+            user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+            if refresh[VERSION_CLAIM] != current_token_version(user_id):
+                raise AuthenticationFailed('Token has been revoked', 'token_revoked')
+        return super().validate(attrs)
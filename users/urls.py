@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import RegisterAPIView, LoginAPIView
+from .views import RegisterAPIView, LoginAPIView, LoginPoolMetricsAPIView
 
 urlpatterns = [
     path("register/", RegisterAPIView.as_view(), name="register"),
     path("login/", LoginAPIView.as_view(), name="login"),
+    path("login-pool/", LoginPoolMetricsAPIView.as_view(), name="login_pool_metrics"),
 ]
\ No newline at end of file
@@ -1,13 +1,22 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth import get_user_model
+from tasks.permissions import IsSuperAdminOnly
+from .login_pool import LoginPoolFull, login_pool
 from .serializers import RegisterSerializer, LoginSerializer
+from .tokens import RoleRefreshToken
 
 User = get_user_model()
 
@@ -16,19 +25,24 @@ class RegisterAPIView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        serializer = RegisterSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            return Response({
-                "message": "User registered successfully",
-                "user": {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "role": user.role,
-                }
-            }, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        payload, code = register_user(request.data)
+        return Response(payload, status=code)
+
+
+def register_user(data):
+    serializer = RegisterSerializer(data=data)
+    if serializer.is_valid():
+        user = serializer.save()
+        return {
+            "message": "User registered successfully",
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "role": user.role,
+            }
+        }, status.HTTP_201_CREATED
+    return serializer.errors, status.HTTP_400_BAD_REQUEST
 
 
 class LoginAPIView(APIView):
@@ -37,17 +51,84 @@ class LoginAPIView(APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.validated_data
+        return Response(login_payload(serializer.validated_data), status=status.HTTP_200_OK)
 
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            "message": "Login successful",
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "role": user.role,
-            },
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-        }, status=status.HTTP_200_OK)
+
+def login_payload(user):
+    refresh = RoleRefreshToken.for_user(user)
+    return {
+        "message": "Login successful",
+        "user": {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "role": user.role,
+        },
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+    }
+
+
+def verify_login(data):
+    serializer = LoginSerializer(data=data)
+    if serializer.is_valid():
+        return login_payload(serializer.validated_data), status.HTTP_200_OK
+    return serializer.errors, status.HTTP_400_BAD_REQUEST
+
+
+def json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def json_response(payload, code):
+    # Rendered like the DRF views so both login paths return identical bytes.
+    return HttpResponse(JSONRenderer().render(payload), status=code, content_type="application/json")
+
+
+def invalid_body():
+    return json_response({"detail": "Expected a JSON object."}, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+async def async_register(request):
+    data = json_body(request)
+    if data is None:
+        return invalid_body()
+    # RegisterSerializer's unique validators query synchronously, so the
+    # whole validate-and-create step runs in the sync thread.
+    payload, code = await sync_to_async(register_user)(data)
+    return json_response(payload, code)
+
+
+@csrf_exempt
+@require_POST
+async def async_login(request):
+    """
+    Same contract as LoginAPIView, but the password check runs on the
+    bounded login pool instead of the request thread. Under ASGI the event
+    loop keeps serving other requests while PBKDF2 runs; when the pool is
+    saturated the request is refused straight away with a 503.
+    """
+    data = json_body(request)
+    if data is None:
+        return invalid_body()
+
+    try:
+        payload, code = await login_pool.run(verify_login, data)
+    except LoginPoolFull:
+        response = json_response({"detail": "Too many concurrent logins, retry shortly."}, status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+    return json_response(payload, code)
+
+
+class LoginPoolMetricsAPIView(APIView):
+    permission_classes = [IsSuperAdminOnly]
+
+    def get(self, request):
+        return Response(login_pool.metrics())